@@ -5,6 +5,8 @@ Production-ready configuration using python-decouple for environment variables.
 
 import os
 from pathlib import Path
+from urllib.parse import quote
+import django
 from decouple import config, Csv
 import dj_database_url
 
@@ -40,12 +42,16 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'marketplace.middleware.ProfilingMiddleware',          # Server-Timing / cProfile (see PERFORMANCE)
+    'marketplace.middleware.MetricsMiddleware',            # Prometheus metrics at /metrics/
+    'marketplace.middleware.QueryLogMiddleware',           # Query fingerprints / slow-query log
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',          # Static files in production
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'marketplace.middleware.RoleMiddleware',               # request.role / request.profile
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -88,6 +94,26 @@ if 'VERCEL' in os.environ and not config('DATABASE_URL', default=''):
         'NAME': '/tmp/db.sqlite3',
     }
 
+# Opt-in SQLite production profile (see marketplace/sqlite.py): WAL, tuned
+# pragmas and IMMEDIATE transactions on every connection, plus a read-only
+# "read" connection used by the list and detail pages
+SQLITE_TUNING = config('SQLITE_TUNING', default=False, cast=bool)
+SQLITE_BUSY_TIMEOUT = config('SQLITE_BUSY_TIMEOUT', default=5000, cast=int)                 # ms
+SQLITE_MMAP_SIZE = config('SQLITE_MMAP_SIZE', default=256 * 1024 * 1024, cast=int)          # bytes
+SQLITE_CACHE_SIZE = config('SQLITE_CACHE_SIZE', default=32 * 1024, cast=int)                # KiB per connection
+
+if SQLITE_TUNING and DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    if django.VERSION >= (5, 1):
+        DATABASES['default'].setdefault('OPTIONS', {})['transaction_mode'] = 'IMMEDIATE'
+    DATABASES['read'] = {
+        **DATABASES['default'],
+        'NAME': 'file:' + quote(str(DATABASES['default']['NAME'])) + '?mode=ro',
+        'OPTIONS': {},
+        # Tests read through the default test database
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_ROUTERS = ['marketplace.sqlite.ReadRouter']
+
 
 # ==================== PASSWORD VALIDATION ====================
 
@@ -135,6 +161,76 @@ LOGIN_REDIRECT_URL = 'home'
 LOGOUT_REDIRECT_URL = 'home'
 
 
+# ==================== PERFORMANCE ====================
+
+# Views over their query budget raise instead of logging a warning; the
+# budget tests turn this on with override_settings
+QUERY_BUDGET_RAISE = config('QUERY_BUDGET_RAISE', default=False, cast=bool)
+
+# Server-Timing header (db, render, view and total milliseconds) on every
+# response; it reveals timings to clients, so it is off in production by default
+SERVER_TIMING = config('SERVER_TIMING', default=DEBUG, cast=bool)
+
+# cProfile a random share of requests (0.0-1.0), plus any request sending
+# an X-Profile header equal to PROFILING_TOKEN; .prof files go to PROFILING_DIR
+PROFILING_SAMPLE_RATE = config('PROFILING_SAMPLE_RATE', default=0.0, cast=float)
+PROFILING_TOKEN = config('PROFILING_TOKEN', default='')
+PROFILING_DIR = config('PROFILING_DIR', default='/tmp/marketplace-profiles')
+
+# Aggregate every query by fingerprint (literals stripped) into the
+# QueryFingerprint table; queries slower than QUERY_LOG_SLOW_MS are logged
+# with their EXPLAIN plan and the view and line that ran them
+QUERY_LOG = config('QUERY_LOG', default=False, cast=bool)
+QUERY_LOG_SLOW_MS = config('QUERY_LOG_SLOW_MS', default=100.0, cast=float)
+QUERY_LOG_FLUSH_SECONDS = config('QUERY_LOG_FLUSH_SECONDS', default=60, cast=int)
+
+# Prometheus metrics at /metrics/. With METRICS_DIR set, every worker writes
+# its values there (at most once per METRICS_WRITE_SECONDS), so a scrape
+# reports all workers; without it each worker only reports its own values
+# and nothing touches the disk. Scrapers send
+# "Authorization: Bearer <METRICS_TOKEN>"; without a token the endpoint only
+# answers in DEBUG
+METRICS = config('METRICS', default=True, cast=bool)
+METRICS_DIR = config('METRICS_DIR', default='')
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+METRICS_WRITE_SECONDS = config('METRICS_WRITE_SECONDS', default=1.0, cast=float)
+
+
+# ==================== CACHING ====================
+
+# CACHE_BACKEND is locmem (per process, the default), file (shared by the
+# processes of one machine) or redis (any server speaking the Redis protocol)
+CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'marketplace'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', '/tmp/marketplace-cache'),
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://127.0.0.1:6379/1'),
+}
+CACHE_BACKEND = config('CACHE_BACKEND', default='locmem')
+if CACHE_BACKEND not in CACHE_BACKENDS:
+    raise ValueError(f"CACHE_BACKEND must be one of {', '.join(CACHE_BACKENDS)}, not {CACHE_BACKEND!r}")
+
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND][0],
+        'LOCATION': config('CACHE_LOCATION', default=CACHE_BACKENDS[CACHE_BACKEND][1]),
+        'TIMEOUT': config('CACHE_TIMEOUT', default=300, cast=int),
+        'KEY_PREFIX': 'marketplace',
+    }
+}
+
+# Seconds logged-out visitors (and CDNs) may reuse the home, gig and job
+# listing pages; 0 turns the page cache off
+PAGE_CACHE_TIMEOUT = config('PAGE_CACHE_TIMEOUT', default=60, cast=int)
+
+
+# ==================== REAL-TIME MESSAGING ====================
+
+# Broker fanning stream events out between worker processes; the default
+# only reaches streams held by the same process (one ASGI worker)
+REALTIME_BROKER = config('REALTIME_BROKER', default='marketplace.realtime.LocalBroker')
+REALTIME_REDIS_URL = config('REALTIME_REDIS_URL', default='redis://localhost:6379/0')
+
+
 # ==================== SECURITY HEADERS ====================
 
 # ==================== SECURITY HEADERS ====================
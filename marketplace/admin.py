@@ -1,5 +1,6 @@
-from django.contrib import admin
-from .models import FreelancerProfile, ClientProfile, Category, Gig, Job, Bid, Order, Message, Review
+from django.contrib import admin, messages
+from .models import FreelancerProfile, ClientProfile, Category, Gig, Job, Bid, Order, Message, Review, Skill, UserStats, EarningsEntry, QueryFingerprint
+from .services import transition_order, InvalidTransition
 
 
 @admin.register(FreelancerProfile)
@@ -7,7 +8,14 @@ class FreelancerProfileAdmin(admin.ModelAdmin):
     list_display = ['user', 'experience', 'hourly_rate', 'rating', 'total_earnings', 'created_at']
     list_filter = ['experience', 'rating', 'created_at']
     search_fields = ['user__username', 'user__email', 'skills', 'bio']
-    readonly_fields = ['created_at', 'rating', 'total_earnings']
+    readonly_fields = ['created_at', 'rating', 'rating_sum', 'rating_count', 'total_earnings']
+
+
+@admin.register(Skill)
+class SkillAdmin(admin.ModelAdmin):
+    list_display = ['name', 'slug', 'created_at']
+    search_fields = ['name', 'slug']
+    readonly_fields = ['created_at']
 
 
 @admin.register(ClientProfile)
@@ -36,10 +44,13 @@ class GigAdmin(admin.ModelAdmin):
 
 @admin.register(Job)
 class JobAdmin(admin.ModelAdmin):
-    list_display = ['title', 'client', 'category', 'budget', 'status', 'deadline', 'created_at']
+    list_display = ['title', 'client', 'category', 'budget', 'status', 'bid_count', 'deadline', 'created_at']
     list_filter = ['status', 'category', 'created_at']
     search_fields = ['title', 'description', 'client__username']
-    readonly_fields = ['created_at', 'updated_at']
+    readonly_fields = [
+        'bid_count', 'active_bid_count', 'active_bid_sum', 'min_bid', 'avg_bid', 'median_delivery_days',
+        'created_at', 'updated_at',
+    ]
     list_editable = ['status']
 
 
@@ -58,7 +69,39 @@ class OrderAdmin(admin.ModelAdmin):
     list_filter = ['status', 'created_at']
     search_fields = ['client__username', 'freelancer__username']
     readonly_fields = ['created_at']
-    list_editable = ['status']
+    actions = ['mark_in_progress', 'mark_completed', 'mark_cancelled']
+    
+    def get_readonly_fields(self, request, obj=None):
+        # Existing orders only change status through the transition actions
+        if obj is not None:
+            return self.readonly_fields + ['status', 'completed_at']
+        return self.readonly_fields
+    
+    def transition(self, request, queryset, status):
+        moved, skipped = 0, 0
+        for order in queryset:
+            try:
+                transition_order(order, status)
+                moved += 1
+            except InvalidTransition:
+                skipped += 1
+        self.message_user(request, f'{moved} order(s) marked {status}.')
+        if skipped:
+            self.message_user(
+                request, f'{skipped} order(s) skipped: they cannot move to {status}.', level=messages.WARNING
+            )
+    
+    @admin.action(description='Mark selected orders In Progress')
+    def mark_in_progress(self, request, queryset):
+        self.transition(request, queryset, 'In Progress')
+    
+    @admin.action(description='Mark selected orders Completed')
+    def mark_completed(self, request, queryset):
+        self.transition(request, queryset, 'Completed')
+    
+    @admin.action(description='Mark selected orders Cancelled')
+    def mark_cancelled(self, request, queryset):
+        self.transition(request, queryset, 'Cancelled')
 
 
 @admin.register(Message)
@@ -75,3 +118,38 @@ class ReviewAdmin(admin.ModelAdmin):
     list_filter = ['rating', 'created_at']
     search_fields = ['review_text', 'order__client__username', 'order__freelancer__username']
     readonly_fields = ['created_at']
+
+
+@admin.register(UserStats)
+class UserStatsAdmin(admin.ModelAdmin):
+    list_display = ['user', 'freelancer_active_orders', 'total_earned', 'client_active_orders', 'total_spent', 'updated_at']
+    search_fields = ['user__username']
+    readonly_fields = ['updated_at']
+
+
+@admin.register(EarningsEntry)
+class EarningsEntryAdmin(admin.ModelAdmin):
+    list_display = ['order', 'freelancer', 'amount', 'created_at']
+    search_fields = ['freelancer__username']
+    readonly_fields = ['order', 'freelancer', 'amount', 'created_at']
+
+    def has_change_permission(self, request, obj=None):
+        # The ledger is append-only
+        return False
+
+
+@admin.register(QueryFingerprint)
+class QueryFingerprintAdmin(admin.ModelAdmin):
+    list_display = ['__str__', 'calls', 'total_time', 'mean_time', 'max_time', 'rows', 'slow_calls', 'last_seen']
+    search_fields = ['statement', 'last_origin']
+    readonly_fields = [
+        'fingerprint', 'statement', 'calls', 'total_time', 'max_time', 'rows', 'slow_calls',
+        'last_origin', 'last_explain', 'first_seen', 'last_seen',
+    ]
+
+    def has_add_permission(self, request):
+        # Rows are written by the query log; deleting them resets the statistics
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
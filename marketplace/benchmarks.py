@@ -0,0 +1,200 @@
+"""
+Endpoint benchmarks.
+
+Drives every named URL in marketplace/urls.py through the Django test client
+as an anonymous visitor, a freelancer and a client, and records latency
+percentiles, query counts and response sizes per (endpoint, role). Each
+request runs inside a transaction that is rolled back, so endpoints that
+write on GET (accepting a bid, completing an order, reading a thread) see
+the same data on every iteration. Inside that transaction ReadRouter keeps
+reads on the default connection, so with SQLITE_TUNING the figures do not
+cover the read-only connection that list and detail pages use in
+production (benchmark_sqlite measures the profile itself). Results are
+plain dicts, ready for JSON, and compare() checks them against a stored
+baseline.
+"""
+import math
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import Case, Count, Q, When
+from django.test import Client
+from django.urls import reverse
+
+from .models import Gig, Job, Bid, Order, Message, UserStats
+from .query_budget import count_queries
+from . import urls
+
+ROLES = ('anonymous', 'freelancer', 'client')
+
+# URL name -> {URL kwarg: target}; targets are picked from the dataset by pick_targets()
+URL_TARGETS = {
+    'profile_view_user': {'username': 'username'},
+    'gig_detail': {'pk': 'gig'},
+    'gig_edit': {'pk': 'gig'},
+    'gig_delete': {'pk': 'gig'},
+    'purchase_gig': {'gig_id': 'gig'},
+    'job_detail': {'pk': 'job'},
+    'submit_bid': {'job_id': 'job'},
+    'accept_bid': {'bid_id': 'bid'},
+    'order_detail': {'order_id': 'order'},
+    'complete_order': {'order_id': 'open_order'},
+    'submit_review': {'order_id': 'reviewable_order'},
+    'conversation': {'user_id': 'partner'},
+    'conversation_older': {'user_id': 'partner'},
+    'conversation_since': {'user_id': 'partner'},
+    'send_message': {'user_id': 'partner'},
+}
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of ``values``"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def pick_targets():
+    """
+    Choose the busiest users and objects in the dataset, so the benchmark
+    exercises the heaviest pages. Returns {role: (user, targets)}.
+    """
+    freelancer = User.objects.filter(
+        pk__in=UserStats.objects.order_by('-freelancer_completed_orders', 'user_id').values('user_id')[:1]
+    ).first()
+    client = User.objects.filter(
+        pk__in=UserStats.objects.order_by('-client_completed_orders', 'user_id').values('user_id')[:1]
+    ).first()
+
+    shared = {
+        'username': freelancer and freelancer.username,
+        'gig': Gig.objects.filter(freelancer=freelancer).annotate(n=Count('orders')).order_by('-n', 'pk')
+        .values_list('pk', flat=True).first(),
+        'job': Job.objects.order_by('-bid_count', 'pk').values_list('pk', flat=True).first(),
+        # Preferably one the client may accept; otherwise the refusal is measured
+        'bid': Bid.objects.filter(job__status='Open', status='Pending')
+        .order_by(Case(When(job__client=client, then=0), default=1), '-job__bid_count', 'pk')
+        .values_list('pk', flat=True).first(),
+    }
+
+    def own(user):
+        orders = Order.objects.filter(Q(client=user) | Q(freelancer=user)).order_by('-created_at', '-id')
+        partner = Message.objects.filter(sender=user).values('receiver').annotate(n=Count('id')).order_by('-n')
+        return {
+            **shared,
+            'order': orders.values_list('pk', flat=True).first(),
+            'open_order': orders.filter(status='In Progress').values_list('pk', flat=True).first(),
+            'reviewable_order': orders.filter(status='Completed', review__isnull=True)
+            .values_list('pk', flat=True).first(),
+            'partner': partner.values_list('receiver', flat=True).first(),
+        }
+
+    return {
+        'anonymous': (None, own(freelancer)),
+        'freelancer': (freelancer, own(freelancer)),
+        'client': (client, own(client)),
+    }
+
+
+def discover_endpoints(targets):
+    """(name, url, skip reason) for every named URL, filling URL kwargs from ``targets``"""
+    endpoints = []
+    for pattern in urls.urlpatterns:
+        params = pattern.pattern.converters
+        mapping = URL_TARGETS.get(pattern.name, {})
+        missing = [param for param in params if targets.get(mapping.get(param)) is None]
+        if missing:
+            endpoints.append((pattern.name, None, f'no target for {", ".join(missing)}'))
+            continue
+        kwargs = {param: targets[mapping[param]] for param in params}
+        endpoints.append((pattern.name, reverse(pattern.name, kwargs=kwargs), None))
+    return endpoints
+
+
+def measure(client, url, user):
+    """One request, rolled back; returns (status, seconds, queries, bytes)"""
+    with transaction.atomic():
+        with count_queries() as counter:
+            started = time.perf_counter()
+            response = client.get(url)
+            elapsed = time.perf_counter() - started
+        transaction.set_rollback(True)
+    size = 0 if response.streaming else len(response.content)
+    # Flash messages would turn later requests into uncacheable ones
+    client.cookies.pop('messages', None)
+    session = client.cookies.get(settings.SESSION_COOKIE_NAME)
+    if user is not None and not (session and session.value):
+        client.force_login(user)
+    return response.status_code, elapsed, counter.count, size
+
+
+def run(iterations=20, warmup=3, roles=ROLES, names=None, progress=None):
+    """Benchmark every endpoint for every role; returns {"name:role": result}"""
+    results = {}
+    for role, (user, targets) in pick_targets().items():
+        if role not in roles:
+            continue
+        client = Client()
+        if user is not None:
+            client.force_login(user)
+        for name, url, skipped in discover_endpoints(targets):
+            if names and name not in names:
+                continue
+            key = f'{name}:{role}'
+            if skipped or (role != 'anonymous' and user is None):
+                results[key] = {'skipped': skipped or f'no {role} in the dataset'}
+                continue
+            for _ in range(warmup):
+                measure(client, url, user)
+            samples = [measure(client, url, user) for _ in range(iterations)]
+            latencies = [elapsed * 1000 for _, elapsed, _, _ in samples]
+            queries = [count for _, _, count, _ in samples]
+            results[key] = {
+                'url': url,
+                'status': samples[-1][0],
+                'p50_ms': round(percentile(latencies, 50), 3),
+                'p95_ms': round(percentile(latencies, 95), 3),
+                'p99_ms': round(percentile(latencies, 99), 3),
+                'queries': percentile(queries, 50),
+                'max_queries': max(queries),
+                'bytes': samples[-1][3],
+            }
+            if progress:
+                progress(key, results[key])
+    return results
+
+
+def describe_dataset():
+    """Row counts and backend recorded next to the results"""
+    return {
+        'vendor': connection.vendor,
+        'cache': settings.CACHES['default']['BACKEND'],
+        'users': User.objects.count(),
+        'gigs': Gig.objects.count(),
+        'jobs': Job.objects.count(),
+        'bids': Bid.objects.count(),
+        'orders': Order.objects.count(),
+        'messages': Message.objects.count(),
+    }
+
+
+def compare(results, baseline, threshold=0.25, min_ms=2.0, metric='p95_ms'):
+    """
+    Compare ``results`` with ``baseline`` (both as returned by run()).
+
+    An endpoint regresses when its ``metric`` latency grows by more than
+    ``threshold`` (a fraction) and by at least ``min_ms``, or when it runs
+    more queries than before. Returns a list of (key, reason).
+    """
+    regressions = []
+    for key, result in sorted(results.items()):
+        before = baseline.get(key)
+        if not before or 'skipped' in result or 'skipped' in before:
+            continue
+        if result['queries'] > before['queries']:
+            regressions.append((key, f"queries {before['queries']} -> {result['queries']}"))
+        old, new = before[metric], result[metric]
+        if new > old * (1 + threshold) and new - old >= min_ms:
+            regressions.append((key, f'{metric} {old:.1f}ms -> {new:.1f}ms'))
+    return regressions
@@ -0,0 +1,150 @@
+"""
+Per-job bid statistics.
+
+Jobs keep bid_count over all their bids plus running totals over their
+active (not rejected) bids. Counts and the amount sum move with F()
+expressions, min_bid only rescans the job's bids when its cheapest active
+bid leaves, and avg_bid is derived in the same UPDATE, so concurrent bids
+cannot overwrite each other. The median delivery time has no running form:
+it is recomputed from the job's active delivery days, which the
+(job, delivery_days) index returns already sorted, after locking the job
+row so a concurrent bid's update waits until this one has committed.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.apps import apps as global_apps
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, Min, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Cast, Greatest
+from django.utils import timezone
+
+from .models import Job, Bid
+
+ACTIVE = ~Q(status='Rejected')
+
+STAT_FIELDS = ['bid_count', 'active_bid_count', 'active_bid_sum', 'min_bid', 'avg_bid', 'median_delivery_days']
+
+
+def is_active(status):
+    return status != 'Rejected'
+
+
+def median(values):
+    """Median of already sorted values, or None for none"""
+    if not values:
+        return None
+    middle = len(values) // 2
+    if len(values) % 2:
+        return Decimal(values[middle])
+    return Decimal(values[middle - 1] + values[middle]) / 2
+
+
+def median_delivery_days(job_id, using='default'):
+    days = Bid.objects.using(using).filter(ACTIVE, job_id=job_id).order_by('delivery_days')
+    return median(list(days.values_list('delivery_days', flat=True)))
+
+
+def adjust_bid_stats(job_id, count_delta=0, entering=(), leaving=(), using='default'):
+    """
+    Apply bid changes to a job's statistics in one UPDATE.
+
+    ``entering`` and ``leaving`` are the amounts of bids joining or leaving
+    the job's active bids (new, deleted, rejected or re-priced bids). Call
+    after the bid rows themselves have changed.
+    """
+    entering = [Decimal(str(amount)) for amount in entering]
+    leaving = [Decimal(str(amount)) for amount in leaving]
+    active_delta = len(entering) - len(leaving)
+    new_sum = F('active_bid_sum') + (sum(entering, Decimal(0)) - sum(leaving, Decimal(0)))
+    new_count = F('active_bid_count') + active_delta
+
+    lowest = F('min_bid')
+    if entering:
+        cheapest = Value(min(entering))
+        lowest = Case(When(Q(min_bid__isnull=True) | Q(min_bid__gt=min(entering)), then=cheapest), default=lowest)
+    if leaving:
+        # Only a departing cheapest bid makes the minimum unknown
+        rescan = Bid.objects.using(using).filter(ACTIVE, job=job_id).order_by().values('job').annotate(
+            low=Min('bid_amount')
+        )
+        lowest = Case(When(min_bid__lt=min(leaving), then=lowest), default=Subquery(rescan.values('low')))
+
+    with transaction.atomic(using=using):
+        # Without the lock, two bids could each write a median missing the other's delivery days
+        Job.objects.using(using).select_for_update().only('id').filter(pk=job_id).first()
+        Job.objects.using(using).filter(pk=job_id).update(
+            bid_count=Greatest(F('bid_count') + count_delta, 0),
+            active_bid_count=Greatest(new_count, 0),
+            active_bid_sum=Greatest(new_sum, Decimal(0)),
+            min_bid=lowest,
+            # Right-hand sides see the row's old values, so this is the new average
+            avg_bid=Case(
+                When(active_bid_count__lte=-active_delta, then=Value(None)),
+                default=Cast(new_sum, FloatField()) / new_count,
+                output_field=FloatField(),
+            ),
+            median_delivery_days=median_delivery_days(job_id, using),
+            updated_at=timezone.now(),
+        )
+
+
+def single_bid_stats(amount, delivery_days):
+    """Active-bid statistics of a job whose only active bid is the given one"""
+    return {
+        'active_bid_count': 1,
+        'active_bid_sum': amount,
+        'min_bid': amount,
+        'avg_bid': amount,
+        'median_delivery_days': Decimal(delivery_days),
+    }
+
+
+def rebuild_bid_stats(job_ids=None, batch_size=1000, apps=global_apps, using='default'):
+    """
+    Recompute bid statistics for all jobs (or those of ``job_ids``) with one
+    grouped aggregate and one ordered pass over active delivery days.
+    Returns the number of jobs corrected.
+    """
+    JobModel = apps.get_model('marketplace', 'Job')
+    BidModel = apps.get_model('marketplace', 'Bid')
+
+    bids = BidModel.objects.using(using).order_by()
+    jobs = JobModel.objects.using(using).order_by('pk')
+    if job_ids is not None:
+        bids = bids.filter(job__in=job_ids)
+        jobs = jobs.filter(pk__in=job_ids)
+
+    totals = {
+        job_id: (bid_count, active_count, active_sum or Decimal(0), lowest)
+        for job_id, bid_count, active_count, active_sum, lowest in bids.values('job').annotate(
+            total=Count('id'),
+            active=Count('id', filter=ACTIVE),
+            active_sum=Sum('bid_amount', filter=ACTIVE),
+            lowest=Min('bid_amount', filter=ACTIVE),
+        ).values_list('job', 'total', 'active', 'active_sum', 'lowest')
+    }
+    days = {}
+    for job_id, delivery_days in bids.filter(ACTIVE).order_by('job', 'delivery_days').values_list(
+        'job', 'delivery_days'
+    ).iterator():
+        days.setdefault(job_id, []).append(delivery_days)
+
+    changed = []
+    for job in jobs.only('id', *STAT_FIELDS).iterator():
+        bid_count, active_count, active_sum, lowest = totals.get(job.pk, (0, 0, Decimal(0), None))
+        average = None
+        if active_count:
+            average = (Decimal(active_sum) / active_count).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+        expected = [bid_count, active_count, Decimal(active_sum), lowest, average, median(days.get(job.pk))]
+        current = [getattr(job, field) for field in STAT_FIELDS]
+        # Backends round half-way averages differently; allow that one step
+        drifted = (job.avg_bid is None) != (average is None) or (
+            average is not None and abs(job.avg_bid - average) > Decimal('0.01')
+        )
+        if current[:4] + current[5:] != expected[:4] + expected[5:] or drifted:
+            for field, value in zip(STAT_FIELDS, expected):
+                setattr(job, field, value)
+            changed.append(job)
+
+    JobModel.objects.using(using).bulk_update(changed, STAT_FIELDS, batch_size=batch_size)
+    return len(changed)
@@ -0,0 +1,163 @@
+"""
+Versioned cache namespaces.
+
+Every cached value lives in a namespace and its key embeds the namespace's
+current version, e.g. ``gigs:v<version>:featured``. Saving or deleting a
+model bumps the namespaces that read it (see MODEL_NAMESPACES and
+signals.py), which orphans all of their keys at once; orphans simply expire.
+"""
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.db import transaction
+
+from . import metrics
+from .models import Category, Gig, Job, Bid, Order, Review, Skill, FreelancerProfile
+
+
+_MISSING = object()
+
+
+def _new_version():
+    # Time-based, so a version lost to eviction never revives older keys
+    return time.time_ns()
+
+
+class Namespace:
+    """A group of cached values invalidated together"""
+
+    def __init__(self, name):
+        self.name = name
+        self.version_key = f'{name}:version'
+
+    def __repr__(self):
+        return f'<Namespace {self.name}>'
+
+    def version(self):
+        return get_versions([self])[self]
+
+    def key(self, name, version=None):
+        if version is None:
+            version = self.version()
+        return f'{self.name}:v{version}:{name}'
+
+    def get(self, name, default=None):
+        value = cache.get(self.key(name), _MISSING)
+        if value is _MISSING:
+            metrics.count_cache(self.name, misses=1)
+            return default
+        metrics.count_cache(self.name, hits=1)
+        return value
+
+    def set(self, name, value, timeout=DEFAULT_TIMEOUT):
+        cache.set(self.key(name), value, timeout)
+
+    def get_or_set(self, name, default, timeout=DEFAULT_TIMEOUT):
+        """Return the cached value, computing it with ``default()`` on a miss"""
+        missed = []
+
+        def compute():
+            missed.append(True)
+            return default()
+
+        value = cache.get_or_set(self.key(name), compute, timeout)
+        metrics.count_cache(self.name, hits=int(not missed), misses=len(missed))
+        return value
+
+    def get_many(self, names):
+        """Map each name found in the cache to its value"""
+        version = self.version()
+        keys = {self.key(name, version): name for name in names}
+        found = cache.get_many(keys)
+        metrics.count_cache(self.name, hits=len(found), misses=len(keys) - len(found))
+        return {keys[key]: value for key, value in found.items()}
+
+    def set_many(self, values, timeout=DEFAULT_TIMEOUT):
+        version = self.version()
+        cache.set_many({self.key(name, version): value for name, value in values.items()}, timeout)
+
+    def bump(self):
+        bump(self)
+
+
+GIGS = Namespace('gigs')
+JOBS = Namespace('jobs')
+CATEGORIES = Namespace('categories')
+ORDERS = Namespace('orders')
+REVIEWS = Namespace('reviews')
+# Rendered listing cards; each key carries its object's updated_at, so only
+# changes to what cards show besides the object itself need a bump
+CARDS = Namespace('cards')
+
+# Namespaces holding data read from each model. Gig and job listings show
+# their category, job listings count bids, and gig listings filter by the
+# freelancers' skills
+MODEL_NAMESPACES = {
+    Gig: (GIGS,),
+    Job: (JOBS,),
+    Bid: (JOBS,),
+    Category: (CATEGORIES, GIGS, JOBS, CARDS),
+    Skill: (GIGS,),
+    FreelancerProfile: (GIGS,),
+    Order: (ORDERS,),
+    Review: (REVIEWS,),
+}
+
+
+def get_versions(namespaces):
+    """Current versions of several namespaces, with one cache round trip"""
+    keys = {namespace.version_key: namespace for namespace in namespaces}
+    versions = cache.get_many(keys)
+    missing = {key: _new_version() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return {keys[key]: version for key, version in versions.items()}
+
+
+def _bump(namespaces):
+    for namespace in namespaces:
+        try:
+            cache.incr(namespace.version_key)
+        except ValueError:
+            # Never set or evicted
+            cache.set(namespace.version_key, _new_version(), None)
+
+
+def bump(*namespaces):
+    """
+    Invalidate everything cached in ``namespaces``.
+
+    Bumps immediately, so the current transaction reads fresh values, and
+    again on commit, so values cached by other requests from before the
+    commit are dropped as well.
+    """
+    _bump(namespaces)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _bump(namespaces))
+
+
+def bump_for_model(model):
+    namespaces = MODEL_NAMESPACES.get(model)
+    if namespaces:
+        bump(*namespaces)
+
+
+def get_categories():
+    """All categories, cached until one changes"""
+    return CATEGORIES.get_or_set('all', lambda: list(Category.objects.all()))
+
+
+def fragment_key(name, obj, *vary):
+    """
+    Key of a fragment rendered from ``obj``, e.g. a listing card.
+
+    Saving the object changes its updated_at and so the key; ``vary`` adds
+    anything else the fragment shows, such as annotated counts.
+    """
+    key = f'{name}:{obj.pk}:{obj.updated_at.timestamp()}'
+    if vary:
+        key += ':' + hashlib.md5(repr(vary).encode()).hexdigest()
+    return key
@@ -0,0 +1,80 @@
+"""
+Conditional GET for detail pages.
+
+Each page derives a strong ETag from one query over the timestamps and
+counts it displays, plus the viewer (pages differ for owners, roles and
+anonymous visitors). A matching If-None-Match is answered 304 Not Modified
+before the view loads or renders anything.
+"""
+import functools
+import hashlib
+
+from django.db.models import Func, Subquery
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from .page_cache import has_pending_messages
+
+
+def latest(queryset, field):
+    """Subquery for the newest ``field`` in ``queryset`` (use with OuterRef filters)"""
+    return Subquery(queryset.order_by(f'-{field}').values(field)[:1])
+
+
+def count(queryset):
+    """Subquery counting ``queryset``; a bare COUNT needs no GROUP BY"""
+    return Subquery(queryset.order_by().annotate(n=Func('pk', function='COUNT')).values('n'))
+
+
+def make_etag(request, state):
+    """Strong ETag for ``state`` (a sequence of values) as seen by the current viewer"""
+    viewer = (request.user.pk, str(request.role)) if request.user.is_authenticated else None
+    return hashlib.md5(repr((viewer, tuple(state))).encode()).hexdigest()
+
+
+def etag_for(state_func):
+    """
+    Wrap ``state_func(request, *args, **kwargs)`` as an etag function.
+
+    The state function returns the values the page shows, or None when the
+    object does not exist, so the view can answer 404 itself.
+    """
+    def etag(request, *args, **kwargs):
+        # Flash messages are part of the page but not of the state
+        if has_pending_messages(request):
+            return None
+        state = state_func(request, *args, **kwargs)
+        return None if state is None else make_etag(request, state)
+    return etag
+
+
+def conditional_page(state_func):
+    """
+    Decorator adding conditional GET to a function view.
+
+    Responses are marked private and no-cache: browsers keep the page but
+    revalidate it with If-None-Match on every visit.
+    """
+    etag = etag_for(state_func)
+
+    def decorator(view_func):
+        conditional_view = condition(etag_func=etag)(view_func)
+
+        @functools.wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapper
+    return decorator
+
+
+class ConditionalGetMixin:
+    """Class-based view counterpart of @conditional_page; implement get_etag_state()"""
+
+    def get_etag_state(self, request, *args, **kwargs):
+        raise NotImplementedError
+
+    def dispatch(self, request, *args, **kwargs):
+        view = conditional_page(self.get_etag_state)(super().dispatch)
+        return view(request, *args, **kwargs)
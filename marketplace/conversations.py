@@ -0,0 +1,190 @@
+"""
+Conversation summaries.
+
+Every message updates the Conversation row for its pair of users and the
+two ConversationMember rows (one per side) that make up each user's inbox,
+so listing conversations never has to aggregate the Message table.
+Changes are also pushed to the users' open real-time streams.
+"""
+from django.db import transaction
+from django.db.models import Count, F, Max, Q
+from django.db.models.functions import Greatest
+
+from .models import Message, Conversation, ConversationMember
+from . import realtime
+
+
+def _members(user_a, user_b):
+    """(user, partner) pairs for both sides of a conversation"""
+    return {(user_a, user_b), (user_b, user_a)}
+
+
+def message_json(message):
+    """Compact representation of a message for JSON responses and events"""
+    return {
+        'id': message.id,
+        'sender': message.sender_id,
+        'receiver': message.receiver_id,
+        'content': message.content,
+        'timestamp': message.timestamp.isoformat(),
+    }
+
+
+def announce_unread(user_id, partner_id):
+    """Push a user's current unread count for one conversation"""
+    unread = ConversationMember.objects.filter(user_id=user_id, partner_id=partner_id).values_list(
+        'unread_count', flat=True
+    ).first()
+    realtime.publish(user_id, 'unread', {'partner': partner_id, 'unread': unread or 0})
+
+
+def announce_message(message):
+    """Push a new message to both participants, and the receiver's new unread count"""
+    data = message_json(message)
+    for user_id in {message.sender_id, message.receiver_id}:
+        realtime.publish(user_id, 'message', data)
+    announce_unread(message.receiver_id, message.sender_id)
+
+
+def record_message(message):
+    """Fold a newly sent message into its conversation summary"""
+    low, high = sorted((message.sender_id, message.receiver_id))
+    timestamp = message.timestamp
+
+    with transaction.atomic():
+        conversation, created = Conversation.objects.get_or_create(
+            user_low_id=low, user_high_id=high,
+            defaults={'last_message': message, 'last_timestamp': timestamp},
+        )
+        if not created:
+            Conversation.objects.filter(pk=conversation.pk, last_timestamp__lte=timestamp).update(
+                last_message=message, last_timestamp=timestamp
+            )
+
+        ConversationMember.objects.bulk_create(
+            [
+                ConversationMember(
+                    conversation=conversation, user_id=user_id, partner_id=partner_id,
+                    last_timestamp=timestamp,
+                )
+                for user_id, partner_id in _members(low, high)
+            ],
+            ignore_conflicts=True,
+        )
+        ConversationMember.objects.filter(conversation=conversation, last_timestamp__lt=timestamp).update(
+            last_timestamp=timestamp
+        )
+        if not message.is_read:
+            ConversationMember.objects.filter(user_id=message.receiver_id, partner_id=message.sender_id).update(
+                unread_count=F('unread_count') + 1
+            )
+        transaction.on_commit(lambda: announce_message(message))
+
+
+def mark_read(user, partner):
+    """Mark everything ``partner`` sent ``user`` as read; returns the number of messages updated"""
+    # Reading the counter is far cheaper than an UPDATE that takes a write lock
+    if not ConversationMember.objects.filter(user=user, partner=partner, unread_count__gt=0).exists():
+        return 0
+
+    with transaction.atomic():
+        updated = Message.objects.filter(sender=partner, receiver=user, is_read=False).update(is_read=True)
+        if updated:
+            # Subtract rather than zero so a message arriving meanwhile stays counted
+            ConversationMember.objects.filter(user=user, partner=partner).update(
+                unread_count=Greatest(F('unread_count') - updated, 0)
+            )
+            transaction.on_commit(lambda: announce_unread(user.id, partner.id))
+    return updated
+
+
+def refresh_conversation(user_a, user_b):
+    """Recompute one conversation from its messages (after edits or deletes)"""
+    low, high = sorted((user_a, user_b))
+    thread = Message.objects.filter(
+        Q(sender_id=low, receiver_id=high) | Q(sender_id=high, receiver_id=low)
+    )
+
+    with transaction.atomic():
+        last_message = thread.order_by('-timestamp', '-id').first()
+        if last_message is None:
+            Conversation.objects.filter(user_low_id=low, user_high_id=high).delete()
+            return
+
+        conversation, _ = Conversation.objects.update_or_create(
+            user_low_id=low, user_high_id=high,
+            defaults={'last_message': last_message, 'last_timestamp': last_message.timestamp},
+        )
+        for user_id, partner_id in _members(low, high):
+            unread = thread.filter(sender_id=partner_id, receiver_id=user_id, is_read=False).count()
+            ConversationMember.objects.update_or_create(
+                user_id=user_id, partner_id=partner_id,
+                defaults={
+                    'conversation': conversation,
+                    'unread_count': unread,
+                    'last_timestamp': last_message.timestamp,
+                },
+            )
+
+
+def rebuild_conversations(message_model, conversation_model, member_model, using='default', batch_size=1000):
+    """
+    Rebuild every conversation summary from the Message table.
+
+    Takes the model classes so data migrations can pass historical models.
+    Returns the number of conversations written.
+    """
+    messages = message_model.objects.using(using).order_by()
+
+    # Latest message per unordered pair of users
+    last_ids = {}
+    for sender_id, receiver_id, last_id in messages.values_list('sender', 'receiver').annotate(last_id=Max('id')):
+        pair = tuple(sorted((sender_id, receiver_id)))
+        last_ids[pair] = max(last_ids.get(pair, 0), last_id)
+
+    # Unread counters keyed by (reader, partner)
+    unread = {
+        (receiver_id, sender_id): count
+        for sender_id, receiver_id, count in (
+            messages.filter(is_read=False).values_list('sender', 'receiver').annotate(count=Count('id'))
+        )
+    }
+
+    id_list = list(last_ids.values())
+    timestamps = {}
+    for start in range(0, len(id_list), batch_size):
+        timestamps.update(
+            messages.filter(id__in=id_list[start:start + batch_size]).values_list('id', 'timestamp')
+        )
+
+    member_model.objects.using(using).all().delete()
+    conversation_model.objects.using(using).all().delete()
+
+    conversation_model.objects.using(using).bulk_create(
+        [
+            conversation_model(
+                user_low_id=low, user_high_id=high,
+                last_message_id=last_id, last_timestamp=timestamps[last_id],
+            )
+            for (low, high), last_id in last_ids.items()
+        ],
+        batch_size=batch_size,
+    )
+    conversation_ids = {
+        (low, high): pk
+        for pk, low, high in conversation_model.objects.using(using).values_list('id', 'user_low', 'user_high')
+    }
+
+    member_model.objects.using(using).bulk_create(
+        [
+            member_model(
+                conversation_id=conversation_ids[pair], user_id=user_id, partner_id=partner_id,
+                unread_count=unread.get((user_id, partner_id), 0),
+                last_timestamp=timestamps[last_id],
+            )
+            for pair, last_id in last_ids.items()
+            for user_id, partner_id in _members(*pair)
+        ],
+        batch_size=batch_size,
+    )
+    return len(last_ids)
@@ -0,0 +1,85 @@
+"""
+Freelancer earnings ledger.
+
+Completing an order appends one EarningsEntry; the unique constraint on
+the order makes crediting idempotent, however often the order is saved.
+Balances (FreelancerProfile.total_earnings and UserStats.total_earned) move
+with F() expressions in the same transaction as the entry, so they always
+equal the sum of the ledger.
+"""
+from decimal import Decimal
+
+from django.apps import apps as global_apps
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import EarningsEntry, FreelancerProfile, UserStats
+
+
+def move_balances(freelancer_id, amount):
+    """Add ``amount`` (negative to reverse) to a freelancer's balances"""
+    FreelancerProfile.objects.filter(user_id=freelancer_id).update(
+        total_earnings=F('total_earnings') + amount, updated_at=timezone.now()
+    )
+    UserStats.objects.filter(user_id=freelancer_id).update(total_earned=F('total_earned') + amount)
+
+
+def credit_order(order):
+    """Credit a completed order to its freelancer once; returns False if already credited"""
+    amount = Decimal(str(order.price))
+    try:
+        with transaction.atomic():
+            EarningsEntry.objects.create(order_id=order.pk, freelancer_id=order.freelancer_id, amount=amount)
+            move_balances(order.freelancer_id, amount)
+    except IntegrityError:
+        return False
+    return True
+
+
+def rebuild_earnings(batch_size=1000, apps=global_apps, using='default'):
+    """
+    Credit completed orders missing from the ledger, then recompute every
+    balance from the ledger with one grouped query.
+
+    Returns (entries added, profiles corrected).
+    """
+    Order = apps.get_model('marketplace', 'Order')
+    Entry = apps.get_model('marketplace', 'EarningsEntry')
+    Profile = apps.get_model('marketplace', 'FreelancerProfile')
+    Stats = apps.get_model('marketplace', 'UserStats')
+
+    missing = (
+        Order.objects.using(using).filter(status='Completed', earnings_entries__isnull=True)
+        .order_by('pk').values_list('pk', 'freelancer', 'price')
+    )
+    added = len(Entry.objects.using(using).bulk_create(
+        [
+            Entry(order_id=order_id, freelancer_id=freelancer_id, amount=price)
+            for order_id, freelancer_id, price in missing.iterator()
+        ],
+        batch_size=batch_size,
+        ignore_conflicts=True,
+    ))
+
+    balances = dict(
+        Entry.objects.using(using).order_by().values_list('freelancer').annotate(Sum('amount'))
+    )
+
+    changed = []
+    for profile in Profile.objects.using(using).only('id', 'user_id', 'total_earnings').iterator():
+        balance = balances.get(profile.user_id) or Decimal('0')
+        if profile.total_earnings != balance:
+            profile.total_earnings = balance
+            changed.append(profile)
+    Profile.objects.using(using).bulk_update(changed, ['total_earnings'], batch_size=batch_size)
+
+    stale = []
+    for row in Stats.objects.using(using).only('id', 'user_id', 'total_earned').iterator():
+        balance = balances.get(row.user_id) or Decimal('0')
+        if row.total_earned != balance:
+            row.total_earned = balance
+            stale.append(row)
+    Stats.objects.using(using).bulk_update(stale, ['total_earned'], batch_size=batch_size)
+
+    return added, len(changed)
@@ -0,0 +1,11 @@
+"""
+Domain events.
+
+Sent for state changes made with bulk UPDATEs, which bypass model signals.
+Receivers live in signals.py alongside the model signal receivers.
+"""
+from django.dispatch import Signal
+
+# Sent once per real order status change with ``order`` (already holding the
+# new status) and ``previous`` (the status it moved from)
+order_status_changed = Signal()
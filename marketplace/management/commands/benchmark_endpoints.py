@@ -0,0 +1,151 @@
+"""
+Management command to benchmark every marketplace endpoint against a generated dataset
+"""
+import json
+import os
+import tempfile
+import uuid
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+from marketplace import benchmarks
+
+# generate_load_data row counts at --size 1
+DATASET = {
+    'freelancers': 1000, 'clients': 1000, 'gigs': 3000, 'jobs': 2000,
+    'bids': 20000, 'orders': 10000, 'messages': 50000,
+}
+PREFIX = 'bench'
+# Views wrapped in @anonymous_page_cache / AnonymousPageCacheMixin
+PAGE_CACHED = ('home', 'gig_list', 'job_list')
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks every URL as anonymous, freelancer and client users and compares against a baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--size', type=float, default=1.0,
+            help='Dataset scale; 1.0 is 1000 freelancers, 20000 bids, 50000 messages... (default: 1.0)',
+        )
+        parser.add_argument('--seed', type=int, default=1, help='Dataset seed (default: 1)')
+        parser.add_argument('--iterations', type=int, default=20, help='Timed requests per endpoint (default: 20)')
+        parser.add_argument('--warmup', type=int, default=3, help='Untimed requests per endpoint (default: 3)')
+        parser.add_argument(
+            '--role', action='append', dest='roles', choices=benchmarks.ROLES,
+            help='Only benchmark this role (may be repeated)',
+        )
+        parser.add_argument(
+            '--endpoint', action='append', dest='names',
+            help='Only benchmark this URL name (may be repeated)',
+        )
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+        parser.add_argument('--baseline', help='Compare with a JSON file written by --output; fail on regressions')
+        parser.add_argument(
+            '--threshold', type=float, default=25,
+            help='Allowed p95 latency growth over the baseline, in percent (default: 25)',
+        )
+        parser.add_argument(
+            '--min-ms', type=float, default=2.0,
+            help='Ignore latency changes smaller than this many milliseconds (default: 2)',
+        )
+        parser.add_argument(
+            '--keepdb', action='store_true',
+            help='Keep the benchmark database (and its dataset) between runs; on SQLite it lives in the temp directory',
+        )
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            try:
+                with open(options['baseline']) as f:
+                    baseline = json.load(f)['results']
+            except (OSError, ValueError, KeyError) as e:
+                raise CommandError(f"Cannot read baseline {options['baseline']}: {e}")
+
+        verbosity = options['verbosity']
+        old_name = connection.settings_dict['NAME']
+        test_settings = connection.settings_dict.setdefault('TEST', {})
+        if connection.vendor == 'sqlite' and not test_settings.get('NAME'):
+            # Django's SQLite test database is in memory, which --keepdb cannot keep
+            test_settings['NAME'] = os.path.join(tempfile.gettempdir(), 'marketplace-benchmark.sqlite3')
+        # A separate database, like the test runner's, so the dataset never mixes with real data
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keepdb'], serialize=False)
+        try:
+            with override_settings(
+                DEBUG=False,
+                QUERY_BUDGET_RAISE=False,
+                ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+                # A fresh key prefix keeps earlier runs' cached pages out of the measurements
+                CACHES={
+                    alias: {**config, 'KEY_PREFIX': f"{config.get('KEY_PREFIX', '')}-bench-{uuid.uuid4().hex[:8]}"}
+                    for alias, config in settings.CACHES.items()
+                },
+            ):
+                self.generate(options)
+                dataset = benchmarks.describe_dataset()
+                self.stdout.write(f"Dataset: {', '.join(f'{k}={v}' for k, v in dataset.items())}\n")
+                self.stdout.write(
+                    'Anonymous ' + ', '.join(PAGE_CACHED) + ' pages are served from the page cache after the '
+                    'warmup requests, so their figures (marked *) measure cache hits\n'
+                )
+                self.stdout.write(f"{'endpoint':<36} {'status':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'queries':>7} {'bytes':>8}")
+                results = benchmarks.run(
+                    iterations=options['iterations'], warmup=options['warmup'],
+                    roles=options['roles'] or benchmarks.ROLES, names=options['names'], progress=self.report,
+                )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+
+        if options['output']:
+            report = {
+                'created': timezone.now().isoformat(),
+                'options': {key: options[key] for key in ('size', 'seed', 'iterations', 'warmup')},
+                'dataset': dataset,
+                'results': results,
+            }
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+            self.stdout.write(f"\nWrote {options['output']}")
+
+        if baseline is not None:
+            regressions = benchmarks.compare(
+                results, baseline, threshold=options['threshold'] / 100, min_ms=options['min_ms'],
+            )
+            for key, reason in regressions:
+                self.stdout.write(self.style.ERROR(f'REGRESSION {key}: {reason}'))
+            if regressions:
+                raise CommandError(f'{len(regressions)} endpoint(s) regressed against {options["baseline"]}')
+            self.stdout.write(self.style.SUCCESS(f"\nNo regressions against {options['baseline']}"))
+        elif verbosity:
+            self.stdout.write(self.style.SUCCESS('\nBenchmark finished!'))
+
+    def generate(self, options):
+        if User.objects.filter(username__startswith=f'{PREFIX}_').exists():
+            self.stdout.write('Reusing the kept benchmark dataset')
+            return
+        counts = {name: max(1, int(count * options['size'])) for name, count in DATASET.items()}
+        started = timezone.now()
+        call_command(
+            'generate_load_data', prefix=PREFIX, seed=options['seed'],
+            stdout=self.stdout if options['verbosity'] > 1 else StringIO(), **counts,
+        )
+        self.stdout.write(f'Generated the dataset in {(timezone.now() - started).total_seconds():.1f}s')
+
+    def report(self, key, result):
+        name, role = key.rsplit(':', 1)
+        if role == 'anonymous' and name in PAGE_CACHED:
+            key += ' *'
+        if 'skipped' in result:
+            self.stdout.write(f"{key:<36} skipped: {result['skipped']}")
+            return
+        self.stdout.write(
+            f"{key:<36} {result['status']:>6} {result['p50_ms']:>7.1f}ms {result['p95_ms']:>7.1f}ms "
+            f"{result['p99_ms']:>7.1f}ms {result['queries']:>7} {result['bytes']:>8}"
+        )
@@ -0,0 +1,66 @@
+"""
+Management command to compare stock and tuned SQLite under concurrent writes
+"""
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from marketplace import sqlite
+
+
+class Command(BaseCommand):
+    help = 'Measures read and write throughput of stock and tuned SQLite with concurrent writer and reader processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=4, help='Writer processes (default: 4)')
+        parser.add_argument('--readers', type=int, default=4, help='Reader processes (default: 4)')
+        parser.add_argument('--seconds', type=float, default=5.0, help='Duration of each run (default: 5)')
+        parser.add_argument('--threads', type=int, default=200, help='Message threads written to (default: 200)')
+        parser.add_argument(
+            '--messages', type=int, default=20000, help='Messages in the database before the run (default: 20000)',
+        )
+        parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+        parser.add_argument(
+            '--profile', action='append', dest='profiles', choices=sqlite.PROFILES,
+            help='Only run this profile (may be repeated)',
+        )
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+
+    def handle(self, *args, **options):
+        if options['writers'] < 1 or options['seconds'] <= 0:
+            raise CommandError('--writers and --seconds must be positive')
+
+        results = {}
+        for profile in options['profiles'] or sqlite.PROFILES:
+            self.stdout.write(f'Running {profile}...')
+            results[profile] = sqlite.run_benchmark(
+                profile, writers=options['writers'], readers=options['readers'], seconds=options['seconds'],
+                threads=options['threads'], messages=options['messages'], seed=options['seed'],
+            )
+
+        self.stdout.write(
+            f"\n{'profile':<8} {'writes/s':>10} {'locked':>8} {'write p95':>10} "
+            f"{'reads/s':>10} {'locked':>8} {'read p95':>10}"
+        )
+        for profile, result in results.items():
+            self.stdout.write(
+                f"{profile:<8} {result['writes_per_s']:>10} {result['writes_locked']:>8} "
+                f"{self.ms(result['writes_p95_ms']):>10} {result['reads_per_s']:>10} "
+                f"{result['reads_locked']:>8} {self.ms(result['reads_p95_ms']):>10}"
+            )
+        if len(results) == 2:
+            stock, tuned = results['stock'], results['tuned']
+            for kind in ('writes', 'reads'):
+                if stock[f'{kind}_per_s']:
+                    self.stdout.write(
+                        f"{kind.capitalize()}: {tuned[f'{kind}_per_s'] / stock[f'{kind}_per_s']:.1f}x with tuning"
+                    )
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+        self.stdout.write(self.style.SUCCESS('\nSQLite benchmark completed successfully!'))
+
+    @staticmethod
+    def ms(value):
+        return '-' if value is None else f'{value}ms'
@@ -0,0 +1,377 @@
+"""
+Management command to generate a large synthetic marketplace for load testing
+"""
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from marketplace import caching
+from marketplace.models import (
+    FreelancerProfile, ClientProfile, Category, Skill, FreelancerSkill, Gig, Job,
+    Bid, Order, Message, Review
+)
+from marketplace.skills import parse_skills
+
+SKILLS = [
+    'Python', 'Django', 'JavaScript', 'React', 'Vue', 'Node.js', 'Go', 'Rust', 'SQL', 'PostgreSQL',
+    'Figma', 'Photoshop', 'Illustrator', 'SEO', 'Copywriting', 'Video Editing', 'After Effects',
+    'Swift', 'Kotlin', 'Flutter', 'Machine Learning', 'Data Analysis', 'Excel', 'WordPress',
+]
+
+WORDS = (
+    'build design fast clean modern website app api landing page logo brand mobile responsive '
+    'data dashboard report video edit script blog article content marketing campaign store shop '
+    'integration payment booking portfolio startup launch redesign fix update migrate scale'
+).split()
+
+# Relative frequencies of generated statuses and ratings
+JOB_STATUSES = (['Open', 'In Progress', 'Completed', 'Cancelled'], [60, 20, 15, 5])
+ORDER_STATUSES = (['Completed', 'In Progress', 'Cancelled', 'Pending'], [60, 25, 10, 5])
+RATINGS = ([5, 4, 3, 2, 1], [55, 25, 10, 5, 5])
+MAX_THREAD = 2000
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """Let bulk_create keep the created_at/updated_at values we set instead of stamping now()"""
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def zipf_weights(count, exponent):
+    """Cumulative power-law weights: the item at rank r is picked in proportion to 1 / r**exponent"""
+    return list(accumulate(1 / rank ** exponent for rank in range(1, count + 1)))
+
+
+class Command(BaseCommand):
+    help = 'Bulk-generates users, gigs, jobs, bids, orders, reviews and messages, then rebuilds derived data'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--freelancers', type=int, default=1000, help='Number of freelancers (default: 1000)')
+        parser.add_argument('--clients', type=int, default=1000, help='Number of clients (default: 1000)')
+        parser.add_argument('--gigs', type=int, default=3000, help='Number of gigs (default: 3000)')
+        parser.add_argument('--jobs', type=int, default=2000, help='Number of jobs (default: 2000)')
+        parser.add_argument('--bids', type=int, default=20000, help='Approximate number of bids (default: 20000)')
+        parser.add_argument('--orders', type=int, default=10000, help='Number of gig orders (default: 10000)')
+        parser.add_argument('--messages', type=int, default=50000, help='Number of messages (default: 50000)')
+        parser.add_argument(
+            '--review-rate', type=float, default=0.7,
+            help='Share of completed orders that get a review (default: 0.7)',
+        )
+        parser.add_argument('--days', type=int, default=365, help='Spread activity over this many days (default: 365)')
+        parser.add_argument('--prefix', default='load', help='Username prefix for generated users (default: load)')
+        parser.add_argument('--seed', type=int, default=None, help='Random seed for a reproducible data set')
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Number of rows written per INSERT (default: 5000)',
+        )
+        parser.add_argument(
+            '--skip-rebuild', action='store_true',
+            help='Do not rebuild denormalized fields afterwards (run the rebuild commands yourself)',
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        self.start = self.now - timedelta(days=options['days'])
+        prefix = options['prefix']
+
+        if options['freelancers'] < 1 or options['clients'] < 1:
+            raise CommandError('At least one freelancer and one client are needed.')
+        if User.objects.filter(username__startswith=f'{prefix}_').exists():
+            raise CommandError(f"Users named '{prefix}_*' already exist; pass a different --prefix.")
+
+        categories = list(Category.objects.values_list('id', flat=True))
+        if not categories:
+            call_command('create_categories', stdout=self.stdout)
+            categories = list(Category.objects.values_list('id', flat=True))
+        self.categories = categories + [None]
+
+        started = timezone.now()
+        # Signals do not fire for bulk_create; derived data is rebuilt below instead
+        with transaction.atomic(), explicit_timestamps(
+            User, FreelancerProfile, ClientProfile, Gig, Job, Bid, Order, Message, Review
+        ):
+            freelancers = self.create_users(f'{prefix}_freelancer', options['freelancers'])
+            clients = self.create_users(f'{prefix}_client', options['clients'])
+            self.create_profiles(freelancers, clients)
+            gigs = self.create_gigs(freelancers, options['gigs'])
+            job_orders = self.create_jobs_and_bids(clients, freelancers, options['jobs'], options['bids'])
+            self.create_orders(gigs, clients, job_orders, options['orders'])
+            self.create_messages(freelancers, clients, options['messages'])
+        self.stdout.write(f'Inserted in {(timezone.now() - started).total_seconds():.1f}s')
+
+        if not options['skip_rebuild']:
+            self.rebuild()
+        self.stdout.write(self.style.SUCCESS('\nLoad data generated successfully!'))
+
+    # ==================== Helpers ====================
+
+    def moment(self, after=None):
+        """Random time between ``after`` (or the start of the window) and now"""
+        after = after or self.start
+        return after + (self.now - after) * self.rng.random()
+
+    def text(self, words):
+        return ' '.join(self.rng.choices(WORDS, k=words)).capitalize()
+
+    def insert(self, model, objects):
+        model.objects.bulk_create(objects, batch_size=self.batch_size)
+        return objects
+
+    def chunks(self, total):
+        """Yield (start, size) pairs covering ``total`` rows one batch at a time"""
+        for start in range(0, total, self.batch_size):
+            yield start, min(self.batch_size, total - start)
+
+    def report(self, count, label):
+        self.stdout.write(f'Created {count} {label}')
+
+    # ==================== Generators ====================
+
+    def create_users(self, name, count):
+        """Users in insertion order, each paired with its join date; one shared password hash"""
+        password = make_password('password123')
+        users = []
+        for start, size in self.chunks(count):
+            batch = []
+            for number in range(start, start + size):
+                joined = self.moment()
+                batch.append(User(
+                    username=f'{name}{number}', email=f'{name}{number}@example.com',
+                    password=password, date_joined=joined,
+                ))
+            users.extend((user.pk, user.date_joined) for user in self.insert(User, batch))
+        self.report(count, f'{name} users')
+        return users
+
+    def create_profiles(self, freelancers, clients):
+        skills = {slug: name for name, slug in parse_skills(', '.join(SKILLS))}
+        Skill.objects.bulk_create(
+            [Skill(name=name, slug=slug) for slug, name in skills.items()], ignore_conflicts=True
+        )
+        skill_ids = dict(Skill.objects.filter(slug__in=skills).values_list('slug', 'id'))
+
+        for start, size in self.chunks(len(freelancers)):
+            profiles, chosen = [], []
+            for user_id, joined in freelancers[start:start + size]:
+                picked = self.rng.sample(list(skills), self.rng.randint(1, 5))
+                chosen.append(picked)
+                profiles.append(FreelancerProfile(
+                    user_id=user_id, skills=', '.join(skills[slug] for slug in picked),
+                    bio=self.text(30), experience=self.rng.randint(0, 20),
+                    hourly_rate=Decimal(self.rng.randint(5, 150)), created_at=joined, updated_at=joined,
+                ))
+            self.insert(FreelancerProfile, profiles)
+            self.insert(FreelancerSkill, [
+                FreelancerSkill(profile_id=profile.pk, skill_id=skill_ids[slug])
+                for profile, picked in zip(profiles, chosen) for slug in picked
+            ])
+
+        for start, size in self.chunks(len(clients)):
+            self.insert(ClientProfile, [
+                ClientProfile(
+                    user_id=user_id, company_name=self.text(2), contact_info=f'client{user_id}@example.com',
+                    created_at=joined, updated_at=joined,
+                )
+                for user_id, joined in clients[start:start + size]
+            ])
+        self.report(len(freelancers) + len(clients), 'profiles')
+
+    def create_gigs(self, freelancers, count):
+        """Gigs owned mostly by a few prolific freelancers; returns (id, freelancer_id, price, created_at)"""
+        weights = zipf_weights(len(freelancers), 0.8)
+        gigs = []
+        for start, size in self.chunks(count):
+            batch = []
+            for user_id, joined in self.rng.choices(freelancers, cum_weights=weights, k=size):
+                created = self.moment(joined)
+                batch.append(Gig(
+                    freelancer_id=user_id, title=self.text(5), description=self.text(60),
+                    category_id=self.rng.choice(self.categories),
+                    price=Decimal(int(self.rng.lognormvariate(4.5, 0.8)) + 5),
+                    delivery_time=self.rng.randint(1, 30), is_active=self.rng.random() < 0.9,
+                    created_at=created, updated_at=created,
+                ))
+            gigs.extend((gig.pk, gig.freelancer_id, gig.price, gig.created_at) for gig in self.insert(Gig, batch))
+        self.report(count, 'gigs')
+        return gigs
+
+    def create_jobs_and_bids(self, clients, freelancers, count, total_bids):
+        """
+        Jobs with a heavy-tailed number of bids each. Jobs that are under way
+        or done get one accepted bid; returns the orders those bids create as
+        (client_id, freelancer_id, job_id, price, status, created_at).
+        """
+        client_weights = zipf_weights(len(clients), 0.6)
+        # A few jobs draw hundreds of proposals, most draw a handful
+        job_weights = zipf_weights(count, 0.9)
+        bid_counts = [0] * count
+        for index in self.rng.choices(range(count), cum_weights=job_weights, k=total_bids):
+            bid_counts[index] += 1
+        self.rng.shuffle(bid_counts)
+
+        freelancer_ids = [user_id for user_id, _ in freelancers]
+        job_orders = []
+        bids = []
+        bid_total = 0
+        for start, size in self.chunks(count):
+            jobs = []
+            for user_id, joined in self.rng.choices(clients, cum_weights=client_weights, k=size):
+                created = self.moment(joined)
+                jobs.append(Job(
+                    client_id=user_id, title=self.text(6), description=self.text(80),
+                    budget=Decimal(int(self.rng.lognormvariate(5.5, 1)) + 10),
+                    deadline=(created + timedelta(days=self.rng.randint(7, 90))).date(),
+                    category_id=self.rng.choice(self.categories),
+                    status=self.rng.choices(*JOB_STATUSES)[0], created_at=created, updated_at=created,
+                ))
+            self.insert(Job, jobs)
+
+            for job, bid_count in zip(jobs, bid_counts[start:start + size]):
+                if job.status in ('In Progress', 'Completed'):
+                    bid_count = max(bid_count, 1)
+                bidders = self.rng.sample(freelancer_ids, min(bid_count, len(freelancer_ids)))
+                accepted = self.rng.randrange(len(bidders)) if job.status in ('In Progress', 'Completed') else None
+                for position, freelancer_id in enumerate(bidders):
+                    status = 'Pending' if job.status == 'Open' else 'Rejected'
+                    if position == accepted:
+                        status = 'Accepted'
+                    amount = Decimal(max(1, int(job.budget * Decimal(self.rng.uniform(0.5, 1.3)))))
+                    placed = self.moment(job.created_at)
+                    bids.append(Bid(
+                        job_id=job.pk, freelancer_id=freelancer_id, proposal_text=self.text(40),
+                        bid_amount=amount, delivery_days=self.rng.randint(1, 60), status=status,
+                        created_at=placed,
+                    ))
+                    if status == 'Accepted':
+                        job_orders.append((job.client_id, freelancer_id, job.pk, amount, job.status, placed))
+                if len(bids) >= self.batch_size:
+                    bid_total += len(self.insert(Bid, bids))
+                    bids = []
+        if bids:
+            bid_total += len(self.insert(Bid, bids))
+        self.report(count, 'jobs')
+        self.report(bid_total, 'bids')
+        return job_orders
+
+    def create_orders(self, gigs, clients, job_orders, count):
+        """Gig orders with power-law orders per freelancer, the accepted jobs' orders, and reviews"""
+        if not gigs:
+            count = 0
+        # Rank freelancers (not gigs) so one freelancer's gigs share a popularity
+        owners = list(dict.fromkeys(freelancer_id for _, freelancer_id, _, _ in gigs))
+        self.rng.shuffle(owners)
+        rank = {freelancer_id: position for position, freelancer_id in enumerate(owners, 1)}
+        gig_weights = list(accumulate(1 / rank[freelancer_id] for _, freelancer_id, _, _ in gigs))
+
+        def gig_orders():
+            for gig_id, freelancer_id, price, created in self.rng.choices(gigs, cum_weights=gig_weights, k=count):
+                client_id, _ = self.rng.choice(clients)
+                yield client_id, freelancer_id, gig_id, None, price, self.rng.choices(*ORDER_STATUSES)[0], created
+
+        def accepted_orders():
+            for client_id, freelancer_id, job_id, price, status, created in job_orders:
+                yield client_id, freelancer_id, None, job_id, price, status, created
+
+        order_total = review_total = 0
+        for source in (gig_orders(), accepted_orders()):
+            batch = []
+            for row in source:
+                batch.append(row)
+                if len(batch) >= self.batch_size:
+                    added, reviewed = self.insert_orders(batch)
+                    order_total, review_total = order_total + added, review_total + reviewed
+                    batch = []
+            if batch:
+                added, reviewed = self.insert_orders(batch)
+                order_total, review_total = order_total + added, review_total + reviewed
+        self.report(order_total, 'orders')
+        self.report(review_total, 'reviews')
+
+    def insert_orders(self, rows):
+        orders = []
+        for client_id, freelancer_id, gig_id, job_id, price, status, after in rows:
+            created = self.moment(after)
+            orders.append(Order(
+                client_id=client_id, freelancer_id=freelancer_id, gig_id=gig_id, job_id=job_id,
+                price=price, status=status, created_at=created,
+                completed_at=self.moment(created) if status == 'Completed' else None,
+            ))
+        self.insert(Order, orders)
+
+        reviews = [
+            Review(
+                order_id=order.pk, rating=self.rng.choices(*RATINGS)[0], review_text=self.text(20),
+                created_at=self.moment(order.completed_at),
+            )
+            for order in orders
+            if order.status == 'Completed' and self.rng.random() < self.options['review_rate']
+        ]
+        self.insert(Review, reviews)
+        return len(orders), len(reviews)
+
+    def create_messages(self, freelancers, clients, count):
+        """Threads between clients and freelancers; thread lengths are heavy-tailed, so a few run very long"""
+        messages = []
+        total = threads = 0
+        pairs = set()
+        while total < count and len(pairs) < len(freelancers) * len(clients):
+            pair = (self.rng.choice(clients)[0], self.rng.choice(freelancers)[0])
+            if pair in pairs:
+                continue
+            pairs.add(pair)
+            threads += 1
+            length = min(count - total, MAX_THREAD, int(self.rng.paretovariate(1.1) * 3))
+            sent = self.moment()
+            # The tail of a thread may still be unread by its receiver
+            unread_from = length - self.rng.choice([0, 0, 0, 1, 2, 5])
+            for position in range(length):
+                sender, receiver = pair if self.rng.random() < 0.5 else pair[::-1]
+                sent += timedelta(minutes=self.rng.expovariate(1 / 240))
+                messages.append(Message(
+                    sender_id=sender, receiver_id=receiver, content=self.text(self.rng.randint(3, 40)),
+                    timestamp=min(sent, self.now), is_read=position < unread_from,
+                ))
+            total += length
+            if len(messages) >= self.batch_size:
+                self.insert(Message, messages)
+                messages = []
+        if messages:
+            self.insert(Message, messages)
+        self.report(total, f'messages in {threads} threads')
+
+    # ==================== Rebuild ====================
+
+    def rebuild(self):
+        """Run every reconciliation command over the new rows"""
+        for command in (
+            'rebuild_bid_stats', 'reconcile_ratings', 'rebuild_earnings', 'rebuild_user_stats',
+            'rebuild_conversations', 'rebuild_search_index',
+        ):
+            started = timezone.now()
+            call_command(command, stdout=self.stdout, no_color=self.options['no_color'])
+            self.stdout.write(f'{command} took {(timezone.now() - started).total_seconds():.1f}s')
+        caching.bump(
+            caching.GIGS, caching.JOBS, caching.CATEGORIES, caching.ORDERS, caching.REVIEWS, caching.CARDS,
+        )
@@ -0,0 +1,51 @@
+"""
+Management command to list the heaviest query fingerprints
+"""
+from django.core.management.base import BaseCommand
+from marketplace.models import QueryFingerprint
+from marketplace.query_log import ORDERINGS, top_fingerprints
+
+
+class Command(BaseCommand):
+    help = 'Lists the query fingerprints recorded by the query log, heaviest first'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--order', choices=sorted(ORDERINGS), default='total',
+            help='Rank by total, mean or max time, calls, rows or slow calls (default: total)',
+        )
+        parser.add_argument(
+            '--limit', type=int, default=20,
+            help='Number of fingerprints shown (default: 20)',
+        )
+        parser.add_argument(
+            '--explain', action='store_true',
+            help='Show where each statement last ran slowly and its EXPLAIN plan',
+        )
+        parser.add_argument(
+            '--reset', action='store_true',
+            help='Delete all recorded fingerprints instead of listing them',
+        )
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            deleted, _ = QueryFingerprint.objects.all().delete()
+            self.stdout.write(self.style.SUCCESS(f'\nDeleted {deleted} query fingerprints successfully!'))
+            return
+
+        fingerprints = list(top_fingerprints(options['order'], options['limit']))
+        if not fingerprints:
+            self.stdout.write('No queries recorded yet; set QUERY_LOG=True to start recording')
+            return
+        self.stdout.write(
+            f"{'calls':>9} {'total ms':>11} {'mean ms':>9} {'max ms':>9} {'rows':>9} {'slow':>6}  statement"
+        )
+        for entry in fingerprints:
+            self.stdout.write(
+                f'{entry.calls:>9} {entry.total_time:>11.1f} {entry.mean_time:>9.2f} {entry.max_time:>9.1f} '
+                f'{entry.rows:>9} {entry.slow_calls:>6}  {entry.statement}'
+            )
+            if options['explain'] and entry.last_origin:
+                self.stdout.write(f'    last slow call: {entry.last_origin}')
+                for line in entry.last_explain.splitlines():
+                    self.stdout.write(f'    {line}')
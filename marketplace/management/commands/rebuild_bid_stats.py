@@ -0,0 +1,22 @@
+"""
+Management command to recompute job bid statistics from their bids
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from marketplace.bid_stats import rebuild_bid_stats
+
+
+class Command(BaseCommand):
+    help = 'Recomputes bid_count, min_bid, avg_bid and median_delivery_days for every job'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of jobs written per batch (default: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            corrected = rebuild_bid_stats(batch_size=options['batch_size'])
+        self.stdout.write(f'Corrected {corrected} jobs')
+        self.stdout.write(self.style.SUCCESS('\nBid statistics rebuilt successfully!'))
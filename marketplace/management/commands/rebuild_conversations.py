@@ -0,0 +1,25 @@
+"""
+Management command to rebuild conversation summaries from messages
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from marketplace.models import Message, Conversation, ConversationMember
+from marketplace.conversations import rebuild_conversations
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the inbox conversation summaries from the Message table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of rows written per batch (default: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            total = rebuild_conversations(
+                Message, Conversation, ConversationMember, batch_size=options['batch_size'],
+            )
+        self.stdout.write(f'Rebuilt {total} conversations')
+        self.stdout.write(self.style.SUCCESS('\nConversation summaries rebuilt successfully!'))
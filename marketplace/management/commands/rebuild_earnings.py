@@ -0,0 +1,22 @@
+"""
+Management command to rebuild freelancer earnings from the ledger
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from marketplace.earnings import rebuild_earnings
+
+
+class Command(BaseCommand):
+    help = 'Credits completed orders missing from the earnings ledger and recomputes every balance from it'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of rows written per batch (default: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            added, corrected = rebuild_earnings(batch_size=options['batch_size'])
+        self.stdout.write(f'Added {added} ledger entries, corrected {corrected} balances')
+        self.stdout.write(self.style.SUCCESS('\nEarnings rebuilt successfully!'))
@@ -0,0 +1,50 @@
+"""
+Management command to rebuild the full-text search index
+"""
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from marketplace.models import Gig, Job
+from marketplace.search import get_backend, gig_rows, job_rows
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the gig and job full-text search index in bulk'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=2000,
+            help='Number of rows written per batch (default: 2000)',
+        )
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        if backend.vendor is None:
+            self.stdout.write(
+                self.style.WARNING(f'No full-text backend for {connection.vendor}; nothing to rebuild.')
+            )
+            return
+
+        chunk_size = options['chunk_size']
+        sources = [
+            ('gig', gig_rows(Gig.objects.order_by('pk'))),
+            ('job', job_rows(Job.objects.order_by('pk'))),
+        ]
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            backend.install(cursor)
+            for kind, rows in sources:
+                backend.clear(cursor, kind)
+                total = 0
+                batch = []
+                for row in rows.iterator(chunk_size=chunk_size):
+                    batch.append(row)
+                    if len(batch) >= chunk_size:
+                        backend.upsert(cursor, kind, batch)
+                        total += len(batch)
+                        batch = []
+                if batch:
+                    backend.upsert(cursor, kind, batch)
+                    total += len(batch)
+                self.stdout.write(f'Indexed {total} {kind}s')
+
+        self.stdout.write(self.style.SUCCESS('\nSearch index rebuilt successfully!'))
@@ -0,0 +1,20 @@
+"""
+Management command to rebuild dashboard statistics from orders, gigs, jobs and bids
+"""
+from django.core.management.base import BaseCommand
+from marketplace.stats import rebuild_user_stats
+
+
+class Command(BaseCommand):
+    help = 'Recomputes every UserStats row with conditional aggregates'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int, action='append', dest='user_ids',
+            help='Only rebuild this user id (may be repeated)',
+        )
+
+    def handle(self, *args, **options):
+        total = rebuild_user_stats(options['user_ids'])
+        self.stdout.write(f'Rebuilt stats for {total} users')
+        self.stdout.write(self.style.SUCCESS('\nUser stats rebuilt successfully!'))
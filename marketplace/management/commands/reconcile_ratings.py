@@ -0,0 +1,22 @@
+"""
+Management command to reconcile freelancer rating totals with their reviews
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from marketplace.ratings import reconcile_ratings
+
+
+class Command(BaseCommand):
+    help = 'Recomputes rating_sum, rating_count and rating for every freelancer profile'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of profiles written per batch (default: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            corrected = reconcile_ratings(batch_size=options['batch_size'])
+        self.stdout.write(f'Corrected {corrected} profiles')
+        self.stdout.write(self.style.SUCCESS('\nRatings reconciled successfully!'))
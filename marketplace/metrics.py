@@ -0,0 +1,344 @@
+"""
+Prometheus metrics.
+
+Counters, gauges and histograms are kept per process. After requests (at
+most once per METRICS_WRITE_SECONDS) and, once it has served one, at exit
+each process writes them to METRICS_DIR/<pid>-<start time>.json, and the
+/metrics view merges every file, so a scrape answered by any gunicorn
+worker reports the totals of all of them. The start time tells a reused
+pid from the exited worker that had it. Scrapes fold the counters and
+histograms of exited workers into EXITED_FILE and delete their files, so
+totals stay monotonic without files piling up; gauges only count live
+processes. Without METRICS_DIR each process reports its own values.
+render() produces the Prometheus text exposition format, version 0.0.4.
+"""
+import atexit
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: a single development process, nothing to serialize
+    fcntl = None
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Seconds; the Prometheus client libraries' defaults
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry = {}
+# (metric name, label values) -> number, or for histograms a list of
+# per-bucket counts (the last one for +Inf) followed by the sum
+_values = {}
+_lock = threading.Lock()
+_last_write = 0.0
+# (pid, start time) of this process, recomputed in forked workers
+_identity = None
+
+# Counters and histograms of exited processes
+EXITED_FILE = 'exited.json'
+
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+
+def format_labels(names, values):
+    if not names:
+        return ''
+    escaped = (
+        str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n') for value in values
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(names, escaped)) + '}'
+
+
+class Metric:
+    """A named family of series, one per combination of label values"""
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        _registry[name] = self
+
+    def key(self, labels):
+        if len(labels) != len(self.labelnames) or set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes the labels {', '.join(self.labelnames) or 'none'}")
+        return self.name, tuple(str(labels[name]) for name in self.labelnames)
+
+    def merge(self, current, value):
+        """Combine the values of one series from two processes"""
+        return value if current is None else current + value
+
+    def samples(self, labels, value):
+        return [f'{self.name}{format_labels(self.labelnames, labels)} {format_value(value)}']
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        with _lock:
+            _values[key] = _values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """Per-process value, summed over the live processes"""
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = self.key(labels)
+        with _lock:
+            _values[key] = value
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self.key(labels)
+        with _lock:
+            state = _values.get(key)
+            if state is None:
+                state = _values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            state[bisect.bisect_left(self.buckets, value)] += 1
+            state[-1] += value
+
+    def merge(self, current, value):
+        if len(value) != len(self.buckets) + 2:
+            # Written before the buckets changed
+            return current
+        if current is None:
+            return list(value)
+        return [a + b for a, b in zip(current, value)]
+
+    def samples(self, labels, value):
+        names = self.labelnames + ('le',)
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), value):
+            cumulative += count
+            lines.append(
+                f'{self.name}_bucket{format_labels(names, labels + (format_value(bound),))} {format_value(cumulative)}'
+            )
+        series = format_labels(self.labelnames, labels)
+        lines.append(f'{self.name}_sum{series} {format_value(value[-1])}')
+        lines.append(f'{self.name}_count{series} {format_value(cumulative)}')
+        return lines
+
+
+# ==================== Metrics ====================
+
+REQUEST_DURATION = Histogram(
+    'marketplace_request_duration_seconds', 'Time to produce a response, by URL name', ['view'],
+)
+REQUEST_DB_DURATION = Histogram(
+    'marketplace_request_db_duration_seconds', 'Database time spent on a request, by URL name', ['view'],
+)
+RESPONSES = Counter('marketplace_responses_total', 'Responses by URL name and status code', ['view', 'status'])
+ORDERS_CREATED = Counter('marketplace_orders_created_total', 'Orders created')
+BIDS_SUBMITTED = Counter('marketplace_bids_submitted_total', 'Bids submitted')
+MESSAGES_SENT = Counter('marketplace_messages_sent_total', 'Messages sent')
+CACHE_HITS = Counter('marketplace_cache_hits_total', 'Cache lookups answered from the cache', ['namespace'])
+CACHE_MISSES = Counter('marketplace_cache_misses_total', 'Cache lookups that had to be computed', ['namespace'])
+DB_CONNECTIONS = Gauge('marketplace_db_connections', 'Open database connections', ['alias'])
+
+
+def count_cache(namespace, hits=0, misses=0):
+    if hits:
+        CACHE_HITS.inc(hits, namespace=namespace)
+    if misses:
+        CACHE_MISSES.inc(misses, namespace=namespace)
+
+
+def collect_connections():
+    """Refresh DB_CONNECTIONS from this thread's connections"""
+    for alias in connections:
+        DB_CONNECTIONS.set(int(connections[alias].connection is not None), alias=alias)
+
+
+def snapshot():
+    """This process's values, as written to its file"""
+    collect_connections()
+    with _lock:
+        return [[name, list(labels), value] for (name, labels), value in _values.items()]
+
+
+def dump(path, data):
+    # Readers see the old file or the new one, never half of one
+    with open(f'{path}.tmp', 'w') as file:
+        json.dump(data, file)
+    os.replace(f'{path}.tmp', path)
+
+
+def process_start(pid):
+    """Start time of process ``pid`` in clock ticks since boot, or None without /proc"""
+    try:
+        with open(f'/proc/{pid}/stat') as file:
+            stat = file.read()
+    except OSError:
+        return None
+    # Fields after the parenthesized command name, which may contain spaces
+    return int(stat.rsplit(')', 1)[1].split()[19])
+
+
+def identity():
+    """(pid, start time) naming this process's file"""
+    global _identity
+    pid = os.getpid()
+    if _identity is None or _identity[0] != pid:
+        _identity = (pid, process_start(pid) or int(time.time() * 1000))
+    return _identity
+
+
+def write(interval=0):
+    """
+    Write this process's values to METRICS_DIR if ``interval`` seconds have
+    passed since the last write; returns whether a file was written.
+    """
+    global _last_write
+    directory = getattr(settings, 'METRICS_DIR', '')
+    if not directory or time.monotonic() - _last_write < interval:
+        return False
+    _last_write = time.monotonic()
+    pid, start = identity()
+    path = os.path.join(directory, f'{pid}-{start}.json')
+    try:
+        os.makedirs(directory, exist_ok=True)
+        dump(path, {'pid': pid, 'start': start, 'values': snapshot()})
+    except OSError:
+        logger.exception('Could not write metrics to %s', path)
+        return False
+    return True
+
+
+def write_at_exit():
+    """Final write of processes that served requests; tests and management commands leave no file"""
+    if _last_write:
+        write()
+
+
+def is_alive(pid, start=None):
+    """Whether ``pid`` runs and, where /proc can tell, is still the process started at ``start``"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    current = process_start(pid)
+    return start is None or current is None or current == start
+
+
+def is_running(data):
+    if data.get('pid') is None:
+        return False
+    return (data['pid'], data.get('start')) == identity() or is_alive(data['pid'], data.get('start'))
+
+
+@contextmanager
+def locked(directory):
+    """Serialize scrapes of the workers sharing ``directory``"""
+    if fcntl is None:
+        yield
+        return
+    with open(os.path.join(directory, '.lock'), 'a') as file:
+        fcntl.flock(file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(file, fcntl.LOCK_UN)
+
+
+def read_files(directory):
+    """(path, data) of every file in ``directory``"""
+    try:
+        entries = [entry.path for entry in os.scandir(directory) if entry.name.endswith('.json')]
+    except FileNotFoundError:
+        return []
+    files = []
+    for path in sorted(entries):
+        try:
+            with open(path) as file:
+                files.append((path, json.load(file)))
+        except (OSError, ValueError):
+            continue
+    return files
+
+
+def fold_exited(directory, files):
+    """Move the counters and histograms of exited processes into EXITED_FILE and delete their files"""
+    aggregate = os.path.join(directory, EXITED_FILE)
+    exited = [(path, data) for path, data in files if path != aggregate and not is_running(data)]
+    if not exited:
+        return
+    folded = merge([data for path, data in files if path == aggregate] + [data for _, data in exited])
+    try:
+        values = [[name, list(labels), value] for (name, labels), value in folded.items()]
+        dump(aggregate, {'pid': None, 'values': values})
+        for path, _ in exited:
+            os.remove(path)
+    except OSError:
+        logger.exception('Could not fold exited metrics into %s', aggregate)
+
+
+def merge(files):
+    """Merge the data of ``files`` into {(name, label values): value}; gauges only of running processes"""
+    merged = {}
+    for data in files:
+        running = is_running(data)
+        for name, labels, value in data['values']:
+            metric = _registry.get(name)
+            if metric is None or (metric.kind == 'gauge' and not running):
+                continue
+            key = (name, tuple(labels))
+            value = metric.merge(merged.get(key), value)
+            if value is not None:
+                merged[key] = value
+    return merged
+
+
+def gather():
+    """Values of every process merged into {(name, label values): value}"""
+    directory = getattr(settings, 'METRICS_DIR', '')
+    if not (directory and write()):
+        pid, start = identity()
+        return merge([{'pid': pid, 'start': start, 'values': snapshot()}])
+    with locked(directory):
+        files = read_files(directory)
+        fold_exited(directory, files)
+    return merge([data for _, data in files])
+
+
+def render(values):
+    """Prometheus text exposition of gathered ``values``"""
+    lines = []
+    for name, metric in sorted(_registry.items()):
+        lines.append(f'# HELP {name} {metric.documentation}')
+        lines.append(f'# TYPE {name} {metric.kind}')
+        series = sorted((labels, value) for (key, labels), value in values.items() if key == name)
+        for labels, value in series:
+            lines.extend(metric.samples(labels, value))
+    return '\n'.join(lines) + '\n'
+
+
+# What happened since the last write survives a worker's graceful exit
+atexit.register(write_at_exit)
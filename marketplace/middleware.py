@@ -0,0 +1,193 @@
+"""
+Marketplace middleware.
+"""
+import logging
+import os
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.functional import SimpleLazyObject
+
+from . import metrics
+from . import profiling
+from . import query_log
+from . import roles
+from .query_budget import wrap_connections
+
+logger = logging.getLogger(__name__)
+
+
+class RoleMiddleware:
+    """
+    Add lazy ``request.role`` and ``request.profile`` (see roles.py).
+
+    Must come after SessionMiddleware and AuthenticationMiddleware. Both are
+    lazy objects like ``request.user``: test them for truthiness or compare
+    the role, e.g. ``request.role == 'freelancer'``, rather than using ``is None``.
+    Works in both sync and async chains, so ASGI requests are not adapted here.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def annotate(self, request):
+        request.role = SimpleLazyObject(lambda: roles.get_role(request))
+        request.profile = SimpleLazyObject(lambda: roles.get_profile(request))
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        self.annotate(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        self.annotate(request)
+        return await self.get_response(request)
+
+
+class ProfilingMiddleware:
+    """
+    Server-Timing headers and sampled cProfile dumps (see profiling.py).
+
+    Goes first in MIDDLEWARE so ``total`` covers the whole stack. With
+    SERVER_TIMING off, PROFILING_SAMPLE_RATE at 0 and no PROFILING_TOKEN the
+    middleware removes itself; with only profiling configured, requests that
+    are not profiled pay for one random() call and a header lookup.
+    """
+    header = 'HTTP_X_PROFILE'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.server_timing = getattr(settings, 'SERVER_TIMING', False)
+        self.sample_rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 0.0)
+        self.token = getattr(settings, 'PROFILING_TOKEN', '')
+        self.directory = getattr(settings, 'PROFILING_DIR', '/tmp/marketplace-profiles')
+        if not (self.server_timing or self.sample_rate > 0 or self.token):
+            raise MiddlewareNotUsed
+        profiling.install_render_timer()
+
+    def should_profile(self, request):
+        # Check if the request asked for a profile with the shared token, or was sampled
+        if self.token and request.META.get(self.header) == self.token:
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def __call__(self, request):
+        profile = self.should_profile(request)
+        if not (profile or self.server_timing):
+            return self.get_response(request)
+
+        timings = request.timings = profiling.RequestTimings()
+        token = timings.activate()
+        try:
+            with wrap_connections(timings):
+                if profile:
+                    response, profiler = profiling.run_profiled(self.get_response, request)
+                else:
+                    response, profiler = self.get_response(request), None
+        finally:
+            timings.deactivate(token)
+        total = time.perf_counter() - timings.started
+        if timings.view_started is not None:
+            timings.view = time.perf_counter() - timings.view_started
+
+        if self.server_timing:
+            response['Server-Timing'] = timings.header(total)
+        if profiler is not None:
+            self.dump(profiler, request, total)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timings = getattr(request, 'timings', None)
+        if timings is not None:
+            timings.view_started = time.perf_counter()
+
+    def dump(self, profiler, request, total):
+        path = profiling.profile_path(self.directory, request, total)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            profiler.dump_stats(path)
+        except OSError:
+            logger.exception('Could not write profile %s', path)
+        else:
+            logger.info('Profiled %s %s in %.0fms: %s', request.method, request.path, total * 1000, path)
+
+
+class QueryLogMiddleware:
+    """
+    Per-fingerprint query statistics and the slow-query log (see query_log.py).
+
+    Removes itself unless QUERY_LOG is on. Totals are written to the database
+    after the response, at most once per QUERY_LOG_FLUSH_SECONDS per process.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if not getattr(settings, 'QUERY_LOG', False):
+            raise MiddlewareNotUsed
+        self.slow_ms = getattr(settings, 'QUERY_LOG_SLOW_MS', 100.0)
+        self.flush_seconds = getattr(settings, 'QUERY_LOG_FLUSH_SECONDS', 60)
+
+    def __call__(self, request):
+        recorder = request.query_recorder = query_log.QueryRecorder(self.slow_ms)
+        with wrap_connections(recorder):
+            response = self.get_response(request)
+        query_log.flush(self.flush_seconds)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        recorder = getattr(request, 'query_recorder', None)
+        if recorder is not None:
+            recorder.view = getattr(view_func, 'view_class', view_func).__name__
+
+
+class MetricsMiddleware:
+    """
+    Request latency, DB time and response counts per URL name (see metrics.py).
+
+    Removes itself unless METRICS is on. Values reach METRICS_DIR after the
+    response, at most once per METRICS_WRITE_SECONDS per process. Works in
+    both sync and async chains.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if not getattr(settings, 'METRICS', False):
+            raise MiddlewareNotUsed
+        self.write_seconds = getattr(settings, 'METRICS_WRITE_SECONDS', 1.0)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings = profiling.RequestTimings()
+        with wrap_connections(timings):
+            response = self.get_response(request)
+        return self.record(request, response, timings)
+
+    async def __acall__(self, request):
+        timings = profiling.RequestTimings()
+        with wrap_connections(timings):
+            response = await self.get_response(request)
+        return self.record(request, response, timings)
+
+    def record(self, request, response, timings):
+        elapsed = time.perf_counter() - timings.started
+
+        match = request.resolver_match
+        view = match.view_name if match else 'unmatched'
+        metrics.REQUEST_DURATION.observe(elapsed, view=view)
+        metrics.REQUEST_DB_DURATION.observe(timings.db, view=view)
+        metrics.RESPONSES.inc(view=view, status=response.status_code)
+        metrics.write(self.write_seconds)
+        return response
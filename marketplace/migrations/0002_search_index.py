@@ -0,0 +1,33 @@
+from django.db import migrations
+
+
+def install_search_index(apps, schema_editor):
+    from marketplace.search import get_backend, gig_rows, job_rows
+
+    connection = schema_editor.connection
+    backend = get_backend(connection)
+    Gig = apps.get_model('marketplace', 'Gig')
+    Job = apps.get_model('marketplace', 'Job')
+    with connection.cursor() as cursor:
+        backend.install(cursor)
+        backend.upsert(cursor, 'gig', gig_rows(Gig.objects.using(connection.alias)))
+        backend.upsert(cursor, 'job', job_rows(Job.objects.using(connection.alias)))
+
+
+def uninstall_search_index(apps, schema_editor):
+    from marketplace.search import get_backend
+
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        get_backend(connection).uninstall(cursor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search_index, uninstall_search_index),
+    ]
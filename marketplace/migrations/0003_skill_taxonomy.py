@@ -0,0 +1,75 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def parse_existing_skills(apps, schema_editor):
+    from marketplace.skills import parse_skills
+
+    FreelancerProfile = apps.get_model('marketplace', 'FreelancerProfile')
+    Skill = apps.get_model('marketplace', 'Skill')
+    FreelancerSkill = apps.get_model('marketplace', 'FreelancerSkill')
+    db = schema_editor.connection.alias
+
+    parsed = {
+        profile_id: parse_skills(skills)
+        for profile_id, skills in FreelancerProfile.objects.using(db).values_list('id', 'skills')
+    }
+    names = {}
+    for skills in parsed.values():
+        for name, slug in skills:
+            names.setdefault(slug, name)
+    Skill.objects.using(db).bulk_create(
+        [Skill(name=name, slug=slug) for slug, name in names.items()],
+        batch_size=500,
+    )
+
+    skill_ids = dict(Skill.objects.using(db).values_list('slug', 'id'))
+    FreelancerSkill.objects.using(db).bulk_create(
+        [
+            FreelancerSkill(profile_id=profile_id, skill_id=skill_ids[slug])
+            for profile_id, skills in parsed.items()
+            for _, slug in skills
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0002_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Skill',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('slug', models.SlugField(max_length=100, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='FreelancerSkill',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='skill_links', to='marketplace.freelancerprofile')),
+                ('skill', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='profile_links', to='marketplace.skill')),
+            ],
+            options={
+                'unique_together': {('skill', 'profile')},
+            },
+        ),
+        migrations.AddField(
+            model_name='freelancerprofile',
+            name='skill_set',
+            field=models.ManyToManyField(blank=True, related_name='freelancers', through='marketplace.FreelancerSkill', to='marketplace.skill'),
+        ),
+        migrations.RunPython(parse_existing_skills, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:22
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def build_user_stats(apps, schema_editor):
+    from marketplace.stats import rebuild_user_stats
+
+    rebuild_user_stats(apps=apps, using=schema_editor.connection.alias)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0005_conversation_summaries'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('freelancer_active_orders', models.PositiveIntegerField(default=0)),
+                ('freelancer_completed_orders', models.PositiveIntegerField(default=0)),
+                ('total_earned', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('active_gigs', models.PositiveIntegerField(default=0)),
+                ('pending_bids', models.PositiveIntegerField(default=0)),
+                ('client_active_orders', models.PositiveIntegerField(default=0)),
+                ('client_completed_orders', models.PositiveIntegerField(default=0)),
+                ('total_spent', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('posted_jobs', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'User stats',
+            },
+        ),
+        migrations.RunPython(build_user_stats, migrations.RunPython.noop),
+    ]
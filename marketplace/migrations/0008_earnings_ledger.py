@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:26
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def build_ledger(apps, schema_editor):
+    from marketplace.earnings import rebuild_earnings
+
+    # Also corrects totals inflated by re-saves of completed orders
+    rebuild_earnings(apps=apps, using=schema_editor.connection.alias)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0007_rating_totals'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EarningsEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('freelancer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='earnings_entries', to=settings.AUTH_USER_MODEL)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='earnings_entries', to='marketplace.order')),
+            ],
+            options={
+                'verbose_name_plural': 'Earnings entries',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['freelancer', '-created_at'], name='earnings_freelancer_idx')],
+                'constraints': [models.UniqueConstraint(fields=('order',), name='earnings_one_entry_per_order')],
+            },
+        ),
+        migrations.RunPython(build_ledger, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:47
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_bid_stats(apps, schema_editor):
+    from marketplace.bid_stats import rebuild_bid_stats
+
+    rebuild_bid_stats(apps=apps, using=schema_editor.connection.alias)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0010_profile_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='active_bid_count',
+            field=models.PositiveIntegerField(default=0, help_text='Number of bids not rejected'),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='active_bid_sum',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Sum of active bid amounts', max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='avg_bid',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='bid_count',
+            field=models.PositiveIntegerField(default=0, help_text='Number of bids'),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='median_delivery_days',
+            field=models.DecimalField(blank=True, decimal_places=1, max_digits=6, null=True),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='min_bid',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='bid',
+            index=models.Index(fields=['job', '-created_at', '-id'], name='bid_job_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bid',
+            index=models.Index(fields=['job', 'bid_amount', 'id'], name='bid_job_amount_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bid',
+            index=models.Index(fields=['job', 'delivery_days', 'id'], name='bid_job_delivery_idx'),
+        ),
+        migrations.RunPython(backfill_bid_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0011_job_bid_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueryFingerprint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.CharField(max_length=40, unique=True)),
+                ('statement', models.TextField(help_text='SQL with literals and parameters replaced by ?')),
+                ('calls', models.PositiveBigIntegerField(default=0)),
+                ('total_time', models.FloatField(default=0, help_text='Milliseconds')),
+                ('max_time', models.FloatField(default=0, help_text='Milliseconds')),
+                ('rows', models.PositiveBigIntegerField(default=0, help_text='Rows reported by the driver')),
+                ('slow_calls', models.PositiveBigIntegerField(default=0)),
+                ('last_origin', models.CharField(blank=True, help_text='View and line of the last slow call', max_length=255)),
+                ('last_explain', models.TextField(blank=True, help_text='EXPLAIN output of the last slow call')),
+                ('first_seen', models.DateTimeField(auto_now_add=True)),
+                ('last_seen', models.DateTimeField()),
+            ],
+            options={
+                'ordering': ['-total_time'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0012_query_fingerprints'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='skill',
+            name='slug',
+            field=models.SlugField(allow_unicode=True, max_length=100, unique=True),
+        ),
+    ]
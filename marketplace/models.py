@@ -2,6 +2,7 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db.models import Avg
+from .skills import parse_skills
 
 
 class FreelancerProfile(models.Model):
@@ -9,23 +10,73 @@ class FreelancerProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='freelancer_profile')
     profile_picture = models.ImageField(upload_to='profiles/', blank=True, null=True)
     skills = models.TextField(help_text="Comma-separated skills")
+    skill_set = models.ManyToManyField('Skill', through='FreelancerSkill', related_name='freelancers', blank=True)
     bio = models.TextField(max_length=1000)
     experience = models.PositiveIntegerField(default=0, help_text="Years of experience")
     hourly_rate = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(0)])
     rating = models.DecimalField(max_digits=3, decimal_places=2, default=0.0, validators=[MinValueValidator(0), MaxValueValidator(5)])
+    rating_sum = models.PositiveIntegerField(default=0, help_text="Sum of all review ratings")
+    rating_count = models.PositiveIntegerField(default=0, help_text="Number of reviews")
     total_earnings = models.DecimalField(max_digits=12, decimal_places=2, default=0.0)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['-rating', '-created_at'], name='freelancer_rating_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - Freelancer"
     
     def update_rating(self):
-        """Update freelancer rating based on reviews"""
-        from django.db.models import Avg
-        avg_rating = Review.objects.filter(order__freelancer=self.user).aggregate(Avg('rating'))['rating__avg']
-        if avg_rating:
-            self.rating = round(avg_rating, 2)
-            self.save()
+        """Recompute rating totals from this freelancer's reviews"""
+        from .ratings import reconcile_ratings
+        reconcile_ratings([self.user_id])
+        self.refresh_from_db(fields=['rating', 'rating_sum', 'rating_count'])
+    
+    def sync_skills(self):
+        """Mirror the comma-separated skills text into the skill taxonomy"""
+        parsed = parse_skills(self.skills)
+        slugs = [slug for _, slug in parsed]
+        
+        Skill.objects.bulk_create(
+            [Skill(name=name, slug=slug) for name, slug in parsed],
+            ignore_conflicts=True
+        )
+        skill_ids = list(Skill.objects.filter(slug__in=slugs).values_list('id', flat=True))
+        
+        self.skill_links.exclude(skill_id__in=skill_ids).delete()
+        FreelancerSkill.objects.bulk_create(
+            [FreelancerSkill(profile=self, skill_id=skill_id) for skill_id in skill_ids],
+            ignore_conflicts=True
+        )
+
+
+class Skill(models.Model):
+    """Normalized skill shared by freelancer profiles"""
+    name = models.CharField(max_length=100)
+    slug = models.SlugField(max_length=100, unique=True, allow_unicode=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['name']
+    
+    def __str__(self):
+        return self.name
+
+
+class FreelancerSkill(models.Model):
+    """Links a freelancer profile to a skill"""
+    profile = models.ForeignKey(FreelancerProfile, on_delete=models.CASCADE, related_name='skill_links')
+    skill = models.ForeignKey(Skill, on_delete=models.CASCADE, related_name='profile_links')
+    
+    class Meta:
+        # Leading skill column makes "profiles with skill X" an index range scan
+        unique_together = ['skill', 'profile']
+    
+    def __str__(self):
+        return f"{self.profile.user.username} - {self.skill.name}"
 
 
 class ClientProfile(models.Model):
@@ -35,6 +86,7 @@ class ClientProfile(models.Model):
     company_name = models.CharField(max_length=200, blank=True)
     contact_info = models.CharField(max_length=200)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return f"{self.user.username} - Client"
@@ -74,6 +126,13 @@ class Gig(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['is_active', 'category', 'price', '-created_at'], name='gig_browse_idx'),
+            # Partial indexes: only active gigs are ever listed publicly
+            models.Index(fields=['-created_at', '-id'], condition=models.Q(is_active=True), name='gig_active_recent_idx'),
+            models.Index(fields=['category', '-created_at', '-id'], condition=models.Q(is_active=True), name='gig_active_category_idx'),
+            models.Index(fields=['freelancer', 'is_active'], name='gig_freelancer_active_idx'),
+        ]
     
     def __str__(self):
         return self.title
@@ -95,11 +154,24 @@ class Job(models.Model):
     deadline = models.DateField()
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, related_name='jobs')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Open')
+    # Bid statistics, maintained by bid_stats.py; "active" bids are those not rejected
+    bid_count = models.PositiveIntegerField(default=0, help_text="Number of bids")
+    active_bid_count = models.PositiveIntegerField(default=0, help_text="Number of bids not rejected")
+    active_bid_sum = models.DecimalField(max_digits=14, decimal_places=2, default=0, help_text="Sum of active bid amounts")
+    min_bid = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    avg_bid = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    median_delivery_days = models.DecimalField(max_digits=6, decimal_places=1, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='job_recent_idx'),
+            models.Index(fields=['status', '-created_at', '-id'], name='job_status_recent_idx'),
+            models.Index(fields=['category', '-created_at', '-id'], name='job_category_recent_idx'),
+            models.Index(fields=['client', '-created_at'], name='job_client_recent_idx'),
+        ]
     
     def __str__(self):
         return self.title
@@ -128,6 +200,19 @@ class Bid(models.Model):
     class Meta:
         ordering = ['-created_at']
         unique_together = ['job', 'freelancer']  # Prevent duplicate bids
+        indexes = [
+            models.Index(fields=['freelancer', 'status', '-created_at'], name='bid_freelancer_status_idx'),
+            models.Index(fields=['job', 'status'], name='bid_job_status_idx'),
+            # One per bid sort order on the job page (cursor pagination)
+            models.Index(fields=['job', '-created_at', '-id'], name='bid_job_recent_idx'),
+            models.Index(fields=['job', 'bid_amount', 'id'], name='bid_job_amount_idx'),
+            models.Index(fields=['job', 'delivery_days', 'id'], name='bid_job_delivery_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['job'], condition=models.Q(status='Accepted'), name='bid_one_accepted_per_job'
+            ),
+        ]
     
     def __str__(self):
         return f"Bid by {self.freelancer.username} on {self.job.title}"
@@ -142,6 +227,14 @@ class Order(models.Model):
         ('Cancelled', 'Cancelled'),
     ]
     
+    # Allowed status changes; Completed and Cancelled are final
+    TRANSITIONS = {
+        'Pending': ('In Progress', 'Cancelled'),
+        'In Progress': ('Completed', 'Cancelled'),
+        'Completed': (),
+        'Cancelled': (),
+    }
+    
     client = models.ForeignKey(User, on_delete=models.CASCADE, related_name='client_orders')
     freelancer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='freelancer_orders')
     gig = models.ForeignKey(Gig, on_delete=models.SET_NULL, null=True, blank=True, related_name='orders')
@@ -153,6 +246,12 @@ class Order(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['freelancer', 'status'], name='order_freelancer_status_idx'),
+            models.Index(fields=['client', 'status'], name='order_client_status_idx'),
+            models.Index(fields=['freelancer', '-created_at', '-id'], name='order_freelancer_recent_idx'),
+            models.Index(fields=['client', '-created_at', '-id'], name='order_client_recent_idx'),
+        ]
     
     def __str__(self):
         if self.gig:
@@ -160,6 +259,10 @@ class Order(models.Model):
         elif self.job:
             return f"Order for Job: {self.job.title}"
         return f"Order #{self.id}"
+    
+    def can_transition_to(self, status):
+        """Check if the transition table allows moving to ``status``"""
+        return status in self.TRANSITIONS.get(self.status, ())
 
 
 class Message(models.Model):
@@ -172,11 +275,55 @@ class Message(models.Model):
     
     class Meta:
         ordering = ['timestamp']
+        indexes = [
+            models.Index(fields=['sender', 'receiver', 'timestamp'], name='message_thread_idx'),
+            models.Index(fields=['receiver', 'sender'], name='message_received_idx'),
+            # Partial index: unread counters only ever look at unread rows
+            models.Index(fields=['receiver', 'sender'], condition=models.Q(is_read=False), name='message_unread_idx'),
+        ]
     
     def __str__(self):
         return f"Message from {self.sender.username} to {self.receiver.username}"
 
 
+class Conversation(models.Model):
+    """Summary of the message thread between two users (user_low.id < user_high.id)"""
+    user_low = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    user_high = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    last_message = models.ForeignKey(Message, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    last_timestamp = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        unique_together = ['user_low', 'user_high']
+    
+    def __str__(self):
+        return f"Conversation between {self.user_low_id} and {self.user_high_id}"
+
+
+class ConversationMember(models.Model):
+    """One side of a conversation: the inbox row a user sees"""
+    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='members')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='conversation_memberships')
+    partner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    unread_count = models.PositiveIntegerField(default=0)
+    last_timestamp = models.DateTimeField()
+    
+    class Meta:
+        unique_together = ['user', 'partner']
+        indexes = [
+            # The inbox: a user's conversations, most recent first
+            models.Index(fields=['user', '-last_timestamp', '-id'], name='inbox_idx'),
+        ]
+    
+    @property
+    def last_message(self):
+        return self.conversation.last_message
+    
+    def __str__(self):
+        return f"{self.user_id} <-> {self.partner_id} ({self.unread_count} unread)"
+
+
 class Review(models.Model):
     """Reviews and ratings for completed orders"""
     order = models.OneToOneField(Order, on_delete=models.CASCADE, related_name='review')
@@ -189,3 +336,73 @@ class Review(models.Model):
     
     def __str__(self):
         return f"Review for Order #{self.order.id} - {self.rating} stars"
+
+
+class EarningsEntry(models.Model):
+    """Append-only ledger of freelancer earnings, one entry per completed order"""
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='earnings_entries')
+    freelancer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='earnings_entries')
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name_plural = 'Earnings entries'
+        constraints = [
+            # Crediting an order twice fails instead of double counting
+            models.UniqueConstraint(fields=['order'], name='earnings_one_entry_per_order'),
+        ]
+        indexes = [
+            models.Index(fields=['freelancer', '-created_at'], name='earnings_freelancer_idx'),
+        ]
+    
+    def __str__(self):
+        return f"₹{self.amount} to {self.freelancer_id} for Order #{self.order_id}"
+
+
+class UserStats(models.Model):
+    """Dashboard counters per user, kept current by signals (see stats.py)"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='stats')
+    # Orders where the user is the freelancer
+    freelancer_active_orders = models.PositiveIntegerField(default=0)
+    freelancer_completed_orders = models.PositiveIntegerField(default=0)
+    total_earned = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    active_gigs = models.PositiveIntegerField(default=0)
+    pending_bids = models.PositiveIntegerField(default=0)
+    # Orders where the user is the client
+    client_active_orders = models.PositiveIntegerField(default=0)
+    client_completed_orders = models.PositiveIntegerField(default=0)
+    total_spent = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    posted_jobs = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name_plural = 'User stats'
+    
+    def __str__(self):
+        return f"Stats for {self.user_id}"
+
+
+class QueryFingerprint(models.Model):
+    """Running totals for one normalized SQL statement (see query_log.py)"""
+    fingerprint = models.CharField(max_length=40, unique=True)
+    statement = models.TextField(help_text="SQL with literals and parameters replaced by ?")
+    calls = models.PositiveBigIntegerField(default=0)
+    total_time = models.FloatField(default=0, help_text="Milliseconds")
+    max_time = models.FloatField(default=0, help_text="Milliseconds")
+    rows = models.PositiveBigIntegerField(default=0, help_text="Rows reported by the driver")
+    slow_calls = models.PositiveBigIntegerField(default=0)
+    last_origin = models.CharField(max_length=255, blank=True, help_text="View and line of the last slow call")
+    last_explain = models.TextField(blank=True, help_text="EXPLAIN output of the last slow call")
+    first_seen = models.DateTimeField(auto_now_add=True)
+    last_seen = models.DateTimeField()
+    
+    class Meta:
+        ordering = ['-total_time']
+    
+    def __str__(self):
+        return self.statement[:80]
+    
+    @property
+    def mean_time(self):
+        return self.total_time / self.calls if self.calls else 0.0
@@ -0,0 +1,128 @@
+"""
+Full-page cache for anonymous visitors.
+
+Logged-out visitors all get the same HTML for a given URL, so those pages
+are stored whole. The key combines the view, the versions of the cache
+namespaces the page reads (a new generation whenever one is bumped, see
+caching.py) and the normalized query string, which is also the only query
+string the view sees when it renders a page for the cache, so links in the
+stored HTML never carry another visitor's parameters. Responses to anonymous
+visitors are marked public so a CDN can serve them too; the same pages are
+marked private for logged-in users.
+"""
+import functools
+import hashlib
+
+from django.conf import settings
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.contrib.messages.storage.session import SessionStorage
+from django.core.cache import cache
+from django.http import HttpResponse, QueryDict
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import urlencode
+
+from .caching import get_versions
+from . import metrics
+
+
+def normalize_query(query, params):
+    """Encode the listed parameters of a QueryDict in a canonical order, dropping empty values"""
+    items = []
+    for param in sorted(params):
+        values = sorted({value.strip() for value in query.getlist(param)} - {''})
+        items.extend((param, value) for value in values)
+    return urlencode(items)
+
+
+def page_key(name, namespaces, query):
+    versions = get_versions(namespaces)
+    generation = '.'.join(str(versions[namespace]) for namespace in namespaces)
+    digest = hashlib.md5(query.encode()).hexdigest()
+    return f'page:{name}:{generation}:{digest}'
+
+
+def has_pending_messages(request):
+    """Check if a flash message is waiting to be shown (or was just added)"""
+    if CookieStorage.cookie_name in request.COOKIES:
+        return True
+    storage = getattr(request, '_messages', None)
+    if storage is not None and storage.added_new:
+        return True
+    session = getattr(request, 'session', None)
+    return bool(session is not None and session.get(SessionStorage.session_key))
+
+
+def can_store(request, response):
+    """Only store plain successful pages that carry nothing visitor-specific"""
+    return (
+        response.status_code == 200
+        and not response.cookies
+        and not response.streaming
+        # A CSRF token in the page would be tied to this visitor's cookie
+        and not request.META.get('CSRF_COOKIE_NEEDS_UPDATE')
+        and not has_pending_messages(request)
+    )
+
+
+def serve_page(request, name, namespaces, params, view, *args, **kwargs):
+    """Serve ``view`` from the page cache when the request allows it"""
+    timeout = getattr(settings, 'PAGE_CACHE_TIMEOUT', 0)
+    if request.method not in ('GET', 'HEAD') or not timeout:
+        return view(request, *args, **kwargs)
+
+    if request.user.is_authenticated:
+        response = view(request, *args, **kwargs)
+        patch_cache_control(response, private=True)
+        return response
+
+    if has_pending_messages(request):
+        return view(request, *args, **kwargs)
+
+    query = normalize_query(request.GET, params)
+    key = page_key(name, namespaces, query)
+    cached = cache.get(key)
+    metrics.count_cache('pages', hits=int(cached is not None), misses=int(cached is None))
+    if cached is not None:
+        content, content_type = cached
+        response = HttpResponse(content, content_type=content_type)
+    else:
+        # Pagination links and filter forms are built from request.GET; utm_*
+        # and the like must not end up in a page every visitor is served
+        request.GET = QueryDict(query)
+        response = view(request, *args, **kwargs)
+        if hasattr(response, 'render') and not getattr(response, 'is_rendered', True):
+            response.render()
+        if not can_store(request, response):
+            return response
+        cache.set(key, (response.content, response['Content-Type']), timeout)
+
+    patch_cache_control(response, public=True, max_age=timeout)
+    patch_vary_headers(response, ('Cookie',))
+    return response
+
+
+def anonymous_page_cache(namespaces, params=()):
+    """
+    Decorator caching a function view's page for anonymous visitors.
+
+    ``namespaces`` are the caching.Namespace objects the page reads;
+    ``params`` the query parameters that change its content.
+    """
+    def decorator(view_func):
+        @functools.wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            return serve_page(request, view_func.__name__, namespaces, params, view_func, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class AnonymousPageCacheMixin:
+    """Class-based view counterpart of @anonymous_page_cache"""
+    page_cache_namespaces = ()
+    page_cache_params = ()
+
+    def dispatch(self, request, *args, **kwargs):
+        return serve_page(
+            request, type(self).__name__, self.page_cache_namespaces, self.page_cache_params,
+            super().dispatch, *args, **kwargs
+        )
@@ -0,0 +1,203 @@
+"""
+Keyset (cursor) pagination.
+
+Pages are addressed by an opaque token holding the sort key of the row at
+the page boundary, so fetching any page is a single indexed range query:
+no COUNT(*) and no OFFSET, whatever the depth.
+"""
+import base64
+import json
+
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+from django.http import Http404, QueryDict
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+class InvalidCursor(InvalidPage):
+    pass
+
+
+def encode_cursor(direction, values):
+    """Pack a direction and boundary key into a URL-safe token"""
+    raw = json.dumps([direction, values], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Unpack a token created by encode_cursor()"""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        direction, values = json.loads(raw)
+    except (ValueError, TypeError):
+        raise InvalidCursor('Invalid cursor')
+    if direction not in (NEXT, PREVIOUS) or not isinstance(values, list):
+        raise InvalidCursor('Invalid cursor')
+    return direction, values
+
+
+class CursorPage:
+    """One page of a CursorPaginator; exposes tokens and ready-made querystrings"""
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous, params=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.params = params
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if self._has_next and self.object_list:
+            return self.paginator.cursor_for(self.object_list[-1], NEXT)
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self._has_previous and self.object_list:
+            return self.paginator.cursor_for(self.object_list[0], PREVIOUS)
+        return None
+
+    def _querystring(self, cursor):
+        params = self.params.copy() if self.params is not None else QueryDict(mutable=True)
+        params.pop('page', None)
+        params[self.paginator.cursor_param] = cursor
+        return '?' + params.urlencode()
+
+    @property
+    def next_querystring(self):
+        cursor = self.next_cursor
+        return self._querystring(cursor) if cursor else None
+
+    @property
+    def previous_querystring(self):
+        cursor = self.previous_cursor
+        return self._querystring(cursor) if cursor else None
+
+
+class CursorPaginator:
+    """
+    Paginate a queryset by keyset over ``ordering``.
+
+    ``ordering`` names a sort field and a unique tiebreaker, both in the same
+    direction, e.g. ('-created_at', '-id').
+    """
+    cursor_param = 'cursor'
+
+    def __init__(self, queryset, per_page, ordering=('-created_at', '-id'), cursor_param=None):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+        self.descending = self.ordering[0].startswith('-')
+        self.fields = [name.lstrip('-') for name in self.ordering]
+        if cursor_param:
+            self.cursor_param = cursor_param
+        if any(name.startswith('-') != self.descending for name in self.ordering):
+            raise ValueError('All cursor ordering fields must share one direction')
+
+    def _model_field(self, name):
+        opts = self.queryset.model._meta
+        return opts.pk if name in ('id', 'pk') else opts.get_field(name)
+
+    def cursor_for(self, obj, direction):
+        """Build the token for paging away from ``obj`` in ``direction``"""
+        values = []
+        for name in self.fields:
+            value = getattr(obj, name)
+            values.append(value.isoformat() if hasattr(value, 'isoformat') else str(value))
+        return encode_cursor(direction, values)
+
+    def _boundary(self, values, forward):
+        """Q selecting rows strictly beyond the boundary key, lexicographically"""
+        if len(values) != len(self.fields):
+            raise InvalidCursor('Invalid cursor')
+        try:
+            values = [self._model_field(name).to_python(value) for name, value in zip(self.fields, values)]
+        except Exception:
+            raise InvalidCursor('Invalid cursor')
+
+        lookup = 'lt' if forward == self.descending else 'gt'
+        condition = Q()
+        for index, name in enumerate(self.fields):
+            step = Q(**{f'{name}__{lookup}': values[index]})
+            for prior, prior_value in zip(self.fields[:index], values[:index]):
+                step &= Q(**{prior: prior_value})
+            condition |= step
+        return condition
+
+    def page(self, cursor=None, params=None):
+        """Return the CursorPage addressed by ``cursor`` (first page if empty)"""
+        queryset = self.queryset.order_by(*self.ordering)
+        limit = self.per_page + 1
+
+        if not cursor:
+            rows = list(queryset[:limit])
+            return CursorPage(rows[:self.per_page], self, len(rows) > self.per_page, False, params)
+
+        direction, values = decode_cursor(cursor)
+        if direction == NEXT:
+            rows = list(queryset.filter(self._boundary(values, forward=True))[:limit])
+            return CursorPage(rows[:self.per_page], self, len(rows) > self.per_page, True, params)
+
+        reverse = [name[1:] if name.startswith('-') else f'-{name}' for name in self.ordering]
+        rows = list(
+            self.queryset.filter(self._boundary(values, forward=False)).order_by(*reverse)[:limit]
+        )
+        has_previous = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        rows.reverse()
+        return CursorPage(rows, self, True, has_previous, params)
+
+
+def paginate_by_cursor(request, queryset, per_page, ordering=('-created_at', '-id')):
+    """Cursor-paginate a queryset for a function view, 404ing on a bad token"""
+    paginator = CursorPaginator(queryset, per_page, ordering)
+    try:
+        return paginator.page(request.GET.get(paginator.cursor_param), params=request.GET)
+    except InvalidCursor:
+        raise Http404('Invalid cursor')
+
+
+class CursorPaginationMixin:
+    """
+    Opt-in keyset pagination for ListView.
+
+    Requests carrying the legacy ``?page=`` parameter keep Django's OFFSET
+    paginator so existing links still work.
+    """
+    cursor_ordering = ('-created_at', '-id')
+
+    def use_cursor_pagination(self):
+        return self.page_kwarg not in self.request.GET and self.page_kwarg not in self.kwargs
+
+    def paginate_queryset(self, queryset, page_size):
+        if not self.use_cursor_pagination():
+            return super().paginate_queryset(queryset, page_size)
+
+        paginator = CursorPaginator(queryset, page_size, self.cursor_ordering)
+        try:
+            page = paginator.page(self.request.GET.get(paginator.cursor_param), params=self.request.GET)
+        except InvalidCursor:
+            raise Http404('Invalid cursor')
+        return (paginator, page, page.object_list, page.has_other_pages())
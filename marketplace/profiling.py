@@ -0,0 +1,102 @@
+"""
+Per-request timing and profiling.
+
+RequestTimings collects query count and time through an execute_wrapper,
+plus template render time through a wrapper around Template.render that
+only counts the outermost render (includes would be counted twice). The
+results become a Server-Timing header; sampled or token-triggered requests
+are additionally run under cProfile and dumped as .prof files.
+"""
+import cProfile
+import functools
+import os
+import re
+import time
+import uuid
+from contextvars import ContextVar
+
+from django.template.base import Template
+
+_current = ContextVar('marketplace_request_timings', default=None)
+
+
+class RequestTimings:
+    """Times of one request, in seconds; also usable as a connection execute_wrapper"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view_started = None
+        self.view = 0.0
+        self.queries = 0
+        self.db = 0.0
+        self.render = 0.0
+        self.rendering = False
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += time.perf_counter() - started
+            self.queries += 1
+
+    def activate(self):
+        return _current.set(self)
+
+    @staticmethod
+    def deactivate(token):
+        _current.reset(token)
+
+    def header(self, total):
+        """Server-Timing header value; durations in milliseconds"""
+        return ', '.join([
+            f'db;dur={self.db * 1000:.1f};desc="{self.queries} queries"',
+            f'render;dur={self.render * 1000:.1f}',
+            f'view;dur={self.view * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ])
+
+
+def install_render_timer():
+    """Wrap Template.render once so active RequestTimings see template render time"""
+    original = Template.render
+    if getattr(original, 'timed', False):
+        return
+
+    @functools.wraps(original)
+    def render(self, context):
+        timings = _current.get()
+        if timings is None or timings.rendering:
+            return original(self, context)
+        timings.rendering = True
+        started = time.perf_counter()
+        try:
+            return original(self, context)
+        finally:
+            timings.render += time.perf_counter() - started
+            timings.rendering = False
+
+    render.timed = True
+    Template.render = render
+
+
+def profile_path(directory, request, elapsed):
+    """Unique, sortable .prof file name for a request, e.g. 20261018-101500-GET-gigs-42ms-1a2b3c.prof"""
+    path = re.sub(r'[^A-Za-z0-9._-]+', '_', request.path.strip('/').replace('/', '.'))[:80] or 'root'
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{request.method}-{path}-{elapsed * 1000:.0f}ms-{uuid.uuid4().hex[:6]}.prof"
+    return os.path.join(directory, name)
+
+
+def run_profiled(get_response, request):
+    """Call get_response under cProfile; returns (response, profiler or None if one is already running)"""
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Another profiler owns this thread (e.g. a nested profiled request)
+        return get_response(request), None
+    try:
+        response = get_response(request)
+    finally:
+        profiler.disable()
+    return response, profiler
@@ -0,0 +1,92 @@
+"""
+Per-view query budgets.
+
+Views declare the maximum number of SQL queries they may issue, including
+template rendering. Going over budget raises QueryBudgetExceeded when
+settings.QUERY_BUDGET_RAISE is on (as in the budget tests) and logs a
+warning otherwise.
+"""
+import functools
+import logging
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryCounter:
+    """execute_wrapper that counts the queries run through a connection"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+@contextmanager
+def wrap_connections(wrapper):
+    """Install ``wrapper`` as an execute_wrapper on every database connection"""
+    with ExitStack() as stack:
+        for conn in connections.all():
+            stack.enter_context(conn.execute_wrapper(wrapper))
+        yield wrapper
+
+
+@contextmanager
+def count_queries():
+    """Count queries on all connections inside the block"""
+    with wrap_connections(QueryCounter()) as counter:
+        yield counter
+
+
+def check_budget(label, used, budget):
+    """Raise or log when a view has gone over its budget"""
+    if used <= budget:
+        return
+    message = f'{label} ran {used} queries (budget {budget})'
+    if getattr(settings, 'QUERY_BUDGET_RAISE', False):
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
+
+
+def _run_within_budget(label, budget, view, *args, **kwargs):
+    with count_queries() as counter:
+        response = view(*args, **kwargs)
+        # Lazy template responses would otherwise render outside the budget
+        if hasattr(response, 'render') and not getattr(response, 'is_rendered', True):
+            response.render()
+    check_budget(label, counter.count, budget)
+    return response
+
+
+def query_budget(max_queries):
+    """Decorator declaring the query budget of a function view"""
+    def decorator(view_func):
+        @functools.wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            return _run_within_budget(
+                view_func.__name__, max_queries, view_func, request, *args, **kwargs
+            )
+        wrapper.query_budget = max_queries
+        return wrapper
+    return decorator
+
+
+class QueryBudgetMixin:
+    """Class-based view counterpart of @query_budget; set ``query_budget``"""
+    query_budget = None
+
+    def dispatch(self, request, *args, **kwargs):
+        if self.query_budget is None:
+            return super().dispatch(request, *args, **kwargs)
+        return _run_within_budget(
+            type(self).__name__, self.query_budget, super().dispatch, request, *args, **kwargs
+        )
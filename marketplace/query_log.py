@@ -0,0 +1,211 @@
+"""
+Query fingerprinting and the slow-query log.
+
+QueryRecorder is a connection execute_wrapper (installed per request by
+QueryLogMiddleware) that normalizes every statement into a fingerprint,
+with literals and parameters replaced by ``?`` and IN lists collapsed, and
+adds its time and row count to per-process totals. Statements slower than
+QUERY_LOG_SLOW_MS are logged with their EXPLAIN plan and the view and line
+that ran them. flush() folds the totals into QueryFingerprint rows, at most
+once per QUERY_LOG_FLUSH_SECONDS, so several processes can share one table.
+"""
+import functools
+import hashlib
+import logging
+import os
+import re
+import sys
+import threading
+import time
+
+from django.db import DatabaseError, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import QueryFingerprint
+
+logger = logging.getLogger(__name__)
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Frames of the instrumentation itself are never the origin of a query
+SKIP_FILES = {
+    os.path.join(PACKAGE_DIR, name) for name in ('query_log.py', 'middleware.py', 'profiling.py', 'query_budget.py')
+}
+
+STRING = re.compile(r"'(?:[^']|'')*'")
+NUMBER = re.compile(r'(?<![\w."])-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b')
+PLACEHOLDER = re.compile(r'%s|%\(\w+\)s|\$\d+')
+VALUE_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+REPEATED_LISTS = re.compile(r'\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+')
+WHITESPACE = re.compile(r'\s+')
+
+
+@functools.lru_cache(maxsize=2048)
+def fingerprint(sql):
+    """(hash, normalized statement) for ``sql``; the ORM repeats the same SQL text, hence the cache"""
+    statement = STRING.sub('?', sql)
+    statement = PLACEHOLDER.sub('?', statement)
+    statement = NUMBER.sub('?', statement)
+    statement = VALUE_LIST.sub('(...)', statement)
+    statement = REPEATED_LISTS.sub('(...)', statement)
+    statement = WHITESPACE.sub(' ', statement).strip()
+    return hashlib.sha1(statement.encode()).hexdigest(), statement
+
+
+class Totals:
+    """Pending totals for one fingerprint in this process"""
+    __slots__ = ('statement', 'calls', 'total_time', 'max_time', 'rows', 'slow_calls', 'origin', 'explain')
+
+    def __init__(self, statement):
+        self.statement = statement
+        self.calls = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.rows = 0
+        self.slow_calls = 0
+        self.origin = None
+        self.explain = None
+
+
+_pending = {}
+_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+
+def record(sql, elapsed_ms, rows, origin=None, explain=None):
+    """Add one execution of ``sql`` to the pending totals"""
+    key, statement = fingerprint(sql)
+    with _lock:
+        totals = _pending.get(key)
+        if totals is None:
+            totals = _pending[key] = Totals(statement)
+        totals.calls += 1
+        totals.total_time += elapsed_ms
+        totals.max_time = max(totals.max_time, elapsed_ms)
+        totals.rows += max(rows, 0)
+        if explain is not None:
+            totals.slow_calls += 1
+            totals.origin = origin
+            totals.explain = explain
+
+
+def find_origin(view=None):
+    """'view (path:line in function)' of the innermost marketplace frame on the stack"""
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(PACKAGE_DIR) and filename not in SKIP_FILES:
+            where = (
+                f'{os.path.relpath(filename, os.path.dirname(PACKAGE_DIR))}:{frame.f_lineno} '
+                f'in {frame.f_code.co_name}'
+            )
+            return f'{view} ({where})' if view else where
+        frame = frame.f_back
+    return view or 'unknown'
+
+
+def explain(connection, sql, params):
+    """The database's plan for a SELECT, as text; other statements are not explained"""
+    if sql.lstrip()[:6].upper() not in ('SELECT', 'WITH'):
+        return ''
+    prefix = connection.ops.explain_query_prefix()
+    try:
+        # A savepoint keeps a failed EXPLAIN from breaking the caller's transaction
+        with transaction.atomic(using=connection.alias):
+            with connection.cursor() as cursor:
+                cursor.execute(f'{prefix} {sql}', params)
+                rows = cursor.fetchall()
+    except DatabaseError as exc:
+        return f'EXPLAIN failed: {exc}'
+    return '\n'.join(' '.join(str(value) for value in row) for row in rows)
+
+
+class QueryRecorder:
+    """execute_wrapper feeding the fingerprint totals; ``view`` names the current view"""
+
+    def __init__(self, slow_ms, view=None):
+        self.slow_ms = slow_ms
+        self.view = view
+        self.explaining = False
+
+    def __call__(self, execute, sql, params, many, context):
+        # Queries run by EXPLAIN itself are not recorded
+        if self.explaining:
+            return execute(sql, params, many, context)
+        started = time.perf_counter()
+        result = execute(sql, params, many, context)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        rows = getattr(context['cursor'], 'rowcount', -1)
+        if elapsed_ms < self.slow_ms:
+            record(sql, elapsed_ms, rows)
+            return result
+
+        origin = find_origin(self.view)
+        self.explaining = True
+        try:
+            plan = '' if many else explain(context['connection'], sql, params)
+        finally:
+            self.explaining = False
+        record(sql, elapsed_ms, rows, origin, plan)
+        # The normalized statement keeps user data out of the log
+        logger.warning(
+            'Slow query (%.1fms) from %s: %s%s', elapsed_ms, origin,
+            fingerprint(sql)[1], f'\n{plan}' if plan else '',
+        )
+        return result
+
+
+def flush(interval=0):
+    """
+    Write the pending totals to QueryFingerprint if ``interval`` seconds have
+    passed since the last flush; returns the number of fingerprints written.
+    """
+    global _pending, _last_flush
+    with _lock:
+        if not _pending or time.monotonic() - _last_flush < interval:
+            return 0
+        pending, _pending = _pending, {}
+        _last_flush = time.monotonic()
+
+    now = timezone.now()
+    try:
+        with transaction.atomic():
+            QueryFingerprint.objects.bulk_create(
+                [QueryFingerprint(fingerprint=key, statement=totals.statement, last_seen=now)
+                 for key, totals in pending.items()],
+                ignore_conflicts=True,
+            )
+            for key, totals in pending.items():
+                changes = {
+                    'calls': F('calls') + totals.calls,
+                    'total_time': F('total_time') + totals.total_time,
+                    'max_time': Greatest(F('max_time'), Value(totals.max_time)),
+                    'rows': F('rows') + totals.rows,
+                    'slow_calls': F('slow_calls') + totals.slow_calls,
+                    'last_seen': now,
+                }
+                if totals.explain is not None:
+                    changes.update(last_origin=totals.origin[:255], last_explain=totals.explain)
+                QueryFingerprint.objects.filter(fingerprint=key).update(**changes)
+    except DatabaseError:
+        # Losing one window of statistics beats failing the request
+        logger.exception('Could not write %d query fingerprints', len(pending))
+        return 0
+    return len(pending)
+
+
+ORDERINGS = {
+    'total': '-total_time',
+    'max': '-max_time',
+    'calls': '-calls',
+    'mean': '-mean',
+    'rows': '-rows',
+    'slow': '-slow_calls',
+}
+
+
+def top_fingerprints(order='total', limit=20):
+    """The heaviest fingerprints by one of ORDERINGS"""
+    queryset = QueryFingerprint.objects.annotate(mean=F('total_time') / F('calls'))
+    return queryset.order_by(ORDERINGS[order], 'pk')[:limit]
@@ -0,0 +1,77 @@
+"""
+Freelancer rating aggregation.
+
+Profiles keep a running rating_sum and rating_count; each review adjusts
+both with F() expressions and derives rating from them in the same UPDATE,
+so concurrent reviews cannot overwrite each other and no review pays for
+re-averaging the freelancer's whole history.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.apps import apps as global_apps
+from django.db.models import Case, Count, F, FloatField, Sum, Value, When
+from django.db.models.functions import Cast, Greatest
+from django.utils import timezone
+
+from .models import FreelancerProfile
+
+
+def adjust_rating(user_id, sum_delta, count_delta):
+    """Apply a change in review totals to a freelancer's profile in one UPDATE"""
+    new_sum = F('rating_sum') + sum_delta
+    new_count = F('rating_count') + count_delta
+    FreelancerProfile.objects.filter(user_id=user_id).update(
+        rating_sum=Greatest(new_sum, 0),
+        rating_count=Greatest(new_count, 0),
+        # Right-hand sides see the row's old values, so this is the new average
+        rating=Case(
+            When(rating_count__lte=-count_delta, then=Value(0.0)),
+            default=Cast(new_sum, FloatField()) / new_count,
+            output_field=FloatField(),
+        ),
+        updated_at=timezone.now(),
+    )
+
+
+def average(rating_sum, rating_count):
+    """The rating stored for the given totals"""
+    if not rating_count:
+        return Decimal('0.00')
+    return (Decimal(rating_sum) / rating_count).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def reconcile_ratings(user_ids=None, batch_size=1000, apps=global_apps, using='default'):
+    """
+    Recompute rating totals for all profiles (or those of ``user_ids``) with
+    one grouped aggregate over reviews. Returns the number of profiles corrected.
+    """
+    Profile = apps.get_model('marketplace', 'FreelancerProfile')
+    Review = apps.get_model('marketplace', 'Review')
+
+    reviews = Review.objects.using(using).order_by()
+    profiles = Profile.objects.using(using).order_by('pk')
+    if user_ids is not None:
+        reviews = reviews.filter(order__freelancer__in=user_ids)
+        profiles = profiles.filter(user__in=user_ids)
+
+    totals = {
+        user_id: (rating_sum, rating_count)
+        for user_id, rating_sum, rating_count in reviews.values_list('order__freelancer').annotate(
+            Sum('rating'), Count('id')
+        )
+    }
+
+    changed = []
+    for profile in profiles.only('id', 'user_id', 'rating', 'rating_sum', 'rating_count').iterator():
+        rating_sum, rating_count = totals.get(profile.user_id, (0, 0))
+        rating = average(rating_sum, rating_count)
+        # Backends round half-way averages differently; allow that one step
+        drifted = abs(Decimal(profile.rating) - rating) > Decimal('0.01')
+        if (profile.rating_sum, profile.rating_count) != (rating_sum, rating_count) or drifted:
+            profile.rating_sum, profile.rating_count, profile.rating = rating_sum, rating_count, rating
+            changed.append(profile)
+
+    Profile.objects.using(using).bulk_update(
+        changed, ['rating_sum', 'rating_count', 'rating'], batch_size=batch_size
+    )
+    return len(changed)
@@ -0,0 +1,179 @@
+"""
+Real-time events for connected users.
+
+Events are published to a broker, which hands them to the Hub of every
+process holding an open stream. The default LocalBroker delivers straight
+to this process's hub, which is all a single ASGI worker needs; with
+several workers set REALTIME_BROKER to a broker that fans out between
+processes, e.g. marketplace.realtime.RedisBroker.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# Events buffered per stream before the slowest readers start losing them
+QUEUE_SIZE = 100
+
+
+class Hub:
+    """
+    In-process fan-out from user ids to the streams they have open.
+
+    publish() may be called from any thread; events are handed to each
+    stream's event loop with call_soon_threadsafe.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._streams = {}
+
+    def subscribe(self, user_id):
+        """Register a stream for ``user_id``; call from the event loop that will read it"""
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        stream = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            self._streams.setdefault(user_id, set()).add(stream)
+        return stream
+
+    def unsubscribe(self, user_id, stream):
+        with self._lock:
+            streams = self._streams.get(user_id)
+            if streams:
+                streams.discard(stream)
+                if not streams:
+                    del self._streams[user_id]
+
+    def publish(self, user_id, event):
+        with self._lock:
+            streams = list(self._streams.get(user_id, ()))
+        for loop, queue in streams:
+            try:
+                loop.call_soon_threadsafe(_offer, queue, event)
+            except RuntimeError:
+                # The stream's loop has closed; it unsubscribes on the way out
+                pass
+
+
+def _offer(queue, event):
+    try:
+        queue.put_nowait(event)
+    except asyncio.QueueFull:
+        logger.warning('Dropping real-time event for a slow stream')
+
+
+hub = Hub()
+
+
+class LocalBroker:
+    """Deliver events to streams held by this process only"""
+
+    def __init__(self, hub):
+        self.hub = hub
+
+    def publish(self, user_id, event):
+        self.hub.publish(user_id, event)
+
+    def start(self):
+        pass
+
+
+class RedisBroker:
+    """
+    Fan events out between processes through Redis pub/sub.
+
+    Requires the redis package and REALTIME_REDIS_URL. Each process runs one
+    listener thread, started with its first stream, that forwards events
+    into its hub and resubscribes with backoff when the connection drops.
+    """
+    channel = 'marketplace:events'
+    # Seconds between reconnection attempts, doubling up to the maximum
+    retry_delay = 0.5
+    max_retry_delay = 30.0
+
+    def __init__(self, hub):
+        try:
+            import redis
+        except ImportError:
+            raise ImproperlyConfigured('RedisBroker requires the redis package')
+        self.hub = hub
+        self.client = redis.Redis.from_url(settings.REALTIME_REDIS_URL)
+        self._listener = None
+        self._lock = threading.Lock()
+
+    def publish(self, user_id, event):
+        self.client.publish(self.channel, json.dumps([user_id, event]))
+
+    def start(self):
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen, name='realtime-redis', daemon=True)
+                self._listener.start()
+
+    def _listen(self):
+        delay = self.retry_delay
+        try:
+            while True:
+                try:
+                    for _ in self._forward():
+                        delay = self.retry_delay
+                except Exception:
+                    # Events published meanwhile are lost; clients catch up with the since endpoint
+                    logger.exception('Real-time listener lost Redis; reconnecting in %.1fs', delay)
+                time.sleep(delay)
+                delay = min(delay * 2, self.max_retry_delay)
+        finally:
+            # Should the thread die anyway, the next stream starts a new one
+            with self._lock:
+                self._listener = None
+
+    def _forward(self):
+        """Subscribe and hand events to the hub, yielding after each message"""
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        try:
+            pubsub.subscribe(self.channel)
+            for item in pubsub.listen():
+                try:
+                    user_id, event = json.loads(item['data'])
+                except (TypeError, ValueError):
+                    continue
+                self.hub.publish(user_id, event)
+                yield
+        finally:
+            pubsub.close()
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """The broker named by settings.REALTIME_BROKER, created once per process"""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                path = getattr(settings, 'REALTIME_BROKER', 'marketplace.realtime.LocalBroker')
+                _broker = import_string(path)(hub)
+    return _broker
+
+
+def publish(user_id, event_type, data):
+    """Send an event to every stream ``user_id`` has open, in any process"""
+    try:
+        get_broker().publish(user_id, {'type': event_type, 'data': data})
+    except Exception:
+        # Real-time delivery is best effort; clients catch up with the since endpoint
+        logger.exception('Could not publish real-time event')
+
+
+def format_event(event):
+    """Encode an event as a Server-Sent Events frame"""
+    return f"event: {event['type']}\ndata: {json.dumps(event['data'], separators=(',', ':'))}\n\n"
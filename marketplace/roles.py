@@ -0,0 +1,81 @@
+"""
+Request-scoped user roles.
+
+A user is a freelancer if they have a FreelancerProfile, otherwise a client
+if they have a ClientProfile, otherwise they have no role yet. The role is
+resolved once per session and kept there, so most requests answer
+``request.role`` without touching the profile tables; ``request.profile``
+loads the matching profile row on first use.
+"""
+from django.contrib.auth.models import User
+
+from .models import FreelancerProfile, ClientProfile
+
+FREELANCER = 'freelancer'
+CLIENT = 'client'
+
+PROFILE_MODELS = {
+    FREELANCER: FreelancerProfile,
+    CLIENT: ClientProfile,
+}
+
+# Session entry holding [user id, role]
+SESSION_KEY = '_marketplace_role'
+
+
+def lookup_role(user_id):
+    """The role stored in the database, resolved with one query"""
+    freelancer_id, client_id = User.objects.filter(pk=user_id).values_list(
+        'freelancer_profile', 'client_profile'
+    ).first() or (None, None)
+    if freelancer_id is not None:
+        return FREELANCER
+    if client_id is not None:
+        return CLIENT
+    return None
+
+
+def remember_role(request, role):
+    """Store the current user's role in the session"""
+    if role is None:
+        # Users without a profile yet are looked up again until they have one
+        request.session.pop(SESSION_KEY, None)
+    else:
+        request.session[SESSION_KEY] = [request.user.pk, role]
+    request._cached_role = role
+
+
+def forget_role(request):
+    """Drop the stored role, e.g. after a profile was created or deleted"""
+    request.session.pop(SESSION_KEY, None)
+    for attr in ('_cached_role', '_cached_profile'):
+        request.__dict__.pop(attr, None)
+
+
+def get_role(request):
+    """The current user's role: FREELANCER, CLIENT or None"""
+    if not hasattr(request, '_cached_role'):
+        user = request.user
+        if not user.is_authenticated:
+            request._cached_role = None
+        else:
+            marker = request.session.get(SESSION_KEY)
+            if marker and marker[0] == user.pk:
+                request._cached_role = marker[1]
+            else:
+                remember_role(request, lookup_role(user.pk))
+    return request._cached_role
+
+
+def get_profile(request):
+    """The current user's FreelancerProfile or ClientProfile, or None"""
+    if not hasattr(request, '_cached_profile'):
+        role = get_role(request)
+        profile = None
+        if role is not None:
+            profile = PROFILE_MODELS[role].objects.filter(user_id=request.user.pk).first()
+            if profile is None:
+                # The stored role is stale; resolve it again next time
+                forget_role(request)
+        request._cached_profile = profile
+    return request._cached_profile
@@ -0,0 +1,317 @@
+"""
+Full-text search for gigs and jobs.
+
+The backend is picked from the vendor of DATABASES['default']:
+SQLite uses FTS5 virtual tables, PostgreSQL uses tsvector columns with a
+GIN index. Any other database falls back to plain icontains filters.
+"""
+import re
+
+from django.db import connection, connections
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+
+# Upper bound on ranked ids pulled from the index for a single search,
+# applied after the listing's own filters (see search())
+MAX_RESULTS = 500
+
+# Weighted columns for each indexed model, in ranking order
+INDEXES = {
+    'gig': {
+        'table': 'marketplace_gig_search',
+        'columns': ('title', 'skills', 'description'),
+        'weights': (10.0, 5.0, 1.0),
+    },
+    'job': {
+        'table': 'marketplace_job_search',
+        'columns': ('title', 'description'),
+        'weights': (10.0, 1.0),
+    },
+}
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text):
+    """Split a search string into safe, lowercase terms"""
+    return [token.lower() for token in TOKEN_RE.findall(text or '')]
+
+
+class SearchBackend:
+    """Icontains fallback for databases without a full-text engine"""
+    vendor = None
+
+    def install(self, cursor):
+        pass
+
+    def uninstall(self, cursor):
+        pass
+
+    def upsert(self, cursor, kind, rows):
+        pass
+
+    def delete(self, cursor, kind, object_ids):
+        pass
+
+    def clear(self, cursor, kind):
+        pass
+
+    def ranked_ids(self, cursor, kind, text, within=None, limit=MAX_RESULTS):
+        """
+        Return matching ids, best match first, or None when unsupported.
+
+        ``within`` is an optional (sql, params) subquery selecting the ids
+        the matches are restricted to, so the limit applies after filtering.
+        """
+        return None
+
+    def rank(self, kind, text, column):
+        """
+        Return (sql, params, descending) for a subquery giving the rank of
+        the row whose id is in ``column``, or None when unsupported.
+        """
+        return None
+
+    def restrict(self, column, within):
+        """SQL condition and params limiting ``column`` to the ``within`` subquery"""
+        if within is None:
+            return '', []
+        sql, params = within
+        return ' AND {} IN ({})'.format(column, sql), list(params)
+
+
+class SQLiteSearchBackend(SearchBackend):
+    """FTS5 tables keyed by rowid = object id, ranked with bm25()"""
+    vendor = 'sqlite'
+
+    def install(self, cursor):
+        for spec in INDEXES.values():
+            cursor.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5({columns}, "
+                "tokenize = 'porter unicode61')".format(
+                    table=spec['table'], columns=', '.join(spec['columns'])
+                )
+            )
+
+    def uninstall(self, cursor):
+        for spec in INDEXES.values():
+            cursor.execute('DROP TABLE IF EXISTS {}'.format(spec['table']))
+
+    def upsert(self, cursor, kind, rows):
+        spec = INDEXES[kind]
+        rows = list(rows)
+        self.delete(cursor, kind, [row[0] for row in rows])
+        cursor.executemany(
+            'INSERT INTO {table} (rowid, {columns}) VALUES (%s, {params})'.format(
+                table=spec['table'],
+                columns=', '.join(spec['columns']),
+                params=', '.join(['%s'] * len(spec['columns'])),
+            ),
+            rows,
+        )
+
+    def delete(self, cursor, kind, object_ids):
+        cursor.executemany(
+            'DELETE FROM {} WHERE rowid = %s'.format(INDEXES[kind]['table']),
+            [(object_id,) for object_id in object_ids],
+        )
+
+    def clear(self, cursor, kind):
+        cursor.execute('DELETE FROM {}'.format(INDEXES[kind]['table']))
+
+    def _match(self, terms):
+        # Quoted prefix terms keep FTS5 query syntax out of user input
+        return ' '.join('"{}"*'.format(term) for term in terms)
+
+    def _bm25(self, spec):
+        return 'bm25({}, {})'.format(spec['table'], ', '.join(str(weight) for weight in spec['weights']))
+
+    def ranked_ids(self, cursor, kind, text, within=None, limit=MAX_RESULTS):
+        terms = tokenize(text)
+        if not terms:
+            return []
+        spec = INDEXES[kind]
+        condition, params = self.restrict('rowid', within)
+        cursor.execute(
+            'SELECT rowid FROM {table} WHERE {table} MATCH %s{condition} '
+            'ORDER BY {bm25}, rowid DESC LIMIT %s'.format(
+                table=spec['table'], condition=condition, bm25=self._bm25(spec),
+            ),
+            [self._match(terms), *params, limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+    def rank(self, kind, text, column):
+        spec = INDEXES[kind]
+        # bm25() is lower for better matches
+        return (
+            'SELECT {bm25} FROM {table} WHERE {table} MATCH %s AND rowid = {column}'.format(
+                bm25=self._bm25(spec), table=spec['table'], column=column,
+            ),
+            [self._match(tokenize(text))],
+            False,
+        )
+
+
+class PostgresSearchBackend(SearchBackend):
+    """tsvector tables with a GIN index, ranked with ts_rank()"""
+    vendor = 'postgresql'
+    config = 'english'
+    labels = ('A', 'B', 'C', 'D')
+
+    def install(self, cursor):
+        for spec in INDEXES.values():
+            cursor.execute(
+                'CREATE TABLE IF NOT EXISTS {table} ('
+                'object_id bigint PRIMARY KEY, document tsvector NOT NULL)'.format(table=spec['table'])
+            )
+            cursor.execute(
+                'CREATE INDEX IF NOT EXISTS {table}_document_gin '
+                'ON {table} USING gin (document)'.format(table=spec['table'])
+            )
+
+    def uninstall(self, cursor):
+        for spec in INDEXES.values():
+            cursor.execute('DROP TABLE IF EXISTS {}'.format(spec['table']))
+
+    def _document_sql(self, spec):
+        return ' || '.join(
+            "setweight(to_tsvector('{config}', coalesce(%s, '')), '{label}')".format(
+                config=self.config, label=label
+            )
+            for label, _ in zip(self.labels, spec['columns'])
+        )
+
+    def upsert(self, cursor, kind, rows):
+        spec = INDEXES[kind]
+        cursor.executemany(
+            'INSERT INTO {table} (object_id, document) VALUES (%s, {document}) '
+            'ON CONFLICT (object_id) DO UPDATE SET document = EXCLUDED.document'.format(
+                table=spec['table'], document=self._document_sql(spec)
+            ),
+            list(rows),
+        )
+
+    def delete(self, cursor, kind, object_ids):
+        object_ids = list(object_ids)
+        if object_ids:
+            cursor.execute(
+                'DELETE FROM {} WHERE object_id = ANY(%s)'.format(INDEXES[kind]['table']),
+                [object_ids],
+            )
+
+    def clear(self, cursor, kind):
+        cursor.execute('TRUNCATE {}'.format(INDEXES[kind]['table']))
+
+    def _query(self, terms):
+        return ' & '.join('{}:*'.format(term) for term in terms)
+
+    def _weights(self, spec):
+        # ts_rank weights are ordered {D, C, B, A}
+        return [0.1] * (4 - len(spec['weights'])) + [w / 10.0 for w in reversed(spec['weights'])]
+
+    def ranked_ids(self, cursor, kind, text, within=None, limit=MAX_RESULTS):
+        terms = tokenize(text)
+        if not terms:
+            return []
+        spec = INDEXES[kind]
+        condition, params = self.restrict('object_id', within)
+        cursor.execute(
+            "SELECT object_id FROM {table}, to_tsquery('{config}', %s) query "
+            'WHERE document @@ query{condition} '
+            'ORDER BY ts_rank(%s::float4[], document, query) DESC, object_id DESC LIMIT %s'.format(
+                table=spec['table'], config=self.config, condition=condition
+            ),
+            [self._query(terms), *params, self._weights(spec), limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+    def rank(self, kind, text, column):
+        spec = INDEXES[kind]
+        return (
+            "SELECT ts_rank(%s::float4[], document, to_tsquery('{config}', %s)) "
+            'FROM {table} WHERE object_id = {column}'.format(
+                config=self.config, table=spec['table'], column=column,
+            ),
+            [self._weights(spec), self._query(tokenize(text))],
+            True,
+        )
+
+
+BACKENDS = {
+    backend.vendor: backend
+    for backend in (SQLiteSearchBackend(), PostgresSearchBackend())
+}
+
+
+def get_backend(using=None):
+    """Return the search backend for a connection (default database if omitted)"""
+    conn = using or connection
+    return BACKENDS.get(conn.vendor, SearchBackend())
+
+
+# ==================== Documents ====================
+
+def gig_rows(queryset):
+    """Index rows for gigs: (id, title, freelancer skills, description)"""
+    return queryset.values_list(
+        'id', 'title', 'freelancer__freelancer_profile__skills', 'description'
+    )
+
+
+def job_rows(queryset):
+    """Index rows for jobs: (id, title, description)"""
+    return queryset.values_list('id', 'title', 'description')
+
+
+def index_gigs(queryset):
+    """Add or refresh gigs in the search index"""
+    with connection.cursor() as cursor:
+        get_backend().upsert(cursor, 'gig', gig_rows(queryset))
+
+
+def index_jobs(queryset):
+    """Add or refresh jobs in the search index"""
+    with connection.cursor() as cursor:
+        get_backend().upsert(cursor, 'job', job_rows(queryset))
+
+
+def unindex(kind, object_ids):
+    """Remove objects from the search index"""
+    with connection.cursor() as cursor:
+        get_backend().delete(cursor, kind, object_ids)
+
+
+# ==================== Querying ====================
+
+def search(queryset, kind, text, fallback_fields):
+    """
+    Filter a queryset down to full-text matches ordered by relevance.
+
+    The index is queried against the ids of ``queryset``, so its filters
+    apply before the MAX_RESULTS cap; the matches are then ordered by their
+    rank in the index, looked up per row. Falls back to an OR of icontains
+    lookups over ``fallback_fields`` when the database has no full-text
+    backend.
+    """
+    conn = connections[queryset.db]
+    within = queryset.order_by().values('pk').query.get_compiler(connection=conn).as_sql()
+    with conn.cursor() as cursor:
+        ids = get_backend(conn).ranked_ids(cursor, kind, text, within, MAX_RESULTS)
+
+    if ids is None:
+        condition = Q()
+        for field in fallback_fields:
+            condition |= Q(**{'{}__icontains'.format(field): text})
+        return queryset.filter(condition).order_by('-created_at')
+
+    if not ids:
+        return queryset.none()
+
+    sql, params, descending = get_backend(conn).rank(kind, text, '{}.{}'.format(
+        conn.ops.quote_name(queryset.model._meta.db_table), conn.ops.quote_name(queryset.model._meta.pk.column),
+    ))
+    rank = RawSQL(sql, params, output_field=FloatField())
+    return queryset.filter(pk__in=ids).annotate(search_rank=rank).order_by(
+        '-search_rank' if descending else 'search_rank', '-pk',
+    )
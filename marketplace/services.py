@@ -0,0 +1,90 @@
+"""
+Multi-step marketplace operations.
+
+Each operation runs in one transaction and guards its state changes with
+conditional UPDATEs, so concurrent requests cannot both succeed.
+"""
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Job, Bid, Order
+from . import bid_stats, caching, events, stats
+
+
+class BidNotAcceptable(Exception):
+    """The bid's job is no longer open or the bid is no longer pending"""
+
+    def __init__(self, message, job_id):
+        super().__init__(message)
+        self.job_id = job_id
+
+
+class InvalidTransition(Exception):
+    """The order cannot move to the requested status from its current one"""
+
+
+def accept_bid(bid_id, user):
+    """
+    Accept a bid on behalf of the job's owner and create its order.
+
+    Locks the job row, flips the job to In Progress and the bid to Accepted
+    only if they are still Open and Pending, rejects the other pending bids
+    and returns the new Order. Raises Bid.DoesNotExist, PermissionDenied or
+    BidNotAcceptable.
+    """
+    with transaction.atomic():
+        job_id, freelancer_id, amount, delivery_days = Bid.objects.values_list(
+            'job_id', 'freelancer_id', 'bid_amount', 'delivery_days'
+        ).get(pk=bid_id)
+        job = Job.objects.select_for_update().only('id', 'client_id').get(pk=job_id)
+        if job.client_id != user.id:
+            raise PermissionDenied("You don't have permission to accept this bid.")
+
+        now = timezone.now()
+        # Once the others are rejected the accepted bid is the job's only active one
+        accepted = bid_stats.single_bid_stats(amount, delivery_days)
+        if not Job.objects.filter(pk=job_id, status='Open').update(status='In Progress', updated_at=now, **accepted):
+            raise BidNotAcceptable('This job already has an accepted bid.', job_id)
+        if not Bid.objects.filter(pk=bid_id, status='Pending').update(status='Accepted'):
+            raise BidNotAcceptable('This bid is no longer pending.', job_id)
+
+        # Bulk UPDATEs skip model signals, so adjust the bidders' stats here
+        rejected = Bid.objects.filter(job_id=job_id, status='Pending').exclude(pk=bid_id)
+        rejected_bidders = list(rejected.values_list('freelancer_id', flat=True))
+        rejected.update(status='Rejected')
+        stats.bump_many([freelancer_id] + rejected_bidders, create=False, pending_bids=-1)
+        # The job's status changed with an UPDATE too
+        caching.bump(caching.JOBS)
+
+        return Order.objects.create(
+            client_id=job.client_id,
+            freelancer_id=freelancer_id,
+            job_id=job_id,
+            price=amount,
+            status='In Progress',
+        )
+
+
+def transition_order(order, status):
+    """
+    Move an order to ``status`` with one conditional UPDATE.
+
+    The UPDATE only matches while the row still has the status ``order`` was
+    loaded with, so a concurrent change makes this raise InvalidTransition
+    instead of being overwritten. Sends order_status_changed on success.
+    """
+    previous = order.status
+    if not order.can_transition_to(status):
+        raise InvalidTransition(f'An order cannot move from {previous} to {status}.')
+
+    changes = {'status': status}
+    if status == 'Completed':
+        changes['completed_at'] = timezone.now()
+    with transaction.atomic():
+        if not Order.objects.filter(pk=order.pk, status=previous).update(**changes):
+            raise InvalidTransition(f'This order is no longer {previous}.')
+        for field, value in changes.items():
+            setattr(order, field, value)
+        events.order_status_changed.send(sender=Order, order=order, previous=previous)
+    return order
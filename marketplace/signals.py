@@ -1,26 +1,339 @@
-from django.db.models.signals import post_save
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_init, post_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from .models import FreelancerProfile, ClientProfile, Review, Order
+from .models import FreelancerProfile, ClientProfile, Category, Skill, Review, Order, Gig, Job, Bid, Message, UserStats, EarningsEntry
+from . import search
+from . import conversations
+from . import stats
+from . import ratings
+from . import earnings
+from . import events
+from . import caching
+from . import bid_stats
+from . import metrics
+from . import sqlite
 from django.utils import timezone
-from decimal import Decimal
+
+
+@receiver(post_init, sender=Review)
+def stash_review_rating(sender, instance, **kwargs):
+    """Remember the loaded rating so edits can adjust the totals"""
+    instance._saved_rating = instance.__dict__.get('rating')
 
 
 @receiver(post_save, sender=Review)
 def update_freelancer_rating(sender, instance, created, **kwargs):
-    """Update freelancer rating when a review is created"""
+    """Fold a new or edited review into the freelancer's rating totals"""
+    freelancer_id = Order.objects.filter(pk=instance.order_id).values_list('freelancer', flat=True).first()
     if created:
-        freelancer_profile = FreelancerProfile.objects.filter(user=instance.order.freelancer).first()
-        if freelancer_profile:
-            freelancer_profile.update_rating()
+        ratings.adjust_rating(freelancer_id, instance.rating, 1)
+    elif instance._saved_rating is None:
+        ratings.reconcile_ratings([freelancer_id])
+    elif instance.rating != instance._saved_rating:
+        ratings.adjust_rating(freelancer_id, instance.rating - instance._saved_rating, 0)
+    instance._saved_rating = instance.rating
+
+
+@receiver(post_delete, sender=Review)
+def remove_freelancer_rating(sender, instance, **kwargs):
+    """Take a deleted review out of the freelancer's rating totals"""
+    freelancer_id = Order.objects.filter(pk=instance.order_id).values_list('freelancer', flat=True).first()
+    if freelancer_id is not None:
+        ratings.adjust_rating(freelancer_id, -instance.rating, -1)
+
+
+@receiver(events.order_status_changed)
+def credit_completed_order(sender, order, previous, **kwargs):
+    """Credit the earnings ledger when a transition completes an order"""
+    if order.status == 'Completed':
+        earnings.credit_order(order)
+
+
+@receiver(events.order_status_changed)
+def complete_order_job(sender, order, previous, **kwargs):
+    """Completing a job's order completes the job"""
+    if order.status == 'Completed' and order.job_id:
+        Job.objects.filter(pk=order.job_id, status='In Progress').update(
+            status='Completed', updated_at=order.completed_at
+        )
+
+
+@receiver(post_delete, sender=EarningsEntry)
+def reverse_earnings(sender, instance, **kwargs):
+    """Take a removed ledger entry (its order was deleted) out of the balances"""
+    earnings.move_balances(instance.freelancer_id, -instance.amount)
+
+
+@receiver(post_save, sender=Gig)
+def index_gig(sender, instance, **kwargs):
+    """Keep the gig search index in sync"""
+    search.index_gigs(Gig.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=Job)
+def index_job(sender, instance, **kwargs):
+    """Keep the job search index in sync"""
+    search.index_jobs(Job.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=FreelancerProfile)
+def sync_freelancer_skills(sender, instance, created, **kwargs):
+    """Keep the normalized skill taxonomy in step with the skills text"""
+    update_fields = kwargs.get('update_fields')
+    if update_fields and 'skills' not in update_fields:
+        return
+    if created and not instance.skills:
+        return
+    instance.sync_skills()
+
+
+@receiver(post_save, sender=FreelancerProfile)
+def index_freelancer_gigs(sender, instance, **kwargs):
+    """Skills are part of every gig document, so re-index the freelancer's gigs"""
+    update_fields = kwargs.get('update_fields')
+    if update_fields and 'skills' not in update_fields:
+        return
+    search.index_gigs(Gig.objects.filter(freelancer=instance.user))
+
+
+@receiver(post_delete, sender=Gig)
+def unindex_gig(sender, instance, **kwargs):
+    search.unindex('gig', [instance.pk])
+
+
+@receiver(post_delete, sender=Job)
+def unindex_job(sender, instance, **kwargs):
+    search.unindex('job', [instance.pk])
+
+
+@receiver(post_save, sender=Message)
+def update_conversation(sender, instance, created, **kwargs):
+    """Keep the conversation summary in step with its messages"""
+    if created:
+        conversations.record_message(instance)
+    else:
+        conversations.refresh_conversation(instance.sender_id, instance.receiver_id)
+
+
+@receiver(post_delete, sender=Message)
+def refresh_conversation(sender, instance, **kwargs):
+    """Recompute the conversation summary after a message is removed"""
+    conversations.refresh_conversation(instance.sender_id, instance.receiver_id)
+
+
+# ==================== Dashboard Stats ====================
+
+@receiver(post_save, sender=User)
+def create_user_stats(sender, instance, created, **kwargs):
+    """Every user starts with a zeroed stats row"""
+    if created:
+        UserStats.objects.bulk_create([UserStats(user_id=instance.pk)], ignore_conflicts=True)
+
+
+# Fields whose previous value decides which counters a save moves
+TRACKED_FIELDS = {
+    Order: ('status', 'price'),
+    Gig: ('is_active',),
+    Bid: ('status', 'bid_amount', 'delivery_days'),
+}
+
+
+def remember_state(instance):
+    # Read __dict__ so deferred fields are not fetched; None marks them unknown
+    instance._stats_state = tuple(instance.__dict__.get(field) for field in TRACKED_FIELDS[type(instance)])
+
+
+def previous_state(instance):
+    state = getattr(instance, '_stats_state', None)
+    if state is None or None in state:
+        return None
+    return state
+
+
+@receiver(post_init, sender=Order)
+@receiver(post_init, sender=Gig)
+@receiver(post_init, sender=Bid)
+def stash_stats_state(sender, instance, **kwargs):
+    """Remember loaded values so saves can tell what changed"""
+    remember_state(instance)
 
 
 @receiver(post_save, sender=Order)
-def update_freelancer_earnings(sender, instance, created, **kwargs):
-    """Update freelancer earnings when order is completed"""
-    if instance.status == 'Completed' and instance.completed_at:
-        freelancer_profile = FreelancerProfile.objects.filter(user=instance.freelancer).first()
-        if freelancer_profile:
-            # Ensure price is Decimal type
-            freelancer_profile.total_earnings += Decimal(str(instance.price))
-            freelancer_profile.save()
+def update_order_stats(sender, instance, created, **kwargs):
+    """
+    Credit earnings and move order counters and totals between status buckets.
+
+    One receiver for both, because move_order_stats() re-stashes the order's
+    state: each needs the state from before this save.
+    """
+    previous = None if created else previous_state(instance)
+    if instance.status == 'Completed' and not (previous and previous[0] == 'Completed'):
+        # Idempotent either way: the ledger holds at most one entry per order
+        earnings.credit_order(instance)
+    if not created and previous is None:
+        stats.rebuild_user_stats([instance.freelancer_id, instance.client_id])
+        remember_state(instance)
+    else:
+        move_order_stats(instance, previous)
+
+
+@receiver(events.order_status_changed)
+def transition_order_stats(sender, order, previous, **kwargs):
+    """Move counters for a status transition made with a bulk UPDATE"""
+    move_order_stats(order, (previous, order.price))
+
+
+def move_order_stats(order, previous):
+    """Apply the counter changes from ``previous`` (status, price), or from nothing, to the order's current state"""
+    freelancer, client = stats.order_deltas(order.status, order.price)
+    if previous is not None:
+        old_freelancer, old_client = stats.order_deltas(*previous, sign=-1)
+        freelancer, client = stats.merge(freelancer, old_freelancer), stats.merge(client, old_client)
+    if order.freelancer_id == order.client_id:
+        stats.bump(order.freelancer_id, **stats.merge(freelancer, client))
+    else:
+        stats.bump(order.freelancer_id, **freelancer)
+        stats.bump(order.client_id, **client)
+    # A later save() of the same instance must not count the change again
+    remember_state(order)
+
+
+@receiver(post_delete, sender=Order)
+def remove_order_stats(sender, instance, **kwargs):
+    freelancer, client = stats.order_deltas(instance.status, instance.price, sign=-1)
+    stats.bump(instance.freelancer_id, create=False, **freelancer)
+    stats.bump(instance.client_id, create=False, **client)
+
+
+@receiver(post_save, sender=Gig)
+def update_gig_stats(sender, instance, created, **kwargs):
+    """Count a freelancer's active gigs"""
+    previous = None if created else previous_state(instance)
+    if not created and previous is None:
+        stats.rebuild_user_stats([instance.freelancer_id])
+    else:
+        was_active = bool(previous and previous[0])
+        stats.bump(instance.freelancer_id, active_gigs=int(instance.is_active) - int(was_active))
+    remember_state(instance)
+
+
+@receiver(post_delete, sender=Gig)
+def remove_gig_stats(sender, instance, **kwargs):
+    if instance.is_active:
+        stats.bump(instance.freelancer_id, create=False, active_gigs=-1)
+
+
+# Registered before update_bid_stats, which re-stashes the bid's state
+@receiver(post_save, sender=Bid)
+def update_job_bid_stats(sender, instance, created, **kwargs):
+    """Fold a new or changed bid into its job's bid statistics"""
+    if created:
+        entering = [instance.bid_amount] if bid_stats.is_active(instance.status) else []
+        bid_stats.adjust_bid_stats(instance.job_id, count_delta=1, entering=entering)
+        return
+    previous = previous_state(instance)
+    if previous is None:
+        bid_stats.rebuild_bid_stats([instance.job_id])
+        return
+    status, amount, delivery_days = previous
+    leaving = [amount] if bid_stats.is_active(status) else []
+    entering = [instance.bid_amount] if bid_stats.is_active(instance.status) else []
+    if leaving != entering or (entering and delivery_days != instance.delivery_days):
+        bid_stats.adjust_bid_stats(instance.job_id, entering=entering, leaving=leaving)
+
+
+@receiver(post_delete, sender=Bid)
+def remove_job_bid_stats(sender, instance, **kwargs):
+    leaving = [instance.bid_amount] if bid_stats.is_active(instance.status) else []
+    bid_stats.adjust_bid_stats(instance.job_id, count_delta=-1, leaving=leaving)
+
+
+@receiver(post_save, sender=Bid)
+def update_bid_stats(sender, instance, created, **kwargs):
+    """Count a freelancer's pending bids"""
+    previous = None if created else previous_state(instance)
+    if not created and previous is None:
+        stats.rebuild_user_stats([instance.freelancer_id])
+    else:
+        was_pending = bool(previous and previous[0] == 'Pending')
+        stats.bump(instance.freelancer_id, pending_bids=int(instance.status == 'Pending') - int(was_pending))
+    remember_state(instance)
+
+
+@receiver(post_delete, sender=Bid)
+def remove_bid_stats(sender, instance, **kwargs):
+    if instance.status == 'Pending':
+        stats.bump(instance.freelancer_id, create=False, pending_bids=-1)
+
+
+@receiver(post_save, sender=Job)
+def update_job_stats(sender, instance, created, **kwargs):
+    """Count a client's posted jobs"""
+    if created:
+        stats.bump(instance.client_id, posted_jobs=1)
+
+
+@receiver(post_delete, sender=Job)
+def remove_job_stats(sender, instance, **kwargs):
+    stats.bump(instance.client_id, create=False, posted_jobs=-1)
+
+
+# ==================== Cache Invalidation ====================
+
+@receiver(post_save, sender=Gig)
+@receiver(post_save, sender=Job)
+@receiver(post_save, sender=Bid)
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Skill)
+@receiver(post_save, sender=FreelancerProfile)
+@receiver(post_save, sender=Order)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Gig)
+@receiver(post_delete, sender=Job)
+@receiver(post_delete, sender=Bid)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Skill)
+@receiver(post_delete, sender=FreelancerProfile)
+@receiver(post_delete, sender=Order)
+@receiver(post_delete, sender=Review)
+def invalidate_cache(sender, **kwargs):
+    """Drop cached values that read the changed model"""
+    caching.bump_for_model(sender)
+
+
+@receiver(events.order_status_changed)
+def invalidate_order_cache(sender, order, previous, **kwargs):
+    # Transitions are bulk UPDATEs, and completing an order completes its job
+    if order.status == 'Completed' and order.job_id:
+        caching.bump(caching.ORDERS, caching.JOBS)
+    else:
+        caching.bump(caching.ORDERS)
+
+
+# ==================== Metrics ====================
+
+CREATED_COUNTERS = {
+    Order: metrics.ORDERS_CREATED,
+    Bid: metrics.BIDS_SUBMITTED,
+    Message: metrics.MESSAGES_SENT,
+}
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_save, sender=Bid)
+@receiver(post_save, sender=Message)
+def count_created(sender, instance, created, **kwargs):
+    """Business counters exposed at /metrics/"""
+    if created:
+        CREATED_COUNTERS[sender].inc()
+
+
+# ==================== Database Tuning ====================
+
+@receiver(connection_created)
+def tune_sqlite(sender, connection, **kwargs):
+    """Apply the SQLite production profile to each new connection"""
+    if connection.vendor == 'sqlite' and getattr(settings, 'SQLITE_TUNING', False):
+        sqlite.tune_connection(connection)
@@ -0,0 +1,42 @@
+"""
+Parsing and normalization for freelancer skills.
+
+Skills are typed by freelancers as a comma-separated string; each entry is
+normalized to a slug so that "Python", " python" and "PYTHON" share one
+Skill row, while "Java" and "JavaScript" stay distinct.
+"""
+from django.utils.text import slugify
+
+# Symbols that carry meaning in skill names and would be lost by slugify
+SYMBOLS = (
+    ('+', ' plus '),
+    ('#', ' sharp '),
+)
+
+
+def skill_slug(name):
+    """Normalize a skill name to its slug, e.g. 'C++' -> 'c-plus-plus'"""
+    name = name.strip().lower()
+    for symbol, replacement in SYMBOLS:
+        name = name.replace(symbol, replacement)
+    # Names with no Latin letters or digits, e.g. '日本語', keep a Unicode
+    # slug; everything else keeps the ASCII slug its Skill row already has
+    return (slugify(name) or slugify(name, allow_unicode=True))[:100]
+
+
+def parse_skills(text):
+    """Split a comma-separated skills string into unique (name, slug) pairs"""
+    seen = set()
+    skills = []
+    for raw in (text or '').split(','):
+        name = ' '.join(raw.split())[:100]
+        slug = skill_slug(name)
+        if slug and slug not in seen:
+            seen.add(slug)
+            skills.append((name, slug))
+    return skills
+
+
+def skill_slugs(values):
+    """Unique slugs of skill filter values, e.g. ['C++', 'c-plus-plus'] -> ['c-plus-plus']"""
+    return list(dict.fromkeys(slug for slug in map(skill_slug, values) if slug))
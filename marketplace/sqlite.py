@@ -0,0 +1,235 @@
+"""
+SQLite production profile (settings.SQLITE_TUNING).
+
+Stock SQLite serializes gunicorn workers on one file lock: readers block
+the writer, and two deferred transactions that both read before writing
+fail with "database is locked" without waiting. The profile switches to
+WAL (readers and the writer no longer block each other), relaxes fsyncs to
+synchronous=NORMAL, sizes mmap and the page cache, waits busy_timeout
+for the write lock, and begins transactions IMMEDIATE so they take the
+write lock up front. GET requests to list and detail views read through a
+separate read-only connection (READ_ALIAS) via ReadRouter, keeping their
+reads out of the write path.
+
+run_benchmark() measures the difference under concurrent writes; see the
+benchmark_sqlite command.
+"""
+import random
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from urllib.parse import quote
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+READ_ALIAS = 'read'
+
+_reading = ContextVar('marketplace_reading', default=False)
+
+
+def read_only_name(path):
+    """URI opening the database file at ``path`` read-only"""
+    return f'file:{quote(str(path))}?mode=ro'
+
+
+def apply_pragmas(conn, readonly=False):
+    """Tune a DB-API sqlite3 connection according to the SQLITE_* settings"""
+    pragmas = [
+        f"busy_timeout = {getattr(settings, 'SQLITE_BUSY_TIMEOUT', 5000)}",
+        'synchronous = NORMAL',
+        f"mmap_size = {getattr(settings, 'SQLITE_MMAP_SIZE', 256 * 1024 * 1024)}",
+        # Negative sizes are KiB rather than pages
+        f"cache_size = -{getattr(settings, 'SQLITE_CACHE_SIZE', 32 * 1024)}",
+        'temp_store = MEMORY',
+    ]
+    # The journal mode is stored in the file, which a read-only connection cannot change
+    if not readonly:
+        pragmas.insert(0, 'journal_mode = WAL')
+    for pragma in pragmas:
+        conn.execute(f'PRAGMA {pragma}')
+
+
+def tune_connection(connection):
+    """connection_created hook for Django's SQLite connections"""
+    apply_pragmas(connection.connection, readonly=connection.alias == READ_ALIAS)
+    # Django < 5.1 has no OPTIONS['transaction_mode']
+    if not hasattr(connection, 'transaction_mode') and connection.alias != READ_ALIAS:
+        connection._start_transaction_under_autocommit = lambda: connection.cursor().execute('BEGIN IMMEDIATE')
+
+
+# ==================== Read connection ====================
+
+@contextmanager
+def reading():
+    """Route reads inside the block to READ_ALIAS (see ReadRouter)"""
+    token = _reading.set(True)
+    try:
+        yield
+    finally:
+        _reading.reset(token)
+
+
+class ReadRouter:
+    """
+    Database router sending reads made under reading() to READ_ALIAS.
+
+    Reads inside a transaction on the default connection stay there, so a
+    transaction sees its own writes; writes always go to the default.
+    """
+
+    def db_for_read(self, model, **hints):
+        if _reading.get() and not connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return READ_ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        # Objects loaded through the read connection are saved through the default one
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return {obj1._state.db, obj2._state.db} <= {DEFAULT_DB_ALIAS, READ_ALIAS} or None
+
+    def allow_migrate(self, db, app_label, **hints):
+        return False if db == READ_ALIAS else None
+
+
+class ReadConnectionMixin:
+    """List and detail views: GET and HEAD requests read through the read-only connection"""
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return super().dispatch(request, *args, **kwargs)
+        with reading():
+            response = super().dispatch(request, *args, **kwargs)
+            # Lazy template responses would otherwise read outside the block
+            if hasattr(response, 'render') and not getattr(response, 'is_rendered', True):
+                response.render()
+        return response
+
+
+# ==================== Benchmark ====================
+
+# A message thread per pair of users: each write reads the thread's
+# summary, inserts a message and updates the summary, like send_message
+SCHEMA = [
+    'CREATE TABLE thread (id INTEGER PRIMARY KEY, messages INTEGER NOT NULL, last_message INTEGER)',
+    'CREATE TABLE message (id INTEGER PRIMARY KEY, thread_id INTEGER NOT NULL, content TEXT NOT NULL, '
+    'sent REAL NOT NULL)',
+    'CREATE INDEX message_thread_idx ON message (thread_id, id)',
+]
+
+PROFILES = ('stock', 'tuned')
+
+
+def connect(path, profile, readonly=False):
+    """Autocommit connection to ``path`` as Django would open it under ``profile``"""
+    conn = sqlite3.connect(
+        read_only_name(path) if readonly else path, uri=readonly, timeout=5, isolation_level=None,
+    )
+    if profile == 'tuned':
+        apply_pragmas(conn, readonly=readonly)
+    return conn
+
+
+def prepare(path, profile, threads=200, messages=20000, seed=0):
+    """Create the benchmark schema at ``path`` with ``messages`` rows spread over ``threads``"""
+    rng = random.Random(seed)
+    conn = connect(path, profile)
+    conn.execute('PRAGMA journal_mode = ' + ('WAL' if profile == 'tuned' else 'DELETE'))
+    for statement in SCHEMA:
+        conn.execute(statement)
+    conn.execute('BEGIN')
+    conn.executemany('INSERT INTO thread (id, messages) VALUES (?, 0)', [(i,) for i in range(1, threads + 1)])
+    conn.executemany(
+        'INSERT INTO message (thread_id, content, sent) VALUES (?, ?, ?)',
+        [(rng.randint(1, threads), 'x' * rng.randint(20, 400), time.time()) for _ in range(messages)],
+    )
+    conn.execute('UPDATE thread SET messages = (SELECT COUNT(*) FROM message WHERE thread_id = thread.id)')
+    conn.execute('COMMIT')
+    conn.close()
+
+
+def write_load(path, profile, seconds, threads, seed):
+    """Send messages for ``seconds``; returns (writes, lock errors, latencies in ms)"""
+    rng = random.Random(seed)
+    conn = connect(path, profile)
+    begin = 'BEGIN IMMEDIATE' if profile == 'tuned' else 'BEGIN'
+    writes, errors, latencies = 0, 0, []
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        thread = rng.randint(1, threads)
+        started = time.perf_counter()
+        try:
+            conn.execute(begin)
+            conn.execute('SELECT messages FROM thread WHERE id = ?', (thread,)).fetchone()
+            message = conn.execute(
+                'INSERT INTO message (thread_id, content, sent) VALUES (?, ?, ?)',
+                (thread, 'x' * rng.randint(20, 400), time.time()),
+            ).lastrowid
+            conn.execute(
+                'UPDATE thread SET messages = messages + 1, last_message = ? WHERE id = ?', (message, thread),
+            )
+            conn.execute('COMMIT')
+        except sqlite3.OperationalError:
+            # "database is locked": the request would have failed with a 500
+            errors += 1
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            continue
+        writes += 1
+        latencies.append((time.perf_counter() - started) * 1000)
+    conn.close()
+    return writes, errors, latencies
+
+
+def read_load(path, profile, seconds, threads, seed):
+    """Load thread pages for ``seconds``; returns (reads, lock errors, latencies in ms)"""
+    rng = random.Random(seed)
+    conn = connect(path, profile, readonly=profile == 'tuned')
+    reads, errors, latencies = 0, 0, []
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        thread = rng.randint(1, threads)
+        started = time.perf_counter()
+        try:
+            conn.execute('SELECT messages, last_message FROM thread WHERE id = ?', (thread,)).fetchone()
+            conn.execute(
+                'SELECT id, content, sent FROM message WHERE thread_id = ? ORDER BY id DESC LIMIT 20', (thread,),
+            ).fetchall()
+        except sqlite3.OperationalError:
+            errors += 1
+            continue
+        reads += 1
+        latencies.append((time.perf_counter() - started) * 1000)
+    conn.close()
+    return reads, errors, latencies
+
+
+def run_benchmark(profile, writers=4, readers=4, seconds=5.0, threads=200, messages=20000, seed=0):
+    """
+    Run ``writers`` and ``readers`` processes against a fresh database under
+    ``profile`` ('stock' or 'tuned'); returns per-second throughput, lock
+    errors and p95 latencies.
+    """
+    from .benchmarks import percentile
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = f'{directory}/benchmark.sqlite3'
+        prepare(path, profile, threads, messages, seed)
+        with ProcessPoolExecutor(max_workers=writers + readers) as pool:
+            write_jobs = [pool.submit(write_load, path, profile, seconds, threads, seed + i) for i in range(writers)]
+            read_jobs = [pool.submit(read_load, path, profile, seconds, threads, seed - i - 1) for i in range(readers)]
+            write_results = [job.result() for job in write_jobs]
+            read_results = [job.result() for job in read_jobs]
+
+    result = {'profile': profile, 'writers': writers, 'readers': readers, 'seconds': seconds}
+    for kind, results in (('writes', write_results), ('reads', read_results)):
+        latencies = [latency for _, _, process in results for latency in process]
+        result[f'{kind}_per_s'] = round(sum(done for done, _, _ in results) / seconds, 1)
+        result[f'{kind}_locked'] = sum(errors for _, errors, _ in results)
+        result[f'{kind}_p95_ms'] = round(percentile(latencies, 95), 2) if latencies else None
+    return result
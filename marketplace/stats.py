@@ -0,0 +1,183 @@
+"""
+Per-user dashboard statistics.
+
+UserStats rows are adjusted in place with F() expressions as orders, gigs,
+jobs and bids change, so the dashboard reads one row instead of counting a
+user's whole history. rebuild_user_stats() recomputes rows from scratch
+with conditional aggregates; it also materializes a row the first time a
+user needs one.
+"""
+from decimal import Decimal
+
+from django.apps import apps as global_apps
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Greatest
+
+from .models import UserStats
+
+# Order status -> counter suffix; other statuses are not counted
+ORDER_BUCKETS = {
+    'In Progress': 'active_orders',
+    'Completed': 'completed_orders',
+}
+
+COUNTERS = [
+    'freelancer_active_orders', 'freelancer_completed_orders', 'total_earned', 'active_gigs', 'pending_bids',
+    'client_active_orders', 'client_completed_orders', 'total_spent', 'posted_jobs',
+]
+
+
+def order_deltas(status, price, sign=1):
+    """Counter changes for (freelancer, client) when an order enters (+1) or leaves (-1) a state"""
+    freelancer, client = {}, {}
+    bucket = ORDER_BUCKETS.get(status)
+    if bucket:
+        freelancer[f'freelancer_{bucket}'] = sign
+        client[f'client_{bucket}'] = sign
+    if status == 'Completed':
+        # total_earned follows the earnings ledger instead (see earnings.py)
+        client['total_spent'] = sign * Decimal(str(price))
+    return freelancer, client
+
+
+def merge(*deltas):
+    """Sum several delta dicts"""
+    total = {}
+    for delta in deltas:
+        for field, value in delta.items():
+            total[field] = total.get(field, 0) + value
+    return {field: value for field, value in total.items() if value}
+
+
+def bump(user_id, create=True, **deltas):
+    """Apply counter deltas to one user's stats"""
+    bump_many([user_id], create=create, **deltas)
+
+
+def bump_many(user_ids, create=True, **deltas):
+    """
+    Apply the same counter deltas to several users in one UPDATE.
+
+    Users without a row get one built from the source tables unless
+    ``create`` is False (deletions, which may be cascading from the user).
+    """
+    deltas = {field: value for field, value in deltas.items() if value}
+    user_ids = set(user_ids)
+    if not deltas or not user_ids:
+        return
+    updated = UserStats.objects.filter(user_id__in=user_ids).update(
+        **{
+            # Clamp decrements so a drifted counter cannot fail the user's request
+            field: F(field) + value if value > 0 else Greatest(F(field) + value, 0)
+            for field, value in deltas.items()
+        }
+    )
+    if create and updated < len(user_ids):
+        # First change for some users: build their rows from the source tables,
+        # which already include this change
+        existing = UserStats.objects.filter(user_id__in=user_ids).values_list('user_id', flat=True)
+        rebuild_user_stats(user_ids - set(existing))
+
+
+def compute_user_stats(user_ids=None, apps=global_apps, using='default'):
+    """
+    Recompute counters from the source tables with one grouped query per table.
+
+    Every user gets an entry, zeroed when they have no activity. ``apps``
+    lets data migrations pass their historical app registry.
+    """
+    User = apps.get_model('auth', 'User')
+    Order = apps.get_model('marketplace', 'Order')
+    Gig = apps.get_model('marketplace', 'Gig')
+    Job = apps.get_model('marketplace', 'Job')
+    Bid = apps.get_model('marketplace', 'Bid')
+
+    def scoped(queryset, field):
+        queryset = queryset.using(using).order_by()
+        return queryset.filter(**{f'{field}__in': user_ids}) if user_ids is not None else queryset
+
+    stats = {}
+
+    def row(user_id):
+        return stats.setdefault(user_id, {field: 0 for field in COUNTERS})
+
+    for side in ('freelancer', 'client'):
+        for values in scoped(Order.objects, side).values(side).annotate(
+            active=Count('id', filter=Q(status='In Progress')),
+            completed=Count('id', filter=Q(status='Completed')),
+            total=Sum('price', filter=Q(status='Completed')),
+        ):
+            counters = row(values[side])
+            counters[f'{side}_active_orders'] = values['active']
+            counters[f'{side}_completed_orders'] = values['completed']
+            if side == 'client':
+                counters['total_spent'] = values['total'] or 0
+            else:
+                counters['total_earned'] = values['total'] or 0
+
+    try:
+        EarningsEntry = apps.get_model('marketplace', 'EarningsEntry')
+    except LookupError:
+        # Historical registries from before the ledger existed
+        EarningsEntry = None
+    if EarningsEntry is not None:
+        earned = dict(scoped(EarningsEntry.objects, 'freelancer').values_list('freelancer').annotate(Sum('amount')))
+        for user_id, counters in stats.items():
+            counters['total_earned'] = earned.pop(user_id, 0)
+        for user_id, total in earned.items():
+            row(user_id)['total_earned'] = total
+
+    for user_id, active in scoped(Gig.objects.filter(is_active=True), 'freelancer').values_list(
+        'freelancer'
+    ).annotate(Count('id')):
+        row(user_id)['active_gigs'] = active
+
+    for user_id, pending in scoped(Bid.objects.filter(status='Pending'), 'freelancer').values_list(
+        'freelancer'
+    ).annotate(Count('id')):
+        row(user_id)['pending_bids'] = pending
+
+    for user_id, posted in scoped(Job.objects, 'client').values_list('client').annotate(Count('id')):
+        row(user_id)['posted_jobs'] = posted
+
+    for user_id in scoped(User.objects, 'id').values_list('id', flat=True).iterator():
+        row(user_id)
+    return stats
+
+
+def rebuild_user_stats(user_ids=None, batch_size=1000, apps=global_apps, using='default'):
+    """Rewrite stats rows from the source tables (every user's when user_ids is None)"""
+    if user_ids is not None:
+        user_ids = set(user_ids)
+        if not user_ids:
+            return 0
+    stats = compute_user_stats(user_ids, apps, using)
+    UserStats = apps.get_model('marketplace', 'UserStats')
+
+    with transaction.atomic(using=using):
+        if user_ids is None:
+            UserStats.objects.using(using).all().delete()
+            UserStats.objects.using(using).bulk_create(
+                [UserStats(user_id=user_id, **counters) for user_id, counters in stats.items()],
+                batch_size=batch_size,
+            )
+            return len(stats)
+
+        for user_id, counters in stats.items():
+            try:
+                with transaction.atomic(using=using):
+                    UserStats.objects.using(using).update_or_create(user_id=user_id, defaults=counters)
+            except IntegrityError:
+                # Created concurrently from the same source rows
+                pass
+    return len(stats)
+
+
+def get_user_stats(user):
+    """The user's stats row (created with the user; rebuilt here if missing)"""
+    stats = UserStats.objects.filter(user=user).first()
+    if stats is None:
+        rebuild_user_stats([user.id])
+        stats = UserStats.objects.get(user=user)
+    return stats
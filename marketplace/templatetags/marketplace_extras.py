@@ -0,0 +1,70 @@
+from django import template
+
+from marketplace import caching
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def url_replace(context, **kwargs):
+    """Current querystring with the given parameters replaced, e.g. for page links"""
+    params = context['request'].GET.copy()
+    params.pop('cursor', None)
+    for key, value in kwargs.items():
+        params[key] = value
+    return '?' + params.urlencode()
+
+
+@register.tag
+def cachecards(parser, token):
+    """
+    Render a list of cards, reusing cached cards and rendering only the misses.
+
+        {% cachecards 'gig_card' gig in gigs %}...{% endcachecards %}
+        {% cachecards 'job_row' job in jobs job.client.username %}...{% endcachecards %}
+
+    Each card is keyed by its object's id and updated_at plus any trailing
+    expressions (see caching.fragment_key), and the whole page of cards is
+    fetched with one get_many. Card bodies must not depend on the viewer.
+    """
+    bits = token.split_contents()
+    if len(bits) < 5 or bits[3] != 'in':
+        raise template.TemplateSyntaxError(
+            f"'{bits[0]}' expects: {bits[0]} 'name' item in items [vary ...]"
+        )
+    nodelist = parser.parse(('endcachecards',))
+    parser.delete_first_token()
+    return CardCacheNode(
+        parser.compile_filter(bits[1]), bits[2], parser.compile_filter(bits[4]),
+        [parser.compile_filter(bit) for bit in bits[5:]], nodelist,
+    )
+
+
+class CardCacheNode(template.Node):
+
+    def __init__(self, name, var, sequence, vary, nodelist):
+        self.name = name
+        self.var = var
+        self.sequence = sequence
+        self.vary = vary
+        self.nodelist = nodelist
+
+    def render(self, context):
+        name = self.name.resolve(context)
+        items = list(self.sequence.resolve(context, ignore_failures=True) or ())
+        output = []
+        rendered = {}
+        with context.push():
+            keys = []
+            for item in items:
+                context[self.var] = item
+                keys.append(caching.fragment_key(name, item, *(vary.resolve(context) for vary in self.vary)))
+            cached = caching.CARDS.get_many(keys)
+            for item, key in zip(items, keys):
+                if key not in cached:
+                    context[self.var] = item
+                    rendered[key] = self.nodelist.render(context)
+                output.append(cached.get(key, rendered.get(key)))
+        if rendered:
+            caching.CARDS.set_many(rendered)
+        return ''.join(output)
@@ -0,0 +1,63 @@
+"""
+Endpoint benchmark runner tests.
+"""
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+
+from marketplace import benchmarks, urls
+from marketplace.models import Order
+
+
+class BenchmarkTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            'generate_load_data', freelancers=6, clients=6, gigs=10, jobs=8, bids=30, orders=30,
+            messages=60, seed=3, stdout=StringIO(),
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_every_url_is_covered(self):
+        _, targets = benchmarks.pick_targets()['client']
+        endpoints = benchmarks.discover_endpoints(targets)
+        self.assertEqual([name for name, _, _ in endpoints], [pattern.name for pattern in urls.urlpatterns])
+        self.assertTrue(all(url for _, url, skipped in endpoints if not skipped))
+
+    def test_run_measures_each_role_and_rolls_back(self):
+        orders = Order.objects.count()
+        results = benchmarks.run(iterations=3, warmup=1, names=['gig_list', 'order_list', 'purchase_gig'])
+        self.assertEqual(len(results), 9)
+        self.assertEqual(results['gig_list:anonymous']['status'], 200)
+        self.assertEqual(results['order_list:anonymous']['status'], 302)
+        self.assertGreater(results['order_list:client']['queries'], 0)
+        self.assertGreater(results['gig_list:freelancer']['bytes'], 0)
+        result = results['purchase_gig:client']
+        self.assertLessEqual(result['p50_ms'], result['p95_ms'])
+        self.assertLessEqual(result['p95_ms'], result['p99_ms'])
+        # Purchasing on GET created no orders that outlived the request
+        self.assertEqual(Order.objects.count(), orders)
+
+    def test_compare_flags_slower_and_chattier_endpoints(self):
+        baseline = {
+            'a:client': {'p95_ms': 10.0, 'queries': 5},
+            'b:client': {'p95_ms': 10.0, 'queries': 5},
+            'c:client': {'p95_ms': 1.0, 'queries': 5},
+            'd:client': {'skipped': 'no target'},
+        }
+        results = {
+            'a:client': {'p95_ms': 11.0, 'queries': 5},
+            'b:client': {'p95_ms': 20.0, 'queries': 6},
+            'c:client': {'p95_ms': 2.0, 'queries': 5},
+            'd:client': {'p95_ms': 50.0, 'queries': 5},
+            'e:client': {'p95_ms': 50.0, 'queries': 5},
+        }
+        regressions = benchmarks.compare(results, baseline, threshold=0.25, min_ms=2.0)
+        self.assertEqual([key for key, _ in regressions], ['b:client', 'b:client'])
+        self.assertEqual(benchmarks.percentile([5, 1, 4, 2, 3], 50), 3)
+        self.assertEqual(benchmarks.percentile([5, 1, 4, 2, 3], 99), 5)
@@ -0,0 +1,115 @@
+"""
+Bid acceptance tests, including concurrent clients accepting bids on the same jobs.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.exceptions import PermissionDenied
+from django.db import connection, OperationalError
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+
+from marketplace import services
+from marketplace.models import Job, Bid, Order, UserStats
+from marketplace.stats import compute_user_stats
+
+JOBS = 6
+BIDS_PER_JOB = 5
+WORKERS = 8
+
+
+def make_job(client_user, title='Job'):
+    return Job.objects.create(
+        client=client_user, title=title, description='Description', budget=500, deadline='2030-01-01',
+    )
+
+
+def make_bid(job, freelancer, amount=100):
+    return Bid.objects.create(job=job, freelancer=freelancer, proposal_text='Proposal', bid_amount=amount, delivery_days=3)
+
+
+class AcceptBidTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = User.objects.create_user('client', password='password123')
+        cls.freelancers = [User.objects.create_user(f'freelancer{i}', password='password123') for i in range(2)]
+
+    def setUp(self):
+        self.job = make_job(self.client_user)
+        self.bids = [make_bid(self.job, freelancer, 100 + i) for i, freelancer in enumerate(self.freelancers)]
+
+    def test_accepting_creates_one_order_and_rejects_the_rest(self):
+        order = services.accept_bid(self.bids[0].pk, self.client_user)
+
+        self.assertEqual((order.freelancer_id, order.price, order.status), (self.freelancers[0].pk, 100, 'In Progress'))
+        self.assertEqual(Job.objects.get(pk=self.job.pk).status, 'In Progress')
+        self.assertEqual(
+            dict(Bid.objects.values_list('freelancer', 'status')),
+            {self.freelancers[0].pk: 'Accepted', self.freelancers[1].pk: 'Rejected'},
+        )
+        self.assertEqual(UserStats.objects.get(user=self.freelancers[1]).pending_bids, 0)
+
+        with self.assertRaises(services.BidNotAcceptable):
+            services.accept_bid(self.bids[1].pk, self.client_user)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_only_the_job_owner_can_accept(self):
+        with self.assertRaises(PermissionDenied):
+            services.accept_bid(self.bids[0].pk, self.freelancers[1])
+        self.assertFalse(Order.objects.exists())
+
+    def test_view_redirects_when_already_accepted(self):
+        self.client.force_login(self.client_user)
+        self.assertRedirects(
+            self.client.get(reverse('accept_bid', args=[self.bids[0].pk])), reverse('order_list'),
+            fetch_redirect_response=False,
+        )
+        self.assertRedirects(
+            self.client.get(reverse('accept_bid', args=[self.bids[1].pk])), reverse('job_detail', args=[self.job.pk]),
+            fetch_redirect_response=False,
+        )
+        self.assertEqual(self.client.get(reverse('accept_bid', args=[0])).status_code, 404)
+
+
+class ConcurrentAcceptBidTests(TransactionTestCase):
+
+    def setUp(self):
+        self.client_user = User.objects.create_user('client', password='password123')
+        self.freelancers = [User.objects.create_user(f'freelancer{i}', password='password123') for i in range(BIDS_PER_JOB)]
+        self.jobs = [make_job(self.client_user, f'Job {i}') for i in range(JOBS)]
+        self.bid_ids = [make_bid(job, freelancer).pk for job in self.jobs for freelancer in self.freelancers]
+
+    def accept(self, bid_id):
+        try:
+            # SQLite allows one writer at a time; a client retrying is fine
+            for _ in range(50):
+                try:
+                    return services.accept_bid(bid_id, self.client_user).job_id
+                except services.BidNotAcceptable:
+                    return None
+                except OperationalError as e:
+                    if 'locked' not in str(e):
+                        raise
+                    time.sleep(0.005)
+            raise AssertionError('Gave up retrying a locked database')
+        finally:
+            connection.close()
+
+    def test_each_job_gets_exactly_one_order(self):
+        # Several clients racing for every bid of every job
+        attempts = self.bid_ids * 2
+        with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+            accepted = [job_id for job_id in pool.map(self.accept, attempts) if job_id is not None]
+
+        self.assertEqual(sorted(accepted), sorted(job.pk for job in self.jobs))
+        for job in self.jobs:
+            self.assertEqual(Order.objects.filter(job=job).count(), 1)
+            self.assertEqual(job.bids.filter(status='Accepted').count(), 1)
+            self.assertFalse(job.bids.filter(status='Pending').exists())
+        user_ids = [user.pk for user in self.freelancers]
+        self.assertEqual(
+            {user_id: values['pending_bids'] for user_id, values in compute_user_stats(user_ids).items()},
+            dict(UserStats.objects.filter(user__in=user_ids).values_list('user', 'pending_bids')),
+        )
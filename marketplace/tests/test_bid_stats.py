@@ -0,0 +1,98 @@
+"""
+Job bid statistics and bid pagination tests.
+"""
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from marketplace import services
+from marketplace.bid_stats import rebuild_bid_stats
+from marketplace.models import Job, Bid
+
+
+class BidStatsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = User.objects.create_user('client', password='password123')
+        cls.freelancers = [User.objects.create(username=f'freelancer{i}') for i in range(25)]
+
+    def setUp(self):
+        cache.clear()
+        self.job = Job.objects.create(
+            client=self.client_user, title='Build an API', description='Work', budget=500, deadline='2030-01-01',
+        )
+
+    def bid(self, index, amount, days):
+        return Bid.objects.create(
+            job=self.job, freelancer=self.freelancers[index], proposal_text='Me',
+            bid_amount=amount, delivery_days=days,
+        )
+
+    def stats(self):
+        job = Job.objects.get(pk=self.job.pk)
+        return job.bid_count, job.min_bid, job.avg_bid, job.median_delivery_days
+
+    def test_bids_are_counted_as_they_arrive(self):
+        self.assertEqual(self.stats(), (0, None, None, None))
+        self.bid(0, 300, 10)
+        self.bid(1, 200, 4)
+        self.assertEqual(self.stats(), (2, Decimal('200'), Decimal('250'), Decimal('7')))
+        self.bid(2, 250, 5)
+        self.assertEqual(self.stats(), (3, Decimal('200'), Decimal('250'), Decimal('5')))
+
+    def test_rejected_and_deleted_bids_leave_the_statistics(self):
+        cheapest = self.bid(0, 100, 2)
+        self.bid(1, 200, 4)
+        latest = self.bid(2, 400, 9)
+
+        cheapest.status = 'Rejected'
+        cheapest.save()
+        self.assertEqual(self.stats(), (3, Decimal('200'), Decimal('300'), Decimal('6.5')))
+
+        latest.delete()
+        self.assertEqual(self.stats(), (2, Decimal('200'), Decimal('200'), Decimal('4')))
+
+        cheapest.status = 'Pending'
+        cheapest.save()
+        self.assertEqual(self.stats(), (2, Decimal('100'), Decimal('150'), Decimal('3')))
+
+    def test_accepting_leaves_only_the_accepted_bid(self):
+        self.bid(0, 100, 2)
+        accepted = self.bid(1, 300, 6)
+        self.bid(2, 200, 4)
+        services.accept_bid(accepted.pk, self.client_user)
+        self.assertEqual(self.stats(), (3, Decimal('300'), Decimal('300'), Decimal('6')))
+        self.assertEqual(rebuild_bid_stats(), 0)
+
+    def test_rebuild_corrects_drifted_jobs(self):
+        self.bid(0, 100, 2)
+        self.bid(1, 200, 3)
+        Job.objects.filter(pk=self.job.pk).update(bid_count=9, min_bid=1, avg_bid=None)
+        call_command('rebuild_bid_stats', stdout=StringIO())
+        self.assertEqual(self.stats(), (2, Decimal('100'), Decimal('150'), Decimal('2.5')))
+        self.assertEqual(rebuild_bid_stats(), 0)
+
+    def test_detail_page_pages_and_sorts_bids(self):
+        for index in range(25):
+            self.bid(index, 100 + (index * 7) % 25, 1 + index % 5)
+        url = reverse('job_detail', args=[self.job.pk])
+
+        response = self.client.get(url, {'sort': 'amount'})
+        page = response.context['bids']
+        amounts = [bid.bid_amount for bid in page]
+        self.assertEqual(len(amounts), 20)
+        self.assertEqual(amounts, sorted(amounts))
+        self.assertContains(response, 'Bids (25)')
+
+        rest = self.client.get(url + page.next_querystring).context['bids']
+        self.assertEqual(len(rest), 5)
+        self.assertGreaterEqual(rest.object_list[0].bid_amount, amounts[-1])
+
+        days = [bid.delivery_days for bid in self.client.get(url, {'sort': 'delivery'}).context['bids']]
+        self.assertEqual(days, sorted(days))
@@ -0,0 +1,62 @@
+"""
+Versioned cache namespace tests.
+"""
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+
+from marketplace import caching
+from marketplace.models import Category, Order
+from marketplace.services import transition_order
+
+
+class CachingTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_get_or_set_computes_once(self):
+        calls = []
+        compute = lambda: calls.append(1) or 'value'
+        self.assertEqual(caching.GIGS.get_or_set('featured', compute), 'value')
+        self.assertEqual(caching.GIGS.get_or_set('featured', compute), 'value')
+        self.assertEqual(len(calls), 1)
+
+    def test_bump_orphans_only_its_namespace(self):
+        caching.GIGS.set('featured', 'gigs')
+        caching.ORDERS.set('recent', 'orders')
+        caching.GIGS.bump()
+        self.assertIsNone(caching.GIGS.get('featured'))
+        self.assertEqual(caching.ORDERS.get('recent'), 'orders')
+
+    def test_evicted_version_does_not_revive_old_keys(self):
+        caching.JOBS.set('open', 'stale')
+        cache.delete(caching.JOBS.version_key)
+        caching.JOBS.bump()
+        self.assertIsNone(caching.JOBS.get('open'))
+
+    def test_get_many_and_set_many(self):
+        caching.REVIEWS.set_many({'a': 1, 'b': 2})
+        self.assertEqual(caching.REVIEWS.get_many(['a', 'b', 'c']), {'a': 1, 'b': 2})
+
+    def test_model_changes_invalidate(self):
+        self.assertEqual(caching.get_categories(), [])
+        category = Category.objects.create(name='Design', description='Design')
+        self.assertEqual(caching.get_categories(), [category])
+
+        caching.GIGS.set('featured', 'cached')
+        category.delete()
+        self.assertEqual(caching.get_categories(), [])
+        self.assertIsNone(caching.GIGS.get('featured'))
+
+    def test_order_transitions_invalidate(self):
+        user = User.objects.create_user('someone', password='password123')
+        order = Order.objects.create(client=user, freelancer=user, price=10)
+        caching.ORDERS.set('recent', 'cached')
+        transition_order(order, 'Completed')
+        self.assertIsNone(caching.ORDERS.get('recent'))
+
+    def test_categories_are_served_from_cache(self):
+        caching.get_categories()
+        with self.assertNumQueries(0):
+            caching.get_categories()
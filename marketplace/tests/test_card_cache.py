@@ -0,0 +1,71 @@
+"""
+Listing card fragment cache tests.
+"""
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.template import Context, Template
+from django.test import TestCase
+
+from marketplace import caching
+from marketplace.models import Category, Gig
+
+CARDS = Template(
+    "{% load marketplace_extras %}"
+    "{% cachecards 'card' gig in gigs gig.extra %}[{{ gig.title }}|{{ gig.category.name }}]{% endcachecards %}"
+)
+
+
+class CardCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Video', description='Video')
+        freelancer = User.objects.create_user('freelancer', password='password123')
+        for title in ('Intro', 'Outro', 'Trailer'):
+            Gig.objects.create(
+                freelancer=freelancer, title=title, description='Work', category=cls.category,
+                price=10, delivery_time=1,
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def render(self, gigs):
+        return CARDS.render(Context({'gigs': gigs}))
+
+    def gigs(self):
+        return list(Gig.objects.order_by('id'))
+
+    def test_cards_render_in_order_and_come_back_from_cache(self):
+        self.assertEqual(self.render(self.gigs()), '[Intro|Video][Outro|Video][Trailer|Video]')
+
+        # Changing an instance without saving it is invisible: its card is cached
+        gigs = self.gigs()
+        gigs[0].title = 'Unsaved'
+        with mock.patch.object(caching.cache, 'get_many', wraps=caching.cache.get_many) as get_many:
+            self.assertEqual(self.render(gigs), '[Intro|Video][Outro|Video][Trailer|Video]')
+        # One round trip for the namespace version, one for every card
+        self.assertEqual(get_many.call_count, 2)
+
+    def test_only_changed_cards_are_rendered_again(self):
+        self.render(self.gigs())
+        gig = Gig.objects.get(title='Outro')
+        gig.title = 'Credits'
+        gig.save()
+
+        with mock.patch.object(caching.cache, 'set_many', wraps=caching.cache.set_many) as set_many:
+            self.assertEqual(self.render(self.gigs()), '[Intro|Video][Credits|Video][Trailer|Video]')
+        self.assertEqual(len(set_many.call_args.args[0]), 1)
+
+    def test_vary_values_and_categories_change_the_key(self):
+        gigs = self.gigs()
+        self.render(gigs)
+        gigs[0].extra = 'new bid count'
+        gigs[0].title = 'Rendered again'
+        self.assertTrue(self.render(gigs).startswith('[Rendered again|Video]'))
+
+        self.category.name = 'Film'
+        self.category.save()
+        self.assertEqual(self.render(self.gigs()), '[Intro|Film][Outro|Film][Trailer|Film]')
@@ -0,0 +1,89 @@
+"""
+Conditional GET tests for detail pages.
+"""
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from marketplace.models import FreelancerProfile, ClientProfile, Gig, Job, Bid, Order, Review
+
+
+class ConditionalGetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.freelancer = User.objects.create_user('freelancer', password='password123')
+        FreelancerProfile.objects.create(user=cls.freelancer, skills='Go', bio='Bio', hourly_rate=10)
+        cls.client_user = User.objects.create_user('client', password='password123')
+        ClientProfile.objects.create(user=cls.client_user, contact_info='client@example.com')
+        cls.gig = Gig.objects.create(
+            freelancer=cls.freelancer, title='API work', description='Work', price=100, delivery_time=3,
+        )
+        cls.job = Job.objects.create(
+            client=cls.client_user, title='Build an API', description='Work', budget=300, deadline='2030-01-01',
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def revalidate(self, url):
+        """Fetch ``url`` and return the status of an immediate conditional re-fetch"""
+        etag = self.client.get(url)['ETag']
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code
+
+    def test_unchanged_gig_is_not_modified_after_one_query(self):
+        url = reverse('gig_detail', args=[self.gig.pk])
+        response = self.client.get(url)
+        self.assertTrue(response['ETag'].startswith('"'))
+        self.assertIn('no-cache', response['Cache-Control'])
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_reviews_and_edits_change_the_gig_etag(self):
+        url = reverse('gig_detail', args=[self.gig.pk])
+        etag = self.client.get(url)['ETag']
+        order = Order.objects.create(
+            client=self.client_user, freelancer=self.freelancer, gig=self.gig, price=100, status='Completed',
+        )
+        Review.objects.create(order=order, rating=5, review_text='Great')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        etag = self.client.get(url)['ETag']
+        self.gig.price = 120
+        self.gig.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_bids_and_viewers_change_the_job_etag(self):
+        url = reverse('job_detail', args=[self.job.pk])
+        anonymous = self.client.get(url)['ETag']
+        self.client.force_login(self.freelancer)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=anonymous).status_code, 200)
+
+        etag = self.client.get(url)['ETag']
+        Bid.objects.create(job=self.job, freelancer=self.freelancer, proposal_text='Me', bid_amount=250, delivery_days=4)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        self.assertEqual(self.revalidate(url), 304)
+
+    def test_profile_changes_with_the_profile_and_rating(self):
+        self.client.force_login(self.client_user)
+        url = reverse('profile_view_user', args=['freelancer'])
+        self.assertEqual(self.revalidate(url), 304)
+
+        etag = self.client.get(url)['ETag']
+        order = Order.objects.create(
+            client=self.client_user, freelancer=self.freelancer, price=100, status='Completed',
+        )
+        Review.objects.create(order=order, rating=4, review_text='Good')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        self.assertEqual(self.client.get(reverse('profile_view_user', args=['nobody'])).status_code, 404)
+
+    def test_pending_messages_get_the_full_page(self):
+        url = reverse('gig_detail', args=[self.gig.pk])
+        etag = self.client.get(url)['ETag']
+        self.client.cookies['messages'] = 'pending'
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
@@ -0,0 +1,132 @@
+"""
+Conversation summary tests.
+
+The incrementally maintained summaries must always match a full rebuild
+from the Message table.
+"""
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from marketplace.conversations import rebuild_conversations
+from marketplace.models import Message, Conversation, ConversationMember
+
+
+class ConversationSummaryTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user('alice', password='password123')
+        cls.bob = User.objects.create_user('bob', password='password123')
+        cls.carol = User.objects.create_user('carol', password='password123')
+
+    def snapshot(self):
+        return sorted(
+            ConversationMember.objects.values_list(
+                'user', 'partner', 'unread_count', 'last_timestamp', 'conversation__last_message'
+            )
+        )
+
+    def assertMatchesRebuild(self):
+        incremental = self.snapshot()
+        rebuild_conversations(Message, Conversation, ConversationMember)
+        self.assertEqual(incremental, self.snapshot())
+
+    def member(self, user, partner):
+        return ConversationMember.objects.select_related('conversation').get(user=user, partner=partner)
+
+    def test_messages_update_summary(self):
+        Message.objects.create(sender=self.alice, receiver=self.bob, content='Hi')
+        last = Message.objects.create(sender=self.alice, receiver=self.bob, content='Are you there?')
+        Message.objects.create(sender=self.carol, receiver=self.bob, content='Hello')
+
+        self.assertEqual(Conversation.objects.count(), 2)
+        bob_side = self.member(self.bob, self.alice)
+        self.assertEqual(bob_side.unread_count, 2)
+        self.assertEqual(bob_side.conversation.last_message_id, last.pk)
+        self.assertEqual(self.member(self.alice, self.bob).unread_count, 0)
+        self.assertMatchesRebuild()
+
+    def test_viewing_conversation_marks_read(self):
+        Message.objects.create(sender=self.alice, receiver=self.bob, content='Hi')
+        Message.objects.create(sender=self.alice, receiver=self.bob, content='Ping')
+
+        self.client.force_login(self.bob)
+        response = self.client.get(reverse('conversation', args=[self.alice.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.member(self.bob, self.alice).unread_count, 0)
+        self.assertMatchesRebuild()
+
+    def test_delete_refreshes_summary(self):
+        first = Message.objects.create(sender=self.alice, receiver=self.bob, content='Hi')
+        second = Message.objects.create(sender=self.bob, receiver=self.alice, content='Hey')
+
+        second.delete()
+        self.assertEqual(self.member(self.alice, self.bob).conversation.last_message_id, first.pk)
+        self.assertMatchesRebuild()
+
+        first.delete()
+        self.assertFalse(Conversation.objects.exists())
+        self.assertFalse(ConversationMember.objects.exists())
+
+    def test_inbox_lists_most_recent_first(self):
+        Message.objects.create(sender=self.alice, receiver=self.bob, content='Hi')
+        Message.objects.create(sender=self.carol, receiver=self.bob, content='Hello')
+
+        self.client.force_login(self.bob)
+        response = self.client.get(reverse('message_list'))
+        self.assertEqual(response.status_code, 200)
+        partners = [member.partner for member in response.context['conversations']]
+        self.assertEqual(partners, [self.carol, self.alice])
+
+
+class ConversationHistoryTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user('alice', password='password123')
+        cls.bob = User.objects.create_user('bob', password='password123')
+        cls.thread = [
+            Message.objects.create(sender=cls.alice, receiver=cls.bob, content=f'Message {i}')
+            for i in range(70)
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.bob)
+
+    def test_page_renders_latest_messages_only(self):
+        response = self.client.get(reverse('conversation', args=[self.alice.pk]))
+        shown = [message.pk for message in response.context['messages_list']]
+        self.assertEqual(shown, [message.pk for message in self.thread[-30:]])
+
+    def test_older_endpoint_walks_back_to_the_start(self):
+        page = self.client.get(reverse('conversation', args=[self.alice.pk])).context['page_obj']
+        cursor = page.next_cursor
+        seen = []
+        while cursor:
+            data = self.client.get(reverse('conversation_older', args=[self.alice.pk]), {'cursor': cursor}).json()
+            seen = [message['id'] for message in data['messages']] + seen
+            cursor = data['older_cursor']
+        self.assertEqual(seen, [message.pk for message in self.thread[:-30]])
+
+    def test_since_endpoint_returns_only_new_messages(self):
+        url = reverse('conversation_since', args=[self.alice.pk])
+        latest = self.thread[-1]
+        self.assertEqual(self.client.get(url, {'after': latest.pk}).json()['messages'], [])
+
+        new = Message.objects.create(sender=self.alice, receiver=self.bob, content='New')
+        data = self.client.get(url, {'after': latest.pk}).json()
+        self.assertEqual([message['id'] for message in data['messages']], [new.pk])
+        self.assertFalse(data['has_more'])
+        self.assertTrue(Message.objects.get(pk=new.pk).is_read)
+
+        self.assertEqual(self.client.get(url, {'after': 'x'}).status_code, 400)
+
+    def test_nothing_unread_skips_the_update(self):
+        url = reverse('conversation', args=[self.alice.pk])
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as captured:
+            self.client.get(url)
+        self.assertFalse([q for q in captured.captured_queries if q['sql'].startswith('UPDATE')])
@@ -0,0 +1,66 @@
+"""
+Earnings ledger tests.
+"""
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from marketplace.earnings import rebuild_earnings
+from marketplace.models import FreelancerProfile, Order, EarningsEntry, UserStats
+
+
+class EarningsLedgerTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.freelancer = User.objects.create_user('freelancer', password='password123')
+        cls.client_user = User.objects.create_user('client', password='password123')
+        FreelancerProfile.objects.create(user=cls.freelancer, skills='Copywriting', bio='Bio', hourly_rate=25)
+
+    def balances(self):
+        return (
+            FreelancerProfile.objects.get(user=self.freelancer).total_earnings,
+            UserStats.objects.get(user=self.freelancer).total_earned,
+        )
+
+    def complete(self, order):
+        order.status = 'Completed'
+        order.completed_at = timezone.now()
+        order.save()
+
+    def test_resaving_a_completed_order_credits_once(self):
+        order = Order.objects.create(client=self.client_user, freelancer=self.freelancer, price=Decimal('120.50'))
+        self.complete(order)
+        order.save()
+        Order.objects.get(pk=order.pk).save()
+
+        self.assertEqual(EarningsEntry.objects.count(), 1)
+        self.assertEqual(self.balances(), (Decimal('120.50'), Decimal('120.50')))
+
+    def test_completing_a_loaded_order_credits_earnings_and_stats(self):
+        order = Order.objects.create(client=self.client_user, freelancer=self.freelancer, price=75)
+        # Earnings and stats both judge the transition from the state loaded here
+        self.complete(Order.objects.get(pk=order.pk))
+        self.assertEqual(EarningsEntry.objects.count(), 1)
+        self.assertEqual(self.balances(), (75, 75))
+        self.assertEqual(UserStats.objects.get(user=self.freelancer).freelancer_completed_orders, 1)
+
+    def test_deleting_an_order_reverses_its_entry(self):
+        order = Order.objects.create(client=self.client_user, freelancer=self.freelancer, price=80)
+        self.complete(order)
+        order.delete()
+        self.assertEqual(self.balances(), (0, 0))
+
+    def test_rebuild_backfills_and_repairs(self):
+        order = Order.objects.create(client=self.client_user, freelancer=self.freelancer, price=60)
+        self.complete(order)
+        # Simulate history from before the ledger: no entry and an inflated total
+        EarningsEntry.objects.all().delete()
+        FreelancerProfile.objects.filter(user=self.freelancer).update(total_earnings=180)
+
+        added, corrected = rebuild_earnings()
+        self.assertEqual((added, corrected), (1, 1))
+        self.assertEqual(self.balances(), (60, 60))
+        self.assertEqual(rebuild_earnings(), (0, 0))
@@ -0,0 +1,55 @@
+"""
+Synthetic load data generator tests.
+"""
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import Count
+from django.test import TestCase
+
+from marketplace.bid_stats import rebuild_bid_stats
+from marketplace.models import Gig, Job, Bid, Order, Message, Review, UserStats, ConversationMember
+from marketplace.ratings import reconcile_ratings
+
+
+class GenerateLoadDataTests(TestCase):
+
+    def generate(self, **options):
+        options = {
+            'freelancers': 20, 'clients': 15, 'gigs': 40, 'jobs': 30, 'bids': 150, 'orders': 120,
+            'messages': 300, 'seed': 7, 'batch_size': 50, 'stdout': StringIO(), **options,
+        }
+        call_command('generate_load_data', **options)
+
+    def test_generates_consistent_data(self):
+        self.generate()
+        self.assertEqual(Gig.objects.count(), 40)
+        self.assertEqual(Job.objects.count(), 30)
+        self.assertEqual(Message.objects.count(), 300)
+        self.assertGreaterEqual(Order.objects.count(), 120)
+        self.assertTrue(Review.objects.exists())
+        self.assertEqual(UserStats.objects.count(), 35)
+        self.assertTrue(ConversationMember.objects.exists())
+
+        # Timestamps are spread out rather than stamped at insert time
+        self.assertGreater(Job.objects.values('created_at').distinct().count(), 1)
+        # Jobs under way have exactly one accepted bid and an order for it
+        for job in Job.objects.filter(status__in=['In Progress', 'Completed']):
+            self.assertEqual(job.bids.filter(status='Accepted').count(), 1)
+            self.assertTrue(job.orders.exists())
+        self.assertFalse(Bid.objects.values('job', 'freelancer').annotate(n=Count('id')).filter(n__gt=1))
+
+        # Denormalized fields were rebuilt
+        self.assertEqual(rebuild_bid_stats(), 0)
+        self.assertEqual(reconcile_ratings(), 0)
+
+    def test_existing_prefix_is_refused(self):
+        self.generate(freelancers=2, clients=2, gigs=2, jobs=2, bids=2, orders=2, messages=2)
+        with self.assertRaises(CommandError):
+            self.generate(freelancers=2, clients=2, gigs=2, jobs=2, bids=2, orders=2, messages=2)
+        self.generate(
+            freelancers=2, clients=2, gigs=2, jobs=2, bids=2, orders=2, messages=2, prefix='second',
+            skip_rebuild=True,
+        )
+        self.assertEqual(Gig.objects.count(), 4)
@@ -0,0 +1,170 @@
+"""
+Prometheus metrics tests.
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from asgiref.sync import iscoroutinefunction
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from marketplace import caching, metrics
+from marketplace.middleware import MetricsMiddleware
+from marketplace.models import Gig, Job, Bid, Message
+
+
+def value(values, metric, **labels):
+    return values.get((metric.name, metric.key(labels)[1]), 0)
+
+
+class MetricsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.freelancer = User.objects.create_user('freelancer', password='password123')
+        cls.client_user = User.objects.create_user('client', password='password123')
+        Gig.objects.create(freelancer=cls.freelancer, title='Logo', description='Design', price=40, delivery_time=2)
+        cls.job = Job.objects.create(
+            client=cls.client_user, title='Site', description='Build', budget=500, deadline='2030-01-01',
+        )
+
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        settings = override_settings(METRICS_DIR=self.directory, METRICS_TOKEN='secret')
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def scrape(self, **headers):
+        return self.client.get(reverse('metrics'), **headers)
+
+    def test_requests_are_timed_per_url_name(self):
+        before = metrics.gather()
+        self.client.get(reverse('gig_list'))
+        self.client.get(reverse('gig_list'))
+        after = metrics.gather()
+        self.assertEqual(
+            value(after, metrics.RESPONSES, view='gig_list', status=200)
+            - value(before, metrics.RESPONSES, view='gig_list', status=200), 2,
+        )
+        counts = after[(metrics.REQUEST_DURATION.name, ('gig_list',))]
+        self.assertEqual(len(counts), len(metrics.DEFAULT_BUCKETS) + 2)
+        self.assertGreater(counts[-1], 0)
+
+        body = self.scrape(HTTP_AUTHORIZATION='Bearer secret').content.decode()
+        self.assertIn('# TYPE marketplace_request_duration_seconds histogram', body)
+        buckets = [
+            float(line.rsplit(' ', 1)[1]) for line in body.splitlines()
+            if line.startswith('marketplace_request_duration_seconds_bucket{view="gig_list"')
+        ]
+        self.assertEqual(len(buckets), len(metrics.DEFAULT_BUCKETS) + 1)
+        self.assertEqual(buckets, sorted(buckets))
+        self.assertIn(f'marketplace_request_duration_seconds_count{{view="gig_list"}} {buckets[-1]!r}', body)
+        self.assertIn('marketplace_request_db_duration_seconds_sum{view="gig_list"}', body)
+        self.assertIn('marketplace_db_connections{alias="default"} 1.0', body)
+
+    def test_business_and_cache_counters(self):
+        before = metrics.gather()
+        Bid.objects.create(
+            job=self.job, freelancer=self.freelancer, bid_amount=450, delivery_days=5, proposal_text='Hi',
+        )
+        Message.objects.create(sender=self.client_user, receiver=self.freelancer, content='Hello')
+        caching.GIGS.get_or_set('featured', lambda: 'value')
+        caching.GIGS.get_or_set('featured', lambda: 'value')
+        caching.GIGS.get_many(['featured', 'missing'])
+        after = metrics.gather()
+
+        def delta(metric, **labels):
+            return value(after, metric, **labels) - value(before, metric, **labels)
+
+        self.assertEqual(delta(metrics.BIDS_SUBMITTED), 1)
+        self.assertEqual(delta(metrics.MESSAGES_SENT), 1)
+        self.assertEqual(delta(metrics.ORDERS_CREATED), 0)
+        self.assertEqual(delta(metrics.CACHE_HITS, namespace='gigs'), 2)
+        self.assertEqual(delta(metrics.CACHE_MISSES, namespace='gigs'), 2)
+
+    def write_file(self, pid, start, values):
+        with open(os.path.join(self.directory, f'{pid}-{start}.json'), 'w') as file:
+            json.dump({'pid': pid, 'start': start, 'values': values}, file)
+
+    def test_values_of_other_workers_are_merged(self):
+        exited = subprocess.Popen([sys.executable, '-c', 'pass'])
+        exited.wait()
+        own = metrics.gather()
+        for pid in (os.getppid(), exited.pid):
+            self.write_file(pid, metrics.process_start(pid), [
+                ['marketplace_orders_created_total', [], 3],
+                ['marketplace_db_connections', ['default'], 1],
+                ['marketplace_request_duration_seconds', ['home'], [1] + [0] * 11 + [0.002]],
+                ['marketplace_removed_metric', [], 9],
+            ])
+
+        merged = metrics.gather()
+        self.assertEqual(value(merged, metrics.ORDERS_CREATED), value(own, metrics.ORDERS_CREATED) + 6)
+        # Gauges of exited workers are dropped
+        self.assertEqual(value(merged, metrics.DB_CONNECTIONS, alias='default'), 2)
+        home = merged[(metrics.REQUEST_DURATION.name, ('home',))]
+        own_home = own.get((metrics.REQUEST_DURATION.name, ('home',)), [0] * 13)
+        self.assertEqual(home[0] - own_home[0], 2)
+        self.assertNotIn(('marketplace_removed_metric', ()), merged)
+
+    def test_exited_workers_are_folded(self):
+        exited = subprocess.Popen([sys.executable, '-c', 'pass'])
+        exited.wait()
+        own = metrics.gather()
+        values = [['marketplace_orders_created_total', [], 3], ['marketplace_db_connections', ['default'], 1]]
+        self.write_file(exited.pid, 1, values)
+        # A live pid started at another time belongs to an exited worker
+        self.write_file(os.getppid(), -1, values)
+
+        for _ in range(2):
+            merged = metrics.gather()
+            self.assertEqual(value(merged, metrics.ORDERS_CREATED), value(own, metrics.ORDERS_CREATED) + 6)
+            self.assertEqual(value(merged, metrics.DB_CONNECTIONS, alias='default'), 1)
+        pid, start = metrics.identity()
+        self.assertEqual(
+            sorted(name for name in os.listdir(self.directory) if name.endswith('.json')),
+            sorted([metrics.EXITED_FILE, f'{pid}-{start}.json']),
+        )
+
+        self.write_file(exited.pid, 2, values)
+        merged = metrics.gather()
+        self.assertEqual(value(merged, metrics.ORDERS_CREATED), value(own, metrics.ORDERS_CREATED) + 9)
+
+    def test_exit_writes_only_after_serving_requests(self):
+        with mock.patch.object(metrics, '_last_write', 0.0):
+            metrics.write_at_exit()
+        self.assertEqual(os.listdir(self.directory), [])
+        with mock.patch.object(metrics, '_last_write', 1.0):
+            metrics.write_at_exit()
+        self.assertEqual(len(os.listdir(self.directory)), 1)
+
+    async def test_middleware_runs_in_async_chains(self):
+        async def view(request):
+            return HttpResponse(status=201)
+
+        middleware = MetricsMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        before = value(metrics.gather(), metrics.RESPONSES, view='unmatched', status=201)
+        response = await middleware(RequestFactory().get('/'))
+        self.assertEqual(response.status_code, 201)
+        after = value(metrics.gather(), metrics.RESPONSES, view='unmatched', status=201)
+        self.assertEqual(after - before, 1)
+
+    def test_endpoint_requires_the_token(self):
+        self.assertEqual(self.scrape().status_code, 401)
+        self.assertEqual(self.scrape(HTTP_AUTHORIZATION='Bearer wrong').status_code, 401)
+        response = self.scrape(HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], metrics.CONTENT_TYPE)
+        with self.settings(METRICS_TOKEN=''):
+            self.assertEqual(self.scrape().status_code, 404)
@@ -0,0 +1,92 @@
+"""
+Order status transition tests.
+"""
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from marketplace import events
+from marketplace.models import Job, Order, EarningsEntry, UserStats
+from marketplace.services import transition_order, InvalidTransition
+from marketplace.stats import compute_user_stats
+
+
+class OrderTransitionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = User.objects.create_user('client', password='password123')
+        cls.freelancer = User.objects.create_user('freelancer', password='password123')
+
+    def setUp(self):
+        self.job = Job.objects.create(
+            client=self.client_user, title='Job', description='Description', budget=300, deadline='2030-01-01',
+            status='In Progress',
+        )
+        self.order = Order.objects.create(client=self.client_user, freelancer=self.freelancer, job=self.job, price=300)
+        self.sent = []
+        events.order_status_changed.connect(self.record, sender=Order)
+        self.addCleanup(events.order_status_changed.disconnect, self.record, sender=Order)
+
+    def record(self, sender, order, previous, **kwargs):
+        self.sent.append((previous, order.status))
+
+    def assertStatsMatchRebuild(self):
+        user_ids = [self.client_user.pk, self.freelancer.pk]
+        expected = compute_user_stats(user_ids)
+        for row in UserStats.objects.filter(user__in=user_ids).values():
+            self.assertEqual({field: row[field] for field in expected[row['user_id']]}, expected[row['user_id']])
+
+    def test_completing_runs_one_transition(self):
+        with self.assertNumQueries(11):
+            transition_order(self.order, 'Completed')
+
+        self.assertEqual(self.sent, [('In Progress', 'Completed')])
+        order = Order.objects.get(pk=self.order.pk)
+        self.assertEqual(order.status, 'Completed')
+        self.assertIsNotNone(order.completed_at)
+        self.assertEqual(Job.objects.get(pk=self.job.pk).status, 'Completed')
+        self.assertEqual(EarningsEntry.objects.get().amount, 300)
+        self.assertStatsMatchRebuild()
+
+        # Saving the instance afterwards does not count the change again
+        self.order.save()
+        self.assertStatsMatchRebuild()
+
+    def test_final_states_cannot_move(self):
+        transition_order(self.order, 'Cancelled')
+        for status in ('In Progress', 'Completed', 'Pending'):
+            with self.assertRaises(InvalidTransition):
+                transition_order(self.order, status)
+        self.assertEqual(self.sent, [('In Progress', 'Cancelled')])
+        self.assertFalse(EarningsEntry.objects.exists())
+        self.assertStatsMatchRebuild()
+
+    def test_stale_instance_does_not_overwrite(self):
+        stale = Order.objects.get(pk=self.order.pk)
+        transition_order(self.order, 'Cancelled')
+        with self.assertRaises(InvalidTransition):
+            transition_order(stale, 'Completed')
+        self.assertEqual(Order.objects.get(pk=self.order.pk).status, 'Cancelled')
+        self.assertEqual(len(self.sent), 1)
+
+    def test_completing_twice_through_the_view(self):
+        self.client.force_login(self.client_user)
+        url = reverse('complete_order', args=[self.order.pk])
+        self.client.get(url)
+        response = self.client.get(url, follow=True)
+        self.assertContains(response, 'An order cannot move from Completed to Completed.')
+        self.assertEqual(self.sent, [('In Progress', 'Completed')])
+
+    def test_admin_actions_follow_the_table(self):
+        admin = User.objects.create_superuser('admin', password='password123')
+        pending = Order.objects.create(client=self.client_user, freelancer=self.freelancer, price=50, status='Pending')
+        self.client.force_login(admin)
+        self.client.post(reverse('admin:marketplace_order_changelist'), {
+            'action': 'mark_completed', '_selected_action': [self.order.pk, pending.pk],
+        })
+        self.assertEqual(
+            dict(Order.objects.values_list('pk', 'status')),
+            {self.order.pk: 'Completed', pending.pk: 'Pending'},
+        )
+        self.assertStatsMatchRebuild()
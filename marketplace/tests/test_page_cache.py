@@ -0,0 +1,89 @@
+"""
+Anonymous page cache tests.
+"""
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from marketplace.models import Category, Gig, Job
+
+
+@override_settings(PAGE_CACHE_TIMEOUT=60)
+class PageCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Writing', description='Words')
+        cls.freelancer = User.objects.create_user('freelancer', password='password123')
+
+    def setUp(self):
+        cache.clear()
+
+    def make_gig(self, title, price=50):
+        return Gig.objects.create(
+            freelancer=self.freelancer, title=title, description='Work', category=self.category,
+            price=price, delivery_time=2,
+        )
+
+    def test_anonymous_pages_are_shared(self):
+        self.make_gig('Blog posts')
+        first = self.client.get(reverse('gig_list'))
+        with self.assertNumQueries(0):
+            second = self.client.get(reverse('gig_list'))
+        self.assertEqual(first.content, second.content)
+        self.assertIn('public', second['Cache-Control'])
+        self.assertIn('max-age=60', second['Cache-Control'])
+        self.assertIn('Cookie', second['Vary'])
+
+    def test_query_string_is_normalized(self):
+        url = reverse('job_list')
+        self.client.get(url, {'category': self.category.pk, 'search': ''})
+        with self.assertNumQueries(0):
+            self.client.get(f'{url}?utm_source=mail&search=&category={self.category.pk}')
+
+        # A different filter is a different page
+        with CaptureQueriesContext(connection) as captured:
+            self.client.get(url, {'category': self.category.pk, 'status': 'Open'})
+        self.assertTrue(captured.captured_queries)
+
+    def test_cached_links_use_the_normalized_query(self):
+        for number in range(13):
+            self.make_gig(f'Gig {number}')
+        url = reverse('gig_list')
+        first = self.client.get(f'{url}?utm_source=mail&page=1&min_price=+10&category={self.category.pk}')
+        self.assertContains(first, 'page=2')
+        self.assertNotContains(first, 'utm_source')
+        self.assertContains(first, 'value="10"')
+        with self.assertNumQueries(0):
+            second = self.client.get(f'{url}?category={self.category.pk}&min_price=10&page=1&utm_campaign=spring')
+        self.assertEqual(first.content, second.content)
+
+    def test_changes_start_a_new_generation(self):
+        self.make_gig('Blog posts')
+        self.client.get(reverse('gig_list'))
+        self.make_gig('Newsletters', price=75)
+        self.assertContains(self.client.get(reverse('gig_list')), '₹75')
+
+        Job.objects.create(
+            client=self.freelancer, title='Landing page copy', description='Words', budget=100,
+            deadline='2030-01-01', category=self.category,
+        )
+        self.client.get(reverse('job_list'))
+        self.category.name = 'Copywriting'
+        self.category.save()
+        self.assertContains(self.client.get(reverse('gig_list')), 'Copywriting')
+        self.assertContains(self.client.get(reverse('job_list')), 'Copywriting')
+
+    def test_logged_in_and_flashed_pages_are_not_shared(self):
+        self.client.get(reverse('gig_list'))
+        self.client.force_login(self.freelancer)
+        response = self.client.get(reverse('gig_list'))
+        self.assertIn('private', response['Cache-Control'])
+
+        self.client.logout()
+        self.client.cookies['messages'] = 'pending'
+        response = self.client.get(reverse('gig_list'))
+        self.assertNotIn('public', response.get('Cache-Control', ''))
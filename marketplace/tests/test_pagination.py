@@ -0,0 +1,90 @@
+"""
+Keyset pagination tests.
+"""
+import base64
+import json
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.http import QueryDict
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from marketplace.models import Gig
+from marketplace.pagination import CursorPaginator, InvalidCursor, encode_cursor, NEXT, PREVIOUS
+
+
+class CursorPaginatorTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.freelancer = User.objects.create_user('freelancer', password='password123')
+        for number in range(7):
+            Gig.objects.create(
+                freelancer=cls.freelancer, title=f'Gig {number}', description='Work', price=40, delivery_time=2,
+            )
+        # Five gigs tied on created_at: only the id tiebreak orders them
+        gigs = list(Gig.objects.order_by('id').values_list('id', flat=True))
+        now = timezone.now()
+        Gig.objects.filter(id__in=gigs[:5]).update(created_at=now)
+        Gig.objects.filter(id__in=gigs[5:]).update(created_at=now + timedelta(minutes=1))
+        cls.expected = gigs[5:][::-1] + gigs[:5][::-1]
+
+    def setUp(self):
+        cache.clear()
+
+    def ids(self, page):
+        return [gig.id for gig in page]
+
+    def test_next_and_previous_across_page_boundaries(self):
+        paginator = CursorPaginator(Gig.objects.all(), 3)
+        pages = [paginator.page()]
+        while pages[-1].has_next():
+            pages.append(paginator.page(pages[-1].next_cursor))
+
+        self.assertEqual([self.ids(page) for page in pages], [self.expected[:3], self.expected[3:6], self.expected[6:]])
+        self.assertFalse(pages[0].has_previous())
+        self.assertIsNone(pages[-1].next_cursor)
+
+        # Walking back returns the same pages
+        page = pages[-1]
+        for previous in reversed(pages[:-1]):
+            page = paginator.page(page.previous_cursor)
+            self.assertEqual(self.ids(page), self.ids(previous))
+            self.assertTrue(page.has_next())
+        self.assertFalse(page.has_previous())
+
+    def test_querystrings_keep_filters_and_drop_page(self):
+        page = CursorPaginator(Gig.objects.all(), 3).page(params=QueryDict('category=2&page=4'))
+        params = QueryDict(page.next_querystring[1:])
+        self.assertEqual(params['category'], '2')
+        self.assertNotIn('page', params)
+        self.assertEqual(self.ids(CursorPaginator(Gig.objects.all(), 3).page(params['cursor'])), self.expected[3:6])
+
+    def test_invalid_cursors(self):
+        paginator = CursorPaginator(Gig.objects.all(), 3)
+        tampered = base64.urlsafe_b64encode(json.dumps(['x', []]).encode()).decode()
+        for cursor in (
+            'not base64!', tampered, encode_cursor(NEXT, ['2030-01-01T00:00:00']),
+            encode_cursor(PREVIOUS, ['yesterday', 'one']),
+        ):
+            with self.subTest(cursor=cursor), self.assertRaises(InvalidCursor):
+                paginator.page(cursor)
+
+    def test_list_view_pages_by_cursor(self):
+        url = reverse('gig_list')
+        page = self.client.get(url).context['page_obj']
+        self.assertTrue(page.is_cursor)
+        self.assertEqual(self.ids(page), self.expected)
+        self.assertEqual(self.client.get(url, {'cursor': 'garbage'}).status_code, 404)
+        self.assertEqual(self.client.get(url, {'cursor': encode_cursor(NEXT, ['yesterday', '1'])}).status_code, 404)
+
+    def test_page_parameter_keeps_offset_pagination(self):
+        url = reverse('gig_list')
+        page = self.client.get(url, {'page': 1}).context['page_obj']
+        self.assertFalse(getattr(page, 'is_cursor', False))
+        self.assertEqual(page.number, 1)
+        self.assertEqual(self.ids(page), self.expected)
+        self.assertEqual(self.client.get(url, {'page': 5}).status_code, 404)
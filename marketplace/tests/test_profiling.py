@@ -0,0 +1,64 @@
+"""
+Profiling middleware tests.
+"""
+import os
+import pstats
+import re
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from marketplace.models import Gig
+
+NO_PROFILING = {'SERVER_TIMING': False, 'PROFILING_SAMPLE_RATE': 0.0, 'PROFILING_TOKEN': ''}
+
+
+class ProfilingMiddlewareTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        freelancer = User.objects.create_user('freelancer', password='password123')
+        Gig.objects.create(freelancer=freelancer, title='Logo', description='Design', price=40, delivery_time=2)
+
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def profiles(self):
+        return sorted(os.listdir(self.directory.name))
+
+    @override_settings(**{**NO_PROFILING, 'SERVER_TIMING': True})
+    def test_server_timing_reports_queries_and_phases(self):
+        response = self.client.get(reverse('gig_list'))
+        timing = response['Server-Timing']
+        for metric in ('db', 'render', 'view', 'total'):
+            self.assertRegex(timing, rf'{metric};dur=\d+\.\d')
+        queries = int(re.search(r'desc="(\d+) queries"', timing).group(1))
+        self.assertGreater(queries, 0)
+        self.assertGreater(float(re.search(r'render;dur=([\d.]+)', timing).group(1)), 0)
+
+    @override_settings(**NO_PROFILING)
+    def test_everything_off_removes_the_middleware(self):
+        response = self.client.get(reverse('gig_list'))
+        self.assertNotIn('Server-Timing', response)
+
+    def test_token_triggers_a_profile_dump(self):
+        with self.settings(**{**NO_PROFILING, 'PROFILING_TOKEN': 'secret', 'PROFILING_DIR': self.directory.name}):
+            self.client.get(reverse('gig_list'), HTTP_X_PROFILE='wrong')
+            self.assertEqual(self.profiles(), [])
+            response = self.client.get(reverse('gig_list'), HTTP_X_PROFILE='secret')
+        self.assertNotIn('Server-Timing', response)
+        [name] = self.profiles()
+        self.assertRegex(name, r'-GET-gigs-\d+ms-\w+\.prof$')
+        stats = pstats.Stats(os.path.join(self.directory.name, name))
+        self.assertTrue(stats.total_calls)
+
+    def test_sampled_requests_are_profiled(self):
+        with self.settings(**{**NO_PROFILING, 'PROFILING_SAMPLE_RATE': 1.0, 'PROFILING_DIR': self.directory.name}):
+            self.client.get(reverse('home'))
+            self.client.get(reverse('gig_list'))
+        self.assertEqual(len(self.profiles()), 2)
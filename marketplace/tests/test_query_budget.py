@@ -0,0 +1,138 @@
+"""
+Query budget tests.
+
+Each listing page is rendered, the data behind it is grown, and the page is
+rendered again: the number of queries must not change, and every view must
+stay inside its declared budget.
+"""
+import asyncio
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from marketplace.models import (
+    FreelancerProfile, ClientProfile, Category, Gig, Job,
+    Bid, Order, Message, Review
+)
+from marketplace.query_budget import QueryBudgetExceeded, query_budget
+from marketplace import urls
+
+
+@override_settings(QUERY_BUDGET_RAISE=True)
+class QueryBudgetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Web Development', description='Web')
+        cls.freelancer = User.objects.create_user('freelancer', password='password123')
+        FreelancerProfile.objects.create(
+            user=cls.freelancer, skills='Python, Django', bio='Bio', hourly_rate=50
+        )
+        cls.client_user = User.objects.create_user('client', password='password123')
+        ClientProfile.objects.create(user=cls.client_user, contact_info='client@example.com')
+        cls.add_data(1)
+
+    @classmethod
+    def add_data(cls, n):
+        """Add n gigs, jobs (with bids), orders (with reviews) and message partners"""
+        for i in range(n):
+            freelancer = User.objects.create_user(f'freelancer-{User.objects.count()}')
+            FreelancerProfile.objects.create(user=freelancer, skills='Go', bio='', hourly_rate=10)
+            gig = Gig.objects.create(
+                freelancer=cls.freelancer, title=f'Gig {i}', description='Work',
+                category=cls.category, price=100, delivery_time=3,
+            )
+            job = Job.objects.create(
+                client=cls.client_user, title=f'Job {i}', description='Work',
+                category=cls.category, budget=500, deadline=timezone.now().date() + timedelta(days=30),
+            )
+            Bid.objects.create(
+                job=job, freelancer=freelancer, proposal_text='Hire me', bid_amount=400, delivery_days=5,
+            )
+            order = Order.objects.create(
+                client=cls.client_user, freelancer=cls.freelancer, gig=gig,
+                price=100, status='Completed', completed_at=timezone.now(),
+            )
+            Review.objects.create(order=order, rating=4, review_text='Good')
+            Message.objects.create(sender=freelancer, receiver=cls.freelancer, content='Hi')
+            Message.objects.create(sender=cls.freelancer, receiver=freelancer, content='Hello')
+
+    def count_queries(self, name, user=None, args=None):
+        # Measure with a cold cache
+        cache.clear()
+        self.client.logout()
+        if user:
+            self.client.force_login(user)
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(reverse(name, args=args))
+        self.assertEqual(response.status_code, 200, name)
+        return len(captured.captured_queries)
+
+    def assertConstantQueries(self, name, user=None, args=None):
+        before = self.count_queries(name, user, args)
+        self.add_data(5)
+        after = self.count_queries(name, user, args)
+        self.assertEqual(before, after, f'{name}: {before} queries grew to {after}')
+
+    def test_home(self):
+        self.assertConstantQueries('home')
+
+    def test_gig_list(self):
+        self.assertConstantQueries('gig_list')
+
+    def test_gig_detail(self):
+        gig = Gig.objects.first()
+        self.assertConstantQueries('gig_detail', self.client_user, [gig.pk])
+
+    def test_job_list(self):
+        self.assertConstantQueries('job_list', self.freelancer)
+
+    def test_job_detail(self):
+        job = Job.objects.first()
+        self.assertConstantQueries('job_detail', self.client_user, [job.pk])
+
+    def test_order_list(self):
+        self.assertConstantQueries('order_list', self.freelancer)
+
+    def test_dashboards(self):
+        self.assertConstantQueries('dashboard', self.freelancer)
+        self.assertConstantQueries('dashboard', self.client_user)
+
+    def test_profile(self):
+        self.assertConstantQueries('profile_view', self.freelancer)
+
+    def test_message_list(self):
+        self.assertConstantQueries('message_list', self.freelancer)
+
+    def test_every_view_declares_a_budget(self):
+        for pattern in urls.urlpatterns:
+            view = getattr(pattern.callback, 'view_class', pattern.callback)
+            if asyncio.iscoroutinefunction(view):
+                # Event streams only authenticate; they never touch the ORM afterwards
+                continue
+            self.assertIsNotNone(getattr(view, 'query_budget', None), pattern.name)
+
+    def test_over_budget_raises(self):
+        @query_budget(1)
+        def greedy(request):
+            list(Gig.objects.all())
+            list(Job.objects.all())
+
+        with self.assertRaises(QueryBudgetExceeded):
+            greedy(None)
+
+    @override_settings(QUERY_BUDGET_RAISE=False)
+    def test_over_budget_logs_when_not_raising(self):
+        @query_budget(1)
+        def greedy(request):
+            list(Gig.objects.all())
+            list(Job.objects.all())
+
+        with self.assertLogs('marketplace.query_budget', 'WARNING'):
+            greedy(None)
@@ -0,0 +1,88 @@
+"""
+Query fingerprinting and slow-query log tests.
+"""
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from marketplace import query_log
+from marketplace.models import Gig, QueryFingerprint
+
+
+class QueryLogTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.freelancer = User.objects.create_user('freelancer', password='password123')
+        for title in ('Logo', 'Website', 'Banner'):
+            Gig.objects.create(freelancer=cls.freelancer, title=title, description='Design', price=40, delivery_time=2)
+
+    def setUp(self):
+        cache.clear()
+        # Totals left over from other tests would leak into these
+        query_log.flush()
+        QueryFingerprint.objects.all().delete()
+
+    def test_fingerprint_strips_literals_and_collapses_lists(self):
+        key, statement = query_log.fingerprint(
+            "SELECT \"t1\".\"id\" FROM \"gig\" t1 WHERE t1.price > 40.5 AND title = 'it''s' "
+            "AND id IN (%s, %s, %s) LIMIT 21"
+        )
+        self.assertEqual(
+            statement,
+            'SELECT "t1"."id" FROM "gig" t1 WHERE t1.price > ? AND title = ? AND id IN (...) LIMIT ?',
+        )
+        other, _ = query_log.fingerprint(
+            "SELECT  \"t1\".\"id\" FROM \"gig\" t1\nWHERE t1.price > 7 AND title = 'x' AND id IN (%s) LIMIT 3"
+        )
+        self.assertEqual(key, other)
+        _, insert = query_log.fingerprint('INSERT INTO "gig" ("a", "b") VALUES (%s, %s), (%s, %s)')
+        self.assertEqual(insert, 'INSERT INTO "gig" ("a", "b") VALUES (...)')
+
+    def test_totals_are_aggregated_per_fingerprint(self):
+        recorder = query_log.QueryRecorder(slow_ms=10_000)
+        with connection.execute_wrapper(recorder):
+            for gig in Gig.objects.order_by('pk'):
+                list(Gig.objects.filter(pk=gig.pk, title__icontains=gig.title[:2]))
+        self.assertEqual(query_log.flush(), 2)
+        self.assertEqual(query_log.flush(), 0)
+        entry = QueryFingerprint.objects.get(statement__contains='LIKE')
+        self.assertEqual(entry.calls, 3)
+        self.assertGreater(entry.total_time, 0)
+        self.assertLessEqual(entry.max_time, entry.total_time)
+        self.assertEqual(entry.slow_calls, 0)
+
+    @override_settings(QUERY_LOG=True, QUERY_LOG_SLOW_MS=0.0, QUERY_LOG_FLUSH_SECONDS=0)
+    def test_slow_queries_are_logged_with_plan_and_origin(self):
+        with self.assertLogs('marketplace.query_log', 'WARNING') as logs:
+            self.client.get(reverse('gig_list'))
+        self.assertIn('GigListView (marketplace/', logs.output[0])
+        entry = QueryFingerprint.objects.filter(statement__contains='marketplace_gig').first()
+        self.assertGreater(entry.slow_calls, 0)
+        self.assertRegex(entry.last_origin, r'^GigListView \(marketplace/[\w/]+\.py:\d+ in \w+\)$')
+        self.assertTrue(entry.last_explain)
+        # EXPLAIN and the flush itself are not fingerprinted
+        self.assertFalse(QueryFingerprint.objects.filter(statement__icontains='EXPLAIN').exists())
+        self.assertFalse(QueryFingerprint.objects.filter(statement__contains='marketplace_queryfingerprint').exists())
+
+    def test_query_stats_command_lists_and_resets(self):
+        recorder = query_log.QueryRecorder(slow_ms=10_000)
+        with connection.execute_wrapper(recorder):
+            Gig.objects.count()
+            for _ in range(3):
+                list(Gig.objects.all())
+        query_log.flush()
+
+        out = StringIO()
+        call_command('query_stats', order='calls', limit=1, stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertRegex(lines[1], r'^\s+3 .*SELECT')
+
+        call_command('query_stats', reset=True, stdout=StringIO())
+        self.assertFalse(QueryFingerprint.objects.exists())
@@ -0,0 +1,158 @@
+"""
+Query-plan regression tests.
+
+Every query issued while rendering the hot pages is EXPLAINed and the test
+fails if any marketplace table is read with a full table scan.
+"""
+import json
+import re
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from marketplace.models import (
+    FreelancerProfile, ClientProfile, Category, Gig, Job,
+    Bid, Order, Message, Review
+)
+
+# Small lookup tables that are legitimately listed in full
+SCAN_ALLOWED = {'marketplace_category'}
+
+
+class QueryPlanTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Web Development', description='Web')
+        cls.freelancer = User.objects.create_user('freelancer', password='password123')
+        FreelancerProfile.objects.create(
+            user=cls.freelancer, skills='Python, Django', bio='Bio', hourly_rate=50
+        )
+        cls.client_user = User.objects.create_user('client', password='password123')
+        ClientProfile.objects.create(user=cls.client_user, contact_info='client@example.com')
+
+        cls.gigs = [
+            Gig.objects.create(
+                freelancer=cls.freelancer, title=f'Django gig {i}', description='Backend work',
+                category=cls.category, price=100 + i, delivery_time=3,
+            )
+            for i in range(15)
+        ]
+        cls.jobs = [
+            Job.objects.create(
+                client=cls.client_user, title=f'Build API {i}', description='REST API',
+                category=cls.category, budget=500, deadline=timezone.now().date() + timedelta(days=30),
+            )
+            for i in range(12)
+        ]
+        Bid.objects.create(
+            job=cls.jobs[0], freelancer=cls.freelancer, proposal_text='Hire me',
+            bid_amount=450, delivery_days=10,
+        )
+        order = Order.objects.create(
+            client=cls.client_user, freelancer=cls.freelancer, gig=cls.gigs[0],
+            price=100, status='Completed', completed_at=timezone.now(),
+        )
+        Review.objects.create(order=order, rating=5, review_text='Great')
+        Order.objects.create(
+            client=cls.client_user, freelancer=cls.freelancer, job=cls.jobs[0], price=450,
+        )
+        for i in range(3):
+            Message.objects.create(sender=cls.client_user, receiver=cls.freelancer, content=f'Hi {i}')
+            Message.objects.create(sender=cls.freelancer, receiver=cls.client_user, content=f'Hello {i}')
+
+    # ---------- helpers ----------
+
+    def full_scans(self, sql):
+        """Return the marketplace tables a query reads with a full table scan"""
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                details = [row[-1] for row in cursor.fetchall()]
+            scans = set()
+            for detail in details:
+                match = re.match(r'SCAN (\S+)(.*)$', detail)
+                if match and 'USING' not in match.group(2) and 'VIRTUAL TABLE' not in match.group(2):
+                    scans.add(match.group(1))
+            return {table for table in scans if table.startswith('marketplace_')} - SCAN_ALLOWED
+
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                # Tiny test tables would always be seq-scanned; ask whether an index path exists
+                cursor.execute('SET LOCAL enable_seqscan = off')
+                cursor.execute('EXPLAIN (FORMAT JSON) ' + sql)
+                plan = cursor.fetchone()[0]
+            plan = json.loads(plan) if isinstance(plan, str) else plan
+            scans = set()
+            nodes = [plan[0]['Plan']]
+            while nodes:
+                node = nodes.pop()
+                if node.get('Node Type') == 'Seq Scan':
+                    scans.add(node['Relation Name'])
+                nodes.extend(node.get('Plans', []))
+            return {table for table in scans if table.startswith('marketplace_')} - SCAN_ALLOWED
+
+        self.skipTest(f'No plan inspection for {connection.vendor}')
+
+    def assertIndexedQueries(self, url, user=None, data=None):
+        if user:
+            self.client.force_login(user)
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url, data or {})
+        self.assertEqual(response.status_code, 200, url)
+
+        for query in captured.captured_queries:
+            sql = query['sql']
+            if not sql.lstrip().upper().startswith('SELECT') or 'marketplace_' not in sql:
+                continue
+            scans = self.full_scans(sql)
+            self.assertFalse(scans, f'{url}: full scan of {sorted(scans)} in\n{sql}')
+        return response
+
+    # ---------- public listings ----------
+
+    def test_home(self):
+        self.assertIndexedQueries(reverse('home'))
+
+    def test_gig_list(self):
+        url = reverse('gig_list')
+        response = self.assertIndexedQueries(url)
+        self.assertIndexedQueries(url, data={'cursor': response.context['page_obj'].next_cursor})
+        self.assertIndexedQueries(url, data={'category': self.category.id})
+        self.assertIndexedQueries(url, data={'category': self.category.id, 'min_price': 105, 'max_price': 110})
+        self.assertIndexedQueries(url, data={'skill': 'django'})
+        self.assertIndexedQueries(url, data={'search': 'django'})
+
+    def test_job_list(self):
+        url = reverse('job_list')
+        response = self.assertIndexedQueries(url)
+        self.assertIndexedQueries(url, data={'cursor': response.context['page_obj'].next_cursor})
+        self.assertIndexedQueries(url, data={'status': 'Open'})
+        self.assertIndexedQueries(url, data={'category': self.category.id})
+        self.assertIndexedQueries(url, data={'search': 'api'})
+
+    def test_freelancer_list(self):
+        self.assertIndexedQueries(reverse('freelancer_list'))
+        self.assertIndexedQueries(reverse('freelancer_list'), data={'skill': 'python'})
+
+    def test_detail_pages(self):
+        self.assertIndexedQueries(reverse('gig_detail', args=[self.gigs[0].pk]))
+        self.assertIndexedQueries(reverse('job_detail', args=[self.jobs[0].pk]), user=self.freelancer)
+        self.assertIndexedQueries(reverse('profile_view_user', args=['freelancer']), user=self.client_user)
+
+    # ---------- per-user pages ----------
+
+    def test_freelancer_pages(self):
+        for name in ('dashboard', 'order_list', 'message_list'):
+            self.assertIndexedQueries(reverse(name), user=self.freelancer)
+        self.assertIndexedQueries(reverse('conversation', args=[self.client_user.id]), user=self.freelancer)
+
+    def test_client_pages(self):
+        for name in ('dashboard', 'order_list', 'message_list'):
+            self.assertIndexedQueries(reverse(name), user=self.client_user)
+        self.assertIndexedQueries(reverse('conversation', args=[self.freelancer.id]), user=self.client_user)
@@ -0,0 +1,72 @@
+"""
+Rating aggregation tests.
+"""
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from marketplace.models import FreelancerProfile, Order, Review
+from marketplace.ratings import reconcile_ratings
+
+
+class RatingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.freelancer = User.objects.create_user('freelancer', password='password123')
+        cls.client_user = User.objects.create_user('client', password='password123')
+        FreelancerProfile.objects.create(user=cls.freelancer, skills='SEO', bio='Bio', hourly_rate=20)
+
+    def review(self, rating):
+        order = Order.objects.create(
+            client=self.client_user, freelancer=self.freelancer, price=50,
+            status='Completed', completed_at=timezone.now(),
+        )
+        return Review.objects.create(order=order, rating=rating, review_text='Review')
+
+    def profile(self):
+        return FreelancerProfile.objects.get(user=self.freelancer)
+
+    def assertRating(self, rating, rating_sum, rating_count):
+        profile = self.profile()
+        self.assertEqual(profile.rating, Decimal(rating))
+        self.assertEqual((profile.rating_sum, profile.rating_count), (rating_sum, rating_count))
+        self.assertEqual(reconcile_ratings(), 0)
+
+    def test_reviews_adjust_totals(self):
+        self.review(5)
+        self.review(4)
+        third = self.review(4)
+        self.assertRating('4.33', 13, 3)
+
+        third = Review.objects.get(pk=third.pk)
+        third.rating = 1
+        third.save()
+        self.assertRating('3.33', 10, 3)
+
+        third.delete()
+        self.assertRating('4.50', 9, 2)
+
+        Review.objects.all().delete()
+        self.assertRating('0.00', 0, 0)
+
+    def test_stale_profile_save_keeps_totals(self):
+        profile = self.profile()
+        self.review(5)
+        profile.bio = 'Updated'
+        profile.save(update_fields=['bio'])
+        self.assertRating('5.00', 5, 1)
+
+    def test_reconcile_repairs_drift(self):
+        self.review(3)
+        FreelancerProfile.objects.filter(user=self.freelancer).update(rating=1, rating_sum=50, rating_count=9)
+        self.assertEqual(reconcile_ratings(), 1)
+        self.assertRating('3.00', 3, 1)
+
+    def test_half_way_average_is_not_drift(self):
+        for rating in (5, 5, 5, 4, 4, 4, 4, 2):
+            self.review(rating)
+        self.assertEqual(reconcile_ratings(), 0)
+        self.assertIn(self.profile().rating, (Decimal('4.12'), Decimal('4.13')))
@@ -0,0 +1,132 @@
+"""
+Real-time event tests: the in-process hub, the SSE endpoint and the events
+published when messages are sent and read.
+"""
+import asyncio
+import threading
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from marketplace import realtime
+from marketplace.conversations import mark_read
+from marketplace.models import Message
+
+
+class HubTests(TestCase):
+
+    async def test_publish_from_another_thread(self):
+        hub = realtime.Hub()
+        stream = hub.subscribe(1)
+        thread = threading.Thread(target=hub.publish, args=(1, {'type': 'ping', 'data': {}}))
+        thread.start()
+        thread.join()
+        self.assertEqual(await asyncio.wait_for(stream[1].get(), 1), {'type': 'ping', 'data': {}})
+
+        hub.unsubscribe(1, stream)
+        hub.publish(1, {'type': 'ping', 'data': {}})
+        await asyncio.sleep(0)
+        self.assertTrue(stream[1].empty())
+
+    async def test_full_queue_drops_events(self):
+        hub = realtime.Hub()
+        stream = hub.subscribe(1)
+        for i in range(realtime.QUEUE_SIZE + 5):
+            hub.publish(1, {'type': 'ping', 'data': i})
+        with self.assertLogs('marketplace.realtime', 'WARNING'):
+            await asyncio.sleep(0)
+        self.assertEqual(stream[1].qsize(), realtime.QUEUE_SIZE)
+
+
+
+class FakePubSub:
+    """Stands in for redis' PubSub, replaying one scripted connection"""
+
+    def __init__(self, messages):
+        self.messages = messages
+        self.closed = False
+
+    def subscribe(self, channel):
+        pass
+
+    def listen(self):
+        for message in self.messages:
+            if isinstance(message, BaseException):
+                raise message
+            yield {'data': message}
+
+    def close(self):
+        self.closed = True
+
+
+class RedisBrokerTests(TestCase):
+
+    def test_listener_reconnects_after_errors(self):
+        connections = [
+            FakePubSub([ConnectionError('Connection reset')]),
+            FakePubSub(['not json', '[7, {"type": "ping", "data": 1}]', ConnectionError('Timeout')]),
+            FakePubSub([SystemExit()]),
+        ]
+        hub = mock.Mock()
+        # RedisBroker.__init__ needs the redis package
+        broker = realtime.RedisBroker.__new__(realtime.RedisBroker)
+        broker.hub = hub
+        broker.client = mock.Mock(**{'pubsub.side_effect': connections})
+        broker._listener = threading.current_thread()
+        broker._lock = threading.Lock()
+
+        with mock.patch.object(realtime.time, 'sleep') as sleep, self.assertLogs('marketplace.realtime', 'ERROR'):
+            with self.assertRaises(SystemExit):
+                broker._listen()
+
+        hub.publish.assert_called_once_with(7, {'type': 'ping', 'data': 1})
+        self.assertTrue(all(pubsub.closed for pubsub in connections))
+        # The delay doubles after a failure and starts over once a message got through
+        self.assertEqual([call.args[0] for call in sleep.call_args_list], [0.5, 0.5])
+        # A dead listener is replaced by the next stream
+        self.assertIsNone(broker._listener)
+
+
+class MessageStreamTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user('alice', password='password123')
+        cls.bob = User.objects.create_user('bob', password='password123')
+
+    async def test_stream_delivers_published_events(self):
+        await self.async_client.aforce_login(self.bob)
+        response = await self.async_client.get(reverse('message_stream'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+        chunks = response.streaming_content.__aiter__()
+        self.assertEqual(await chunks.__anext__(), b'retry: 5000\n\n')
+        realtime.publish(self.bob.id, 'unread', {'partner': self.alice.id, 'unread': 2})
+        frame = await asyncio.wait_for(chunks.__anext__(), 1)
+        self.assertEqual(frame, b'event: unread\ndata: {"partner":%d,"unread":2}\n\n' % self.alice.id)
+        await chunks.aclose()
+
+    async def test_stream_requires_login(self):
+        response = await self.async_client.get(reverse('message_stream'))
+        self.assertEqual(response.status_code, 401)
+
+    def test_stream_declines_under_wsgi(self):
+        self.client.force_login(self.bob)
+        self.assertEqual(self.client.get(reverse('message_stream')).status_code, 204)
+
+    def test_sending_and_reading_publish_events(self):
+        with mock.patch('marketplace.conversations.realtime.publish') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                message = Message.objects.create(sender=self.alice, receiver=self.bob, content='Hi')
+            events = [(call.args[0], call.args[1]) for call in publish.call_args_list]
+            self.assertCountEqual(events, [(self.alice.id, 'message'), (self.bob.id, 'message'), (self.bob.id, 'unread')])
+            self.assertEqual(publish.call_args_list[-1].args[2], {'partner': self.alice.id, 'unread': 1})
+
+            publish.reset_mock()
+            with self.captureOnCommitCallbacks(execute=True):
+                mark_read(self.bob, self.alice)
+            publish.assert_called_once_with(self.bob.id, 'unread', {'partner': self.alice.id, 'unread': 0})
+        self.assertTrue(Message.objects.get(pk=message.pk).is_read)
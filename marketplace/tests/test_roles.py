@@ -0,0 +1,100 @@
+"""
+Request role and profile resolution tests.
+"""
+from asgiref.sync import iscoroutinefunction
+from django.contrib.auth.models import AnonymousUser, User
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.urls import reverse
+
+from marketplace import roles
+from marketplace.middleware import RoleMiddleware
+from marketplace.models import FreelancerProfile, ClientProfile
+
+
+class RoleTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.freelancer = User.objects.create_user('freelancer', password='password123')
+        FreelancerProfile.objects.create(user=cls.freelancer, skills='Go', bio='Bio', hourly_rate=10)
+        cls.client_user = User.objects.create_user('client', password='password123')
+        ClientProfile.objects.create(user=cls.client_user, contact_info='client@example.com')
+
+    def role_in_session(self):
+        return self.client.session.get(roles.SESSION_KEY)
+
+    def test_role_is_looked_up_once_per_session(self):
+        self.client.force_login(self.freelancer)
+        self.client.get(reverse('order_list'))
+        self.assertEqual(self.role_in_session(), [self.freelancer.pk, roles.FREELANCER])
+
+        # Later requests read the role from the session: no profile queries
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('order_list'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_roles_gate_views(self):
+        self.client.force_login(self.client_user)
+        self.assertEqual(self.client.get(reverse('job_create')).status_code, 200)
+        self.assertEqual(self.client.get(reverse('gig_create')).status_code, 403)
+
+        self.client.force_login(self.freelancer)
+        self.assertEqual(self.client.get(reverse('gig_create')).status_code, 200)
+        self.assertEqual(self.client.get(reverse('job_create')).status_code, 403)
+
+    def test_marker_belongs_to_its_user(self):
+        self.client.force_login(self.client_user)
+        session = self.client.session
+        session[roles.SESSION_KEY] = [self.freelancer.pk, roles.FREELANCER]
+        session.save()
+        self.assertEqual(self.client.get(reverse('gig_create')).status_code, 403)
+        self.assertEqual(self.role_in_session(), [self.client_user.pk, roles.CLIENT])
+
+    def test_stale_role_is_dropped_with_its_profile(self):
+        user = User.objects.create_user('switcher', password='password123')
+        profile = FreelancerProfile.objects.create(user=user, skills='Go', bio='Bio', hourly_rate=10)
+        self.client.force_login(user)
+        self.client.get(reverse('dashboard'))
+        profile.delete()
+        ClientProfile.objects.create(user=user, contact_info='switcher@example.com')
+
+        # The dashboard notices the missing profile and the next request re-resolves
+        self.client.get(reverse('dashboard'))
+        self.assertIsNone(self.role_in_session())
+        self.assertTemplateUsed(self.client.get(reverse('dashboard')), 'marketplace/dashboard/client.html')
+
+    def test_registration_stores_the_role(self):
+        self.client.post(reverse('register'), {
+            'username': 'newclient', 'email': 'new@example.com', 'first_name': 'New', 'last_name': 'Client',
+            'password1': 'a-Strong-pass-123', 'password2': 'a-Strong-pass-123', 'role': 'client',
+        })
+        user = User.objects.get(username='newclient')
+        self.assertEqual(self.role_in_session(), [user.pk, roles.CLIENT])
+
+
+    def test_profile_forms_get_the_model_instance(self):
+        self.client.force_login(self.freelancer)
+        form = self.client.get(reverse('profile_edit')).context['form']
+        self.assertIs(type(form.instance), FreelancerProfile)
+        self.assertEqual(form.instance.user_id, self.freelancer.pk)
+
+class RoleMiddlewareTests(SimpleTestCase):
+
+    async def test_async_chains_stay_async(self):
+        async def view(request):
+            return HttpResponse(str(request.role == roles.FREELANCER))
+
+        middleware = RoleMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        response = await middleware(request)
+        self.assertEqual(response.content, b'False')
+
+    def test_sync_chains_stay_sync(self):
+        middleware = RoleMiddleware(lambda request: HttpResponse())
+        self.assertFalse(iscoroutinefunction(middleware))
+        request = RequestFactory().get('/')
+        middleware(request)
+        self.assertTrue(hasattr(request, 'profile'))
@@ -0,0 +1,97 @@
+"""
+Full-text search tests.
+"""
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from marketplace import search
+from marketplace.models import Category, FreelancerProfile, Gig, Job
+
+
+class SearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.design = Category.objects.create(name='Design', description='Design')
+        cls.writing = Category.objects.create(name='Writing', description='Writing')
+        cls.freelancer = User.objects.create_user('freelancer', password='password123')
+        cls.profile = FreelancerProfile.objects.create(user=cls.freelancer, skills='Illustrator', hourly_rate=50)
+        cls.client_user = User.objects.create_user('client', password='password123')
+
+    def setUp(self):
+        cache.clear()
+
+    def gig(self, title, description='Work', category=None, price=40, **fields):
+        return Gig.objects.create(
+            freelancer=self.freelancer, title=title, description=description,
+            category=category or self.design, price=price, delivery_time=2, **fields,
+        )
+
+    def titles(self, queryset, kind='gig', text='logo'):
+        fallback = ['title', 'description']
+        return [obj.title for obj in search.search(queryset, kind, text, fallback)]
+
+    def test_title_matches_rank_above_description_matches(self):
+        self.gig('Brand kit', description='Includes a logo')
+        self.gig('Logo design')
+        self.gig('Website')
+        self.assertEqual(self.titles(Gig.objects.all()), ['Logo design', 'Brand kit'])
+        # Rank, not recency, orders the matches; ties go to the newest
+        self.gig('Stationery', description='Includes a logo')
+        self.assertEqual(self.titles(Gig.objects.all()), ['Logo design', 'Stationery', 'Brand kit'])
+
+    def test_filters_apply_before_the_result_cap(self):
+        for number in range(3):
+            self.gig(f'Logo logo {number}', category=self.writing)
+        self.gig('Logo for a bakery')
+        self.gig('Inactive logo', is_active=False)
+        with mock.patch.object(search, 'MAX_RESULTS', 2):
+            queryset = Gig.objects.filter(category=self.design, is_active=True)
+            self.assertEqual(self.titles(queryset), ['Logo for a bakery'])
+            self.assertEqual(len(self.titles(Gig.objects.all())), 2)
+
+        response = self.client.get(reverse('gig_list'), {'search': 'logo', 'category': self.design.pk})
+        self.assertEqual([gig.title for gig in response.context['gigs']], ['Logo for a bakery'])
+        self.assertNotContains(response, 'Showing the top')
+
+    def test_capped_results_say_so(self):
+        for number in range(3):
+            self.gig(f'Logo {number}')
+        Job.objects.create(
+            client=self.client_user, title='Logo', description='Work', budget=300, deadline='2030-01-01',
+        )
+        with mock.patch.object(search, 'MAX_RESULTS', 2):
+            response = self.client.get(reverse('gig_list'), {'search': 'logo'})
+            self.assertEqual(len(response.context['gigs']), 2)
+            self.assertContains(response, 'Showing the top 2 matches')
+            response = self.client.get(reverse('job_list'), {'search': 'logo'})
+            self.assertNotContains(response, 'Showing the top')
+
+    def test_index_follows_saves_and_deletes(self):
+        gig = self.gig('Poster')
+        self.assertEqual(self.titles(Gig.objects.all(), text='poster'), ['Poster'])
+        gig.title = 'Flyer'
+        gig.save()
+        self.assertEqual(self.titles(Gig.objects.all(), text='poster'), [])
+        self.assertEqual(self.titles(Gig.objects.all(), text='flyer'), ['Flyer'])
+
+        # Freelancer skills are part of the gig document
+        self.profile.skills = 'Photoshop'
+        self.profile.save()
+        self.assertEqual(self.titles(Gig.objects.all(), text='photoshop'), ['Flyer'])
+
+        gig.delete()
+        self.assertEqual(self.titles(Gig.objects.all(), text='flyer'), [])
+
+    def test_jobs_are_indexed(self):
+        job = Job.objects.create(
+            client=self.client_user, title='Mascot logo', description='Cartoon', budget=300,
+            deadline='2030-01-01',
+        )
+        self.assertEqual(self.titles(Job.objects.all(), kind='job', text='mascot'), ['Mascot logo'])
+        job.delete()
+        self.assertEqual(self.titles(Job.objects.all(), kind='job', text='mascot'), [])
@@ -0,0 +1,85 @@
+"""
+Skill taxonomy tests.
+"""
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from marketplace.models import FreelancerProfile, Gig, Skill
+from marketplace.skills import parse_skills, skill_slug, skill_slugs
+
+
+class ParseSkillsTests(SimpleTestCase):
+
+    def test_symbols_keep_skills_apart(self):
+        self.assertEqual(
+            parse_skills('C, C++, C#, Java, JavaScript'),
+            [('C', 'c'), ('C++', 'c-plus-plus'), ('C#', 'c-sharp'), ('Java', 'java'), ('JavaScript', 'javascript')],
+        )
+
+    def test_duplicates_blanks_and_spacing(self):
+        self.assertEqual(
+            parse_skills(' Python ,python,, PYTHON , Machine   Learning, !!'),
+            [('Python', 'python'), ('Machine Learning', 'machine-learning')],
+        )
+        self.assertEqual(parse_skills(''), [])
+        self.assertEqual(parse_skills(None), [])
+
+    def test_filter_values_are_slugged(self):
+        self.assertEqual(skill_slug(' Node.js '), 'nodejs')
+        self.assertEqual(skill_slugs(['C++', 'c-plus-plus', 'C#', '']), ['c-plus-plus', 'c-sharp'])
+
+    def test_non_latin_names_keep_a_slug(self):
+        self.assertEqual(
+            parse_skills('日本語, Русский, Café, 中文'),
+            [('日本語', '日本語'), ('Русский', 'русский'), ('Café', 'cafe'), ('中文', '中文')],
+        )
+
+
+class SyncSkillsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('freelancer', password='password123')
+        cls.other = User.objects.create_user('other', password='password123')
+
+    def setUp(self):
+        cache.clear()
+
+    def slugs(self, profile):
+        return sorted(profile.skill_links.values_list('skill__slug', flat=True))
+
+    def test_profiles_share_skills_and_links_follow_edits(self):
+        profile = FreelancerProfile.objects.create(user=self.user, skills='Python, C++', hourly_rate=50)
+        other = FreelancerProfile.objects.create(user=self.other, skills='python, Go', hourly_rate=50)
+        self.assertEqual(self.slugs(profile), ['c-plus-plus', 'python'])
+        self.assertEqual(Skill.objects.filter(slug='python').count(), 1)
+
+        profile.skills = 'Python, C#, 日本語'
+        profile.save()
+        self.assertEqual(self.slugs(profile), ['c-sharp', 'python', '日本語'])
+        self.assertEqual(self.slugs(other), ['go', 'python'])
+
+        # Saves that leave the skills alone keep the links
+        profile.bio = 'Bio'
+        profile.save(update_fields=['bio'])
+        self.assertEqual(self.slugs(profile), ['c-sharp', 'python', '日本語'])
+
+    def test_list_filters_accept_skill_names(self):
+        FreelancerProfile.objects.create(user=self.user, skills='C++, Java', hourly_rate=50)
+        FreelancerProfile.objects.create(user=self.other, skills='C#, JavaScript', hourly_rate=50)
+        Gig.objects.create(freelancer=self.user, title='Engine', description='Work', price=40, delivery_time=2)
+
+        def usernames(skills):
+            response = self.client.get(reverse('freelancer_list'), {'skill': skills})
+            return [profile.user.username for profile in response.context['freelancers']]
+
+        self.assertEqual(usernames(['C++']), ['freelancer'])
+        self.assertEqual(usernames(['c-plus-plus', 'Java']), ['freelancer'])
+        self.assertEqual(usernames(['JavaScript']), ['other'])
+        self.assertEqual(usernames(['C#', 'Java']), [])
+
+        response = self.client.get(reverse('gig_list'), {'skill': 'C++'})
+        self.assertEqual([gig.title for gig in response.context['gigs']], ['Engine'])
+        self.assertEqual([skill.slug for skill in response.context['selected_skills']], ['c-plus-plus'])
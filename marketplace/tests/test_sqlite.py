@@ -0,0 +1,148 @@
+"""
+SQLite production profile tests.
+"""
+import os
+import sqlite3
+import tempfile
+from io import StringIO
+from unittest import skipUnless
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings, tag
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.views import View
+
+from marketplace import sqlite
+from marketplace.models import Gig, Job
+
+
+class PragmaTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'db.sqlite3')
+
+    def pragma(self, conn, name):
+        return conn.execute(f'PRAGMA {name}').fetchone()[0]
+
+    def test_tuned_connections(self):
+        with self.settings(SQLITE_BUSY_TIMEOUT=1234, SQLITE_CACHE_SIZE=2048):
+            conn = sqlite.connect(self.path, 'tuned')
+        self.addCleanup(conn.close)
+        self.assertEqual(self.pragma(conn, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(conn, 'synchronous'), 1)
+        self.assertEqual(self.pragma(conn, 'busy_timeout'), 1234)
+        self.assertEqual(self.pragma(conn, 'cache_size'), -2048)
+        conn.execute('CREATE TABLE t (id INTEGER PRIMARY KEY)')
+
+        reader = sqlite.connect(self.path, 'tuned', readonly=True)
+        self.addCleanup(reader.close)
+        self.assertEqual(self.pragma(reader, 'journal_mode'), 'wal')
+        with self.assertRaises(sqlite3.OperationalError):
+            reader.execute('INSERT INTO t DEFAULT VALUES')
+
+    def test_read_only_connections_leave_the_journal_mode_alone(self):
+        conn = sqlite3.connect(self.path)
+        conn.execute('CREATE TABLE t (id INTEGER PRIMARY KEY)')
+        conn.close()
+        reader = sqlite.connect(self.path, 'tuned', readonly=True)
+        self.addCleanup(reader.close)
+        self.assertEqual(self.pragma(reader, 'journal_mode'), 'delete')
+
+
+class ReadRouterTests(SimpleTestCase):
+
+    def test_reads_are_routed_only_inside_reading(self):
+        router = sqlite.ReadRouter()
+        self.assertIsNone(router.db_for_read(Gig))
+        with sqlite.reading():
+            self.assertEqual(router.db_for_read(Gig), sqlite.READ_ALIAS)
+            self.assertEqual(router.db_for_write(Gig), DEFAULT_DB_ALIAS)
+        self.assertFalse(router.allow_migrate(sqlite.READ_ALIAS, 'marketplace'))
+        self.assertIsNone(router.allow_migrate(DEFAULT_DB_ALIAS, 'marketplace'))
+
+    def test_mixin_marks_get_requests_only(self):
+        class Probe(sqlite.ReadConnectionMixin, View):
+            def get(self, request):
+                return HttpResponse(str(sqlite._reading.get()))
+
+            post = get
+
+        factory = RequestFactory()
+        self.assertEqual(Probe.as_view()(factory.get('/')).content, b'True')
+        self.assertEqual(Probe.as_view()(factory.post('/')).content, b'False')
+
+
+class ReadRouterTransactionTests(TestCase):
+
+    def test_reads_inside_a_transaction_stay_on_the_default_connection(self):
+        with sqlite.reading():
+            self.assertIsNone(sqlite.ReadRouter().db_for_read(Gig))
+
+
+@override_settings(DATABASE_ROUTERS=['marketplace.sqlite.ReadRouter'])
+class ReadConnectionViewTests(TransactionTestCase):
+    """List and detail pages read through READ_ALIAS, as configured by SQLITE_TUNING"""
+
+    @classmethod
+    def setUpClass(cls):
+        # Without SQLITE_TUNING, add the read alias as a mirror of the test database
+        cls.added_alias = sqlite.READ_ALIAS not in connections.settings
+        if cls.added_alias:
+            default = connections[DEFAULT_DB_ALIAS].settings_dict
+            connections.settings[sqlite.READ_ALIAS] = dict(default, TEST=dict(default['TEST'], MIRROR=DEFAULT_DB_ALIAS))
+        cls.databases = {DEFAULT_DB_ALIAS, sqlite.READ_ALIAS}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        if cls.added_alias:
+            connections[sqlite.READ_ALIAS].close()
+            del connections[sqlite.READ_ALIAS]
+            del connections.settings[sqlite.READ_ALIAS]
+
+    def setUp(self):
+        cache.clear()
+        freelancer = User.objects.create_user('freelancer', password='password123')
+        client_user = User.objects.create_user('client', password='password123')
+        Gig.objects.create(freelancer=freelancer, title='Logo', description='Design', price=40, delivery_time=2)
+        self.job = Job.objects.create(
+            client=client_user, title='Site', description='Build', budget=500, deadline='2030-01-01',
+        )
+
+    def assertReadsOnReadConnection(self, url, table):
+        with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as default, \
+                CaptureQueriesContext(connections[sqlite.READ_ALIAS]) as read:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertTrue(any(table in query['sql'] for query in read.captured_queries))
+        self.assertFalse([query['sql'] for query in default.captured_queries if table in query['sql']])
+
+    def test_gig_list(self):
+        self.assertReadsOnReadConnection(reverse('gig_list'), '"marketplace_gig"')
+
+    def test_job_detail(self):
+        self.assertReadsOnReadConnection(reverse('job_detail', args=[self.job.pk]), '"marketplace_job"')
+
+
+@tag('slow')
+@skipUnless(os.environ.get('SLOW_TESTS'), 'Multi-process load test; run with SLOW_TESTS=1')
+class BenchmarkSqliteTests(SimpleTestCase):
+
+    def test_tuned_profile_never_reports_locks(self):
+        out = StringIO()
+        call_command(
+            'benchmark_sqlite', writers=2, readers=1, seconds=0.3, threads=10, messages=200, stdout=out,
+        )
+        output = out.getvalue()
+        self.assertIn('Writes: ', output)
+        tuned = next(line for line in output.splitlines() if line.startswith('tuned'))
+        writes, locked = tuned.split()[1:3]
+        self.assertGreater(float(writes), 0)
+        self.assertEqual(locked, '0')
@@ -0,0 +1,111 @@
+"""
+Dashboard statistics tests.
+
+Incrementally maintained UserStats rows must always match a rebuild from
+the source tables.
+"""
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from marketplace.models import (
+    FreelancerProfile, ClientProfile, Category, Gig, Job, Bid, Order, UserStats
+)
+from marketplace.stats import compute_user_stats, rebuild_user_stats, get_user_stats, COUNTERS
+
+
+class UserStatsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Design', description='Design')
+        cls.freelancer = User.objects.create_user('freelancer', password='password123')
+        FreelancerProfile.objects.create(user=cls.freelancer, skills='Figma', bio='Bio', hourly_rate=30)
+        cls.other = User.objects.create_user('other', password='password123')
+        FreelancerProfile.objects.create(user=cls.other, skills='Figma', bio='Bio', hourly_rate=30)
+        cls.client_user = User.objects.create_user('client', password='password123')
+        ClientProfile.objects.create(user=cls.client_user, contact_info='client@example.com')
+
+    def assertStatsMatchRebuild(self):
+        expected = compute_user_stats()
+        for row in UserStats.objects.all():
+            counters = expected.get(row.user_id, {field: 0 for field in COUNTERS})
+            actual = {field: getattr(row, field) for field in COUNTERS}
+            self.assertEqual(actual, counters, f'user {row.user_id}')
+
+    def make_gig(self, **kwargs):
+        return Gig.objects.create(
+            freelancer=self.freelancer, title='Logo', description='Logo design',
+            category=self.category, price=80, delivery_time=2, **kwargs
+        )
+
+    def make_job(self):
+        return Job.objects.create(
+            client=self.client_user, title='Landing page', description='Design',
+            category=self.category, budget=300, deadline=timezone.now().date() + timedelta(days=7),
+        )
+
+    def test_order_lifecycle(self):
+        gig = self.make_gig()
+        order = Order.objects.create(client=self.client_user, freelancer=self.freelancer, gig=gig, price=80)
+        self.assertStatsMatchRebuild()
+
+        order = Order.objects.get(pk=order.pk)
+        order.status = 'Completed'
+        order.completed_at = timezone.now()
+        order.save()
+        self.assertStatsMatchRebuild()
+        self.assertEqual(self.freelancer.stats.total_earned, 80)
+        self.assertEqual(UserStats.objects.get(user=self.client_user).total_spent, 80)
+
+        order.price = 100
+        order.save()
+        self.assertStatsMatchRebuild()
+
+        order.delete()
+        self.assertStatsMatchRebuild()
+
+    def test_gigs_jobs_and_bids(self):
+        gig = self.make_gig()
+        self.make_gig(is_active=False)
+        gig.is_active = False
+        gig.save()
+        self.assertStatsMatchRebuild()
+
+        job = self.make_job()
+        mine = Bid.objects.create(job=job, freelancer=self.freelancer, proposal_text='Me', bid_amount=250, delivery_days=5)
+        Bid.objects.create(job=job, freelancer=self.other, proposal_text='Me too', bid_amount=200, delivery_days=4)
+        self.assertStatsMatchRebuild()
+
+        self.client.force_login(self.client_user)
+        self.client.post(reverse('accept_bid', args=[mine.pk]))
+        self.assertStatsMatchRebuild()
+        self.assertEqual(UserStats.objects.get(user=self.other).pending_bids, 0)
+
+        job.delete()
+        gig.delete()
+        self.assertStatsMatchRebuild()
+
+    def test_deleting_a_user_cascades_cleanly(self):
+        gig = self.make_gig()
+        Order.objects.create(client=self.client_user, freelancer=self.freelancer, gig=gig, price=80)
+        self.freelancer.delete()
+        self.assertStatsMatchRebuild()
+
+    def test_rebuild_and_dashboard(self):
+        gig = self.make_gig()
+        Order.objects.create(client=self.client_user, freelancer=self.freelancer, gig=gig, price=80, status='Completed')
+        UserStats.objects.all().delete()
+        rebuild_user_stats()
+        self.assertStatsMatchRebuild()
+
+        UserStats.objects.filter(user=self.freelancer).delete()
+        self.assertEqual(get_user_stats(self.freelancer).freelancer_completed_orders, 1)
+
+        self.client.force_login(self.freelancer)
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.context['completed_orders'], 1)
+        self.assertEqual(response.context['total_gigs'], 1)
@@ -0,0 +1,169 @@
+"""
+Query budgets of the views that write.
+
+Listing budgets are covered by test_query_budget.py; these tests drive the
+write views under QUERY_BUDGET_RAISE, for each role and for first-time
+cases (a signup, a new conversation, a first bid...), which cost the most
+queries.
+"""
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from marketplace.models import (
+    FreelancerProfile, ClientProfile, Category, Gig, Job, Bid, Order, Review, Conversation, Message
+)
+
+
+@override_settings(QUERY_BUDGET_RAISE=True)
+class WriteBudgetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Design', description='Design')
+        cls.freelancer = User.objects.create_user('freelancer', password='password123')
+        FreelancerProfile.objects.create(user=cls.freelancer, skills='Python', bio='Bio', hourly_rate=50)
+        cls.client_user = User.objects.create_user('client', password='password123')
+        ClientProfile.objects.create(user=cls.client_user, contact_info='client@example.com')
+        cls.gig = Gig.objects.create(
+            freelancer=cls.freelancer, title='Logo', description='Design', category=cls.category,
+            price=40, delivery_time=2,
+        )
+        cls.job = Job.objects.create(
+            client=cls.client_user, title='Site', description='Build', category=cls.category,
+            budget=500, deadline=timezone.now().date() + timedelta(days=30),
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def login(self, user):
+        self.client.force_login(user)
+
+    def assertRedirectsTo(self, response, url):
+        self.assertRedirects(response, url, fetch_redirect_response=False)
+
+    # ==================== Accounts ====================
+
+    def register(self, username, role):
+        return self.client.post(reverse('register'), {
+            'username': username, 'first_name': 'New', 'last_name': 'User', 'email': f'{username}@example.com',
+            'password1': 'Sup3r-secret-pw', 'password2': 'Sup3r-secret-pw', 'role': role,
+        })
+
+    def test_register_as_freelancer(self):
+        self.assertRedirectsTo(self.register('new-freelancer', 'freelancer'), reverse('profile_edit'))
+        self.assertTrue(FreelancerProfile.objects.filter(user__username='new-freelancer').exists())
+
+    def test_register_as_client(self):
+        self.assertRedirectsTo(self.register('new-client', 'client'), reverse('profile_edit'))
+        self.assertTrue(ClientProfile.objects.filter(user__username='new-client').exists())
+
+    def test_login_and_logout(self):
+        response = self.client.post(reverse('login'), {'username': 'freelancer', 'password': 'wrong'})
+        self.assertEqual(response.status_code, 200)
+        response = self.client.post(reverse('login'), {'username': 'freelancer', 'password': 'password123'})
+        self.assertRedirectsTo(response, reverse('home'))
+        self.assertRedirectsTo(self.client.get(reverse('logout')), reverse('home'))
+
+    def test_profile_edit_for_each_role(self):
+        self.login(self.freelancer)
+        for skills in ('Python, Django, C++, Node.js', 'Python, Django'):
+            response = self.client.post(reverse('profile_edit'), {
+                'skills': skills, 'bio': 'Bio', 'experience': 3, 'hourly_rate': 60,
+            })
+            self.assertRedirectsTo(response, reverse('profile_view'))
+        self.login(self.client_user)
+        response = self.client.post(reverse('profile_edit'), {
+            'company_name': 'Acme', 'contact_info': 'acme@example.com',
+        })
+        self.assertRedirectsTo(response, reverse('profile_view'))
+
+        # Users without a profile yet get a client profile
+        self.login(User.objects.create_user('newcomer', password='password123'))
+        response = self.client.post(reverse('profile_edit'), {
+            'company_name': 'Newco', 'contact_info': 'newco@example.com',
+        })
+        self.assertRedirectsTo(response, reverse('profile_view'))
+        self.assertEqual(ClientProfile.objects.get(user__username='newcomer').company_name, 'Newco')
+        self.assertEqual(self.client.get(reverse('job_create')).status_code, 200)
+
+    # ==================== Gigs and Jobs ====================
+
+    def test_gig_create_edit_and_delete(self):
+        self.login(self.freelancer)
+        data = {
+            'title': 'Banner', 'description': 'Design', 'category': self.category.pk,
+            'price': 30, 'delivery_time': 2, 'is_active': 'on',
+        }
+        self.assertRedirectsTo(self.client.post(reverse('gig_create'), data), reverse('gig_list'))
+        gig = Gig.objects.get(title='Banner')
+        data['price'] = 35
+        self.assertRedirectsTo(self.client.post(reverse('gig_edit', args=[gig.pk]), data), reverse('gig_list'))
+        self.assertRedirectsTo(self.client.post(reverse('gig_delete', args=[gig.pk])), reverse('gig_list'))
+        self.assertFalse(Gig.objects.filter(pk=gig.pk).exists())
+
+    def test_job_create(self):
+        self.login(self.client_user)
+        response = self.client.post(reverse('job_create'), {
+            'title': 'App', 'description': 'Build', 'budget': 900, 'category': self.category.pk,
+            'deadline': (timezone.now().date() + timedelta(days=10)).isoformat(),
+        })
+        self.assertRedirectsTo(response, reverse('job_list'))
+
+    # ==================== Bids, Orders and Reviews ====================
+
+    def test_bid_accept_complete_and_review(self):
+        self.login(self.freelancer)
+        response = self.client.post(reverse('submit_bid', args=[self.job.pk]), {
+            'proposal_text': 'Hire me', 'bid_amount': 450, 'delivery_days': 5,
+        })
+        self.assertRedirectsTo(response, reverse('job_detail', args=[self.job.pk]))
+        bid = Bid.objects.get(job=self.job)
+
+        self.login(self.client_user)
+        self.assertRedirectsTo(self.client.get(reverse('accept_bid', args=[bid.pk])), reverse('order_list'))
+        order = Order.objects.get(job=self.job)
+        self.assertRedirectsTo(
+            self.client.get(reverse('complete_order', args=[order.pk])), reverse('order_detail', args=[order.pk]),
+        )
+        response = self.client.post(reverse('submit_review', args=[order.pk]), {'rating': 5, 'review_text': 'Great'})
+        self.assertRedirectsTo(response, reverse('order_detail', args=[order.pk]))
+        self.assertTrue(Review.objects.filter(order=order).exists())
+
+    def test_purchase_gig(self):
+        self.login(self.client_user)
+        response = self.client.get(reverse('purchase_gig', args=[self.gig.pk]))
+        order = Order.objects.get(gig=self.gig)
+        self.assertRedirectsTo(response, reverse('order_detail', args=[order.pk]))
+
+    # ==================== Messages ====================
+
+    def send(self, sender, receiver, content, name='send_message'):
+        self.login(sender)
+        response = self.client.post(reverse(name, args=[receiver.id]), {'content': content})
+        self.assertRedirectsTo(response, reverse('conversation', args=[receiver.id]))
+
+    def test_send_message_starting_a_conversation(self):
+        self.send(self.freelancer, self.client_user, 'Hi')
+        self.assertEqual(Conversation.objects.count(), 1)
+
+    def test_send_message_in_an_existing_conversation(self):
+        self.send(self.freelancer, self.client_user, 'Hi')
+        self.send(self.freelancer, self.client_user, 'Are you there?')
+        self.send(self.client_user, self.freelancer, 'Yes')
+        self.assertEqual(Message.objects.count(), 3)
+
+    def test_conversation_posts_and_marks_read(self):
+        self.send(self.freelancer, self.client_user, 'Hi', name='conversation')
+        self.login(self.client_user)
+        self.assertEqual(self.client.get(reverse('conversation', args=[self.freelancer.id])).status_code, 200)
+        self.send(self.freelancer, self.client_user, 'New', name='conversation')
+        self.login(self.client_user)
+        response = self.client.get(reverse('conversation_since', args=[self.freelancer.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Message.objects.filter(is_read=False).exists())
@@ -21,6 +21,9 @@ urlpatterns = [
     path('gigs/<int:pk>/delete/', views.GigDeleteView.as_view(), name='gig_delete'),
     path('gigs/<int:gig_id>/purchase/', views.purchase_gig, name='purchase_gig'),
     
+    # Freelancers
+    path('freelancers/', views.FreelancerListView.as_view(), name='freelancer_list'),
+    
     # Jobs
     path('jobs/', views.JobListView.as_view(), name='job_list'),
     path('jobs/<int:pk>/', views.JobDetailView.as_view(), name='job_detail'),
@@ -46,5 +49,11 @@ urlpatterns = [
     # Messages
     path('messages/', views.message_list, name='message_list'),
     path('messages/<int:user_id>/', views.conversation, name='conversation'),
+    path('messages/<int:user_id>/older/', views.conversation_older, name='conversation_older'),
+    path('messages/<int:user_id>/since/', views.conversation_since, name='conversation_since'),
     path('messages/send/<int:user_id>/', views.send_message, name='send_message'),
+    path('messages/stream/', views.message_stream, name='message_stream'),
+    
+    # Monitoring
+    path('metrics/', views.metrics, name='metrics'),
 ]
@@ -1,3 +1,5 @@
+import asyncio
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.decorators import login_required
@@ -5,26 +7,45 @@ from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib import messages
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
 from django.urls import reverse_lazy
-from django.db.models import Q, Count, Avg, Sum
-from django.utils import timezone
-from django.http import HttpResponseForbidden
+from django.db.models import Q, Count, Avg, Sum, OuterRef
+from django.http import Http404, HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.core.exceptions import PermissionDenied
+from django.core.handlers.asgi import ASGIRequest
 from django.views.decorators.cache import never_cache
+from django.conf import settings
+from django.utils.crypto import constant_time_compare
 from .models import (
-    FreelancerProfile, ClientProfile, Category, Gig, Job, 
-    Bid, Order, Message, Review
+    FreelancerProfile, ClientProfile, Gig, Job, 
+    Bid, Order, Message, Review, Skill, ConversationMember
 )
 from .forms import (
     UserRegistrationForm, FreelancerProfileForm, ClientProfileForm,
     GigForm, JobForm, BidForm, MessageForm, ReviewForm
 )
+from . import search as fulltext
+from . import metrics as telemetry
+from .conversations import mark_read, message_json
+from .pagination import CursorPaginationMixin, paginate_by_cursor
+from . import realtime
+from .query_budget import query_budget, QueryBudgetMixin
+from . import stats
+from . import services
+from . import roles
+from . import caching
+from .skills import skill_slugs
+from .page_cache import anonymous_page_cache, AnonymousPageCacheMixin
+from .conditional import conditional_page, ConditionalGetMixin, latest, count
+from .sqlite import ReadConnectionMixin
 
 
 # ==================== Home & Authentication ====================
 
+@query_budget(6)
+@anonymous_page_cache([caching.GIGS, caching.CATEGORIES])
 def home(request):
     """Home page with featured gigs"""
-    featured_gigs = Gig.objects.filter(is_active=True).order_by('-created_at')[:8]
-    categories = Category.objects.all()[:6]
+    featured_gigs = Gig.objects.filter(is_active=True).select_related('category').order_by('-created_at')[:8]
+    categories = caching.get_categories()[:6]
     context = {
         'featured_gigs': featured_gigs,
         'categories': categories,
@@ -32,6 +53,7 @@ def home(request):
     return render(request, 'marketplace/home.html', context)
 
 
+@query_budget(13)
 def register(request):
     """User registration with role selection"""
     if request.method == 'POST':
@@ -55,6 +77,7 @@ def register(request):
                 )
             
             login(request, user)
+            roles.remember_role(request, roles.FREELANCER if role == 'freelancer' else roles.CLIENT)
             messages.success(request, f'Welcome {user.username}! Please complete your profile.')
             return redirect('profile_edit')
     else:
@@ -63,6 +86,7 @@ def register(request):
     return render(request, 'marketplace/auth/register.html', {'form': form})
 
 
+@query_budget(6)
 def user_login(request):
     """User login"""
     if request.method == 'POST':
@@ -82,6 +106,7 @@ def user_login(request):
 
 
 @never_cache
+@query_budget(4)
 def user_logout(request):
     """User logout - clears session and prevents browser caching"""
     logout(request)
@@ -96,17 +121,41 @@ def user_logout(request):
 
 # ==================== Profile Views ====================
 
+def profile_state(request, username=None):
+    """What the profile page shows, for its ETag"""
+    from django.contrib.auth.models import User
+    if username and username != request.user.username:
+        users = User.objects.filter(username=username)
+    else:
+        users = User.objects.filter(pk=request.user.pk)
+    gigs = Gig.objects.filter(freelancer=OuterRef('pk'))
+    reviews = Review.objects.filter(order__freelancer=OuterRef('pk'))
+    return users.annotate(
+        last_gig=latest(gigs, 'updated_at'),
+        active_gigs=count(gigs.filter(is_active=True)),
+        last_review=latest(reviews, 'created_at'),
+        review_count=count(reviews),
+    ).values_list(
+        'pk', 'first_name', 'last_name', 'freelancer_profile__updated_at', 'client_profile__updated_at',
+        'last_gig', 'active_gigs', 'last_review', 'review_count',
+    ).first()
+
+
+@query_budget(10)
 @login_required
+@conditional_page(profile_state)
 def profile_view(request, username=None):
     """View user profile"""
-    if username:
+    if username and username != request.user.username:
         from django.contrib.auth.models import User
         user = get_object_or_404(User, username=username)
+        freelancer_profile = FreelancerProfile.objects.filter(user=user).first()
+        client_profile = None if freelancer_profile else ClientProfile.objects.filter(user=user).first()
     else:
         user = request.user
-    
-    freelancer_profile = FreelancerProfile.objects.filter(user=user).first()
-    client_profile = ClientProfile.objects.filter(user=user).first()
+        profile = roles.get_profile(request)
+        freelancer_profile = profile if request.role == roles.FREELANCER else None
+        client_profile = profile if request.role == roles.CLIENT else None
     
     context = {
         'profile_user': user,
@@ -116,56 +165,59 @@ def profile_view(request, username=None):
     
     if freelancer_profile:
         context['gigs'] = Gig.objects.filter(freelancer=user, is_active=True)
-        context['reviews'] = Review.objects.filter(order__freelancer=user)
+        context['reviews'] = Review.objects.filter(order__freelancer=user).select_related('order__client')
     
     return render(request, 'marketplace/profile/profile.html', context)
 
 
+@query_budget(16)
 @login_required
 def profile_edit(request):
     """Edit user profile"""
-    freelancer_profile = FreelancerProfile.objects.filter(user=request.user).first()
-    client_profile = ClientProfile.objects.filter(user=request.user).first()
+    # Users without a profile get a client profile form, as before. The
+    # form needs the model instance itself, not the request.profile proxy
+    profile = roles.get_profile(request)
+    form_class = FreelancerProfileForm if request.role == roles.FREELANCER else ClientProfileForm
     
     if request.method == 'POST':
-        if freelancer_profile:
-            form = FreelancerProfileForm(request.POST, request.FILES, instance=freelancer_profile)
-        else:
-            form = ClientProfileForm(request.POST, request.FILES, instance=client_profile)
+        form = form_class(request.POST, request.FILES, instance=profile)
         
         if form.is_valid():
-            form.save()
+            profile = form.save(commit=False)
+            if profile._state.adding:
+                profile.user = request.user
+                profile.save()
+                roles.remember_role(request, roles.CLIENT)
+            else:
+                # Write only the edited columns so rating and earnings totals
+                # updated concurrently by other requests are not overwritten
+                profile.save(update_fields=list(form.fields) + ['updated_at'])
             messages.success(request, 'Profile updated successfully!')
             return redirect('profile_view')
     else:
-        if freelancer_profile:
-            form = FreelancerProfileForm(instance=freelancer_profile)
-        else:
-            form = ClientProfileForm(instance=client_profile)
+        form = form_class(instance=profile)
     
     return render(request, 'marketplace/profile/profile_edit.html', {'form': form})
 
 
 # ==================== Gig Views ====================
 
-class GigListView(ListView):
+class GigListView(ReadConnectionMixin, AnonymousPageCacheMixin, QueryBudgetMixin, CursorPaginationMixin, ListView):
     """List all active gigs"""
     model = Gig
     template_name = 'marketplace/gigs/gig_list.html'
     context_object_name = 'gigs'
     paginate_by = 12
+    query_budget = 8
+    page_cache_namespaces = [caching.GIGS, caching.CATEGORIES]
+    page_cache_params = ['category', 'min_price', 'max_price', 'skill', 'search', 'cursor', 'page']
+    
+    def use_cursor_pagination(self):
+        # Ranked search results are ordered by relevance, not (created_at, id)
+        return not self.request.GET.get('search') and super().use_cursor_pagination()
     
     def get_queryset(self):
-        queryset = Gig.objects.filter(is_active=True)
-        
-        # Search
-        search = self.request.GET.get('search')
-        if search:
-            queryset = queryset.filter(
-                Q(title__icontains=search) | 
-                Q(description__icontains=search) |
-                Q(freelancer__freelancer_profile__skills__icontains=search)
-            )
+        queryset = Gig.objects.filter(is_active=True).select_related('category').order_by('-created_at')
         
         # Filter by category
         category = self.request.GET.get('category')
@@ -180,38 +232,68 @@ class GigListView(ListView):
         if max_price:
             queryset = queryset.filter(price__lte=max_price)
         
-        return queryset.order_by('-created_at')
+        # Filter by skill (slug lookups through the skill index)
+        for slug in skill_slugs(self.request.GET.getlist('skill')):
+            queryset = queryset.filter(freelancer__freelancer_profile__skill_links__skill__slug=slug)
+        
+        # Search (relevance-ranked when a full-text index is available)
+        search = self.request.GET.get('search')
+        if search:
+            queryset = fulltext.search(
+                queryset, 'gig', search,
+                ['title', 'description', 'freelancer__freelancer_profile__skills'],
+            )
+        
+        return queryset
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['categories'] = Category.objects.all()
+        context['categories'] = caching.get_categories()
+        context['selected_skills'] = Skill.objects.filter(slug__in=skill_slugs(self.request.GET.getlist('skill')))
+        if self.request.GET.get('search'):
+            # Full-text searches stop at MAX_RESULTS matches; the template says so
+            context['search_limit'] = fulltext.MAX_RESULTS
         return context
 
 
-class GigDetailView(DetailView):
+class GigDetailView(ReadConnectionMixin, QueryBudgetMixin, ConditionalGetMixin, DetailView):
     """View gig details"""
     model = Gig
     template_name = 'marketplace/gigs/gig_detail.html'
     context_object_name = 'gig'
+    query_budget = 7
+    
+    def get_queryset(self):
+        return Gig.objects.select_related('category', 'freelancer__freelancer_profile')
+    
+    def get_etag_state(self, request, pk):
+        reviews = Review.objects.filter(order__gig=OuterRef('pk'))
+        state = Gig.objects.filter(pk=pk).annotate(
+            last_review=latest(reviews, 'created_at'),
+            review_count=count(reviews),
+        ).values_list('updated_at', 'freelancer__freelancer_profile__updated_at', 'last_review', 'review_count').first()
+        # The category's name shows too
+        return state and state + (caching.CATEGORIES.version(),)
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        gig = self.get_object()
-        context['freelancer_profile'] = FreelancerProfile.objects.filter(user=gig.freelancer).first()
-        context['reviews'] = Review.objects.filter(order__gig=gig)
+        gig = self.object
+        context['freelancer_profile'] = getattr(gig.freelancer, 'freelancer_profile', None)
+        context['reviews'] = Review.objects.filter(order__gig=gig).select_related('order__client')
         return context
 
 
-class GigCreateView(LoginRequiredMixin, UserPassesTestMixin, CreateView):
+class GigCreateView(QueryBudgetMixin, LoginRequiredMixin, UserPassesTestMixin, CreateView):
     """Create a new gig (freelancers only)"""
     model = Gig
     form_class = GigForm
     template_name = 'marketplace/gigs/gig_form.html'
     success_url = reverse_lazy('gig_list')
+    query_budget = 14
     
     def test_func(self):
         # Only freelancers can create gigs
-        return FreelancerProfile.objects.filter(user=self.request.user).exists()
+        return self.request.role == roles.FREELANCER
     
     def form_valid(self, form):
         form.instance.freelancer = self.request.user
@@ -219,12 +301,13 @@ class GigCreateView(LoginRequiredMixin, UserPassesTestMixin, CreateView):
         return super().form_valid(form)
 
 
-class GigUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
+class GigUpdateView(QueryBudgetMixin, LoginRequiredMixin, UserPassesTestMixin, UpdateView):
     """Update gig (owner only)"""
     model = Gig
     form_class = GigForm
     template_name = 'marketplace/gigs/gig_form.html'
     success_url = reverse_lazy('gig_list')
+    query_budget = 14
     
     def test_func(self):
         gig = self.get_object()
@@ -235,11 +318,12 @@ class GigUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
         return super().form_valid(form)
 
 
-class GigDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
+class GigDeleteView(QueryBudgetMixin, LoginRequiredMixin, UserPassesTestMixin, DeleteView):
     """Delete gig (owner only)"""
     model = Gig
     template_name = 'marketplace/gigs/gig_confirm_delete.html'
     success_url = reverse_lazy('gig_list')
+    query_budget = 16
     
     def test_func(self):
         gig = self.get_object()
@@ -250,25 +334,49 @@ class GigDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
         return super().delete(request, *args, **kwargs)
 
 
+# ==================== Freelancer Views ====================
+
+class FreelancerListView(ReadConnectionMixin, QueryBudgetMixin, ListView):
+    """Browse freelancers, optionally filtered by skill"""
+    model = FreelancerProfile
+    template_name = 'marketplace/freelancers/freelancer_list.html'
+    context_object_name = 'freelancers'
+    paginate_by = 12
+    query_budget = 7
+    
+    def get_queryset(self):
+        queryset = FreelancerProfile.objects.select_related('user')
+        
+        # Filter by skill (slug lookups through the skill index)
+        for slug in skill_slugs(self.request.GET.getlist('skill')):
+            queryset = queryset.filter(skill_links__skill__slug=slug)
+        
+        return queryset.prefetch_related('skill_set').order_by('-rating', '-created_at')
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['selected_skills'] = Skill.objects.filter(slug__in=skill_slugs(self.request.GET.getlist('skill')))
+        return context
+
+
 # ==================== Job Views ====================
 
-class JobListView(ListView):
+class JobListView(ReadConnectionMixin, AnonymousPageCacheMixin, QueryBudgetMixin, CursorPaginationMixin, ListView):
     """List all jobs"""
     model = Job
     template_name = 'marketplace/jobs/job_list.html'
     context_object_name = 'jobs'
     paginate_by = 10
+    query_budget = 7
+    page_cache_namespaces = [caching.JOBS, caching.CATEGORIES]
+    page_cache_params = ['category', 'status', 'search', 'cursor', 'page']
+    
+    def use_cursor_pagination(self):
+        # Ranked search results are ordered by relevance, not (created_at, id)
+        return not self.request.GET.get('search') and super().use_cursor_pagination()
     
     def get_queryset(self):
-        queryset = Job.objects.all()
-        
-        # Search
-        search = self.request.GET.get('search')
-        if search:
-            queryset = queryset.filter(
-                Q(title__icontains=search) | 
-                Q(description__icontains=search)
-            )
+        queryset = Job.objects.select_related('category', 'client').order_by('-created_at')
         
         # Filter by category
         category = self.request.GET.get('category')
@@ -280,24 +388,55 @@ class JobListView(ListView):
         if status:
             queryset = queryset.filter(status=status)
         
-        return queryset.order_by('-created_at')
+        # Search (relevance-ranked when a full-text index is available)
+        search = self.request.GET.get('search')
+        if search:
+            queryset = fulltext.search(queryset, 'job', search, ['title', 'description'])
+        
+        return queryset
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['categories'] = Category.objects.all()
+        context['categories'] = caching.get_categories()
+        if self.request.GET.get('search'):
+            # Full-text searches stop at MAX_RESULTS matches; the template says so
+            context['search_limit'] = fulltext.MAX_RESULTS
         return context
 
 
-class JobDetailView(DetailView):
+class JobDetailView(ReadConnectionMixin, QueryBudgetMixin, ConditionalGetMixin, DetailView):
     """View job details"""
     model = Job
     template_name = 'marketplace/jobs/job_detail.html'
     context_object_name = 'job'
+    query_budget = 7
+    
+    def get_queryset(self):
+        return Job.objects.select_related('category', 'client')
+    
+    bids_per_page = 20
+    # ?sort= value -> keyset ordering, each backed by a (job, ...) index
+    bid_orderings = {
+        'recent': ('-created_at', '-id'),
+        'amount': ('bid_amount', 'id'),
+        'delivery': ('delivery_days', 'id'),
+    }
+    
+    def get_etag_state(self, request, pk):
+        # Every bid change and acceptance moves the job's updated_at with its bid statistics
+        state = Job.objects.filter(pk=pk).values_list('updated_at', 'bid_count').first()
+        return state and state + (caching.CATEGORIES.version(),)
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        job = self.get_object()
-        context['bids'] = job.bids.all()
+        job = self.object
+        sort = self.request.GET.get('sort')
+        if sort not in self.bid_orderings:
+            sort = 'recent'
+        context['bid_sort'] = sort
+        context['page_obj'] = context['bids'] = paginate_by_cursor(
+            self.request, job.bids.select_related('freelancer'), self.bids_per_page, self.bid_orderings[sort],
+        )
         context['bid_form'] = BidForm()
         
         # Check if user already bid
@@ -310,16 +449,17 @@ class JobDetailView(DetailView):
         return context
 
 
-class JobCreateView(LoginRequiredMixin, UserPassesTestMixin, CreateView):
+class JobCreateView(QueryBudgetMixin, LoginRequiredMixin, UserPassesTestMixin, CreateView):
     """Post a new job (clients only)"""
     model = Job
     form_class = JobForm
     template_name = 'marketplace/jobs/job_form.html'
     success_url = reverse_lazy('job_list')
+    query_budget = 14
     
     def test_func(self):
         # Only clients can post jobs
-        return ClientProfile.objects.filter(user=self.request.user).exists()
+        return self.request.role == roles.CLIENT
     
     def form_valid(self, form):
         form.instance.client = self.request.user
@@ -329,13 +469,14 @@ class JobCreateView(LoginRequiredMixin, UserPassesTestMixin, CreateView):
 
 # ==================== Bid Views ====================
 
+@query_budget(12)
 @login_required
 def submit_bid(request, job_id):
     """Submit a bid on a job"""
     job = get_object_or_404(Job, id=job_id)
     
     # Check if user is a freelancer
-    if not FreelancerProfile.objects.filter(user=request.user).exists():
+    if request.role != roles.FREELANCER:
         messages.error(request, 'Only freelancers can submit bids.')
         return redirect('job_detail', pk=job_id)
     
@@ -362,40 +503,19 @@ def submit_bid(request, job_id):
     return redirect('job_detail', pk=job_id)
 
 
+@query_budget(14)
 @login_required
 def accept_bid(request, bid_id):
     """Accept a bid (job owner only)"""
-    bid = get_object_or_404(Bid, id=bid_id)
-    job = bid.job
-    
-    # Check if user is job owner
-    if job.client != request.user:
-        return HttpResponseForbidden("You don't have permission to accept this bid.")
-    
-    # Check if job already has accepted bid
-    if job.has_accepted_bid():
-        messages.error(request, 'This job already has an accepted bid.')
-        return redirect('job_detail', pk=job.id)
-    
-    # Accept bid
-    bid.status = 'Accepted'
-    bid.save()
-    
-    # Update job status
-    job.status = 'In Progress'
-    job.save()
-    
-    # Create order
-    Order.objects.create(
-        client=job.client,
-        freelancer=bid.freelancer,
-        job=job,
-        price=bid.bid_amount,
-        status='In Progress'
-    )
-    
-    # Reject other bids
-    job.bids.exclude(id=bid_id).update(status='Rejected')
+    try:
+        services.accept_bid(bid_id, request.user)
+    except Bid.DoesNotExist:
+        raise Http404('No Bid matches the given query.')
+    except PermissionDenied as e:
+        return HttpResponseForbidden(str(e))
+    except services.BidNotAcceptable as e:
+        messages.error(request, str(e))
+        return redirect('job_detail', pk=e.job_id)
     
     messages.success(request, 'Bid accepted! Order created.')
     return redirect('order_list')
@@ -403,26 +523,29 @@ def accept_bid(request, bid_id):
 
 # ==================== Order Views ====================
 
+@query_budget(6)
 @login_required
 def order_list(request):
     """List user's orders"""
-    freelancer_profile = FreelancerProfile.objects.filter(user=request.user).first()
-    
-    if freelancer_profile:
+    if request.role == roles.FREELANCER:
         orders = Order.objects.filter(freelancer=request.user)
     else:
         orders = Order.objects.filter(client=request.user)
+    orders = orders.select_related('gig', 'job', 'client', 'freelancer')
     
+    page_obj = paginate_by_cursor(request, orders, 20)
     context = {
-        'orders': orders.order_by('-created_at'),
+        'orders': page_obj.object_list,
+        'page_obj': page_obj,
     }
     return render(request, 'marketplace/orders/order_list.html', context)
 
 
+@query_budget(5)
 @login_required
 def order_detail(request, order_id):
     """View order details"""
-    order = get_object_or_404(Order, id=order_id)
+    order = get_object_or_404(Order.objects.select_related('gig', 'job', 'client', 'freelancer'), id=order_id)
     
     # Check if user is part of the order
     if order.client != request.user and order.freelancer != request.user:
@@ -435,13 +558,14 @@ def order_detail(request, order_id):
     return render(request, 'marketplace/orders/order_detail.html', context)
 
 
+@query_budget(10)
 @login_required
 def purchase_gig(request, gig_id):
     """Purchase a gig"""
     gig = get_object_or_404(Gig, id=gig_id)
     
     # Check if user is a client
-    if not ClientProfile.objects.filter(user=request.user).exists():
+    if request.role != roles.CLIENT:
         messages.error(request, 'Only clients can purchase gigs.')
         return redirect('gig_detail', pk=gig_id)
     
@@ -458,23 +582,21 @@ def purchase_gig(request, gig_id):
     return redirect('order_detail', order_id=order.id)
 
 
+@query_budget(14)
 @login_required
 def complete_order(request, order_id):
     """Mark order as complete (client only)"""
     order = get_object_or_404(Order, id=order_id)
     
     # Check if user is client
-    if order.client != request.user:
+    if order.client_id != request.user.id:
         return HttpResponseForbidden("Only the client can complete the order.")
     
-    order.status = 'Completed'
-    order.completed_at = timezone.now()
-    order.save()
-    
-    # Update job status if applicable
-    if order.job:
-        order.job.status = 'Completed'
-        order.job.save()
+    try:
+        services.transition_order(order, 'Completed')
+    except services.InvalidTransition as e:
+        messages.error(request, str(e))
+        return redirect('order_detail', order_id=order_id)
     
     messages.success(request, 'Order marked as complete! You can now leave a review.')
     return redirect('order_detail', order_id=order_id)
@@ -482,6 +604,7 @@ def complete_order(request, order_id):
 
 # ==================== Review Views ====================
 
+@query_budget(12)
 @login_required
 def submit_review(request, order_id):
     """Submit a review for completed order"""
@@ -517,45 +640,38 @@ def submit_review(request, order_id):
 
 # ==================== Dashboard Views ====================
 
+@query_budget(12)
 @login_required
 def dashboard(request):
     """Unified dashboard - shows content based on user role"""
-    freelancer_profile = FreelancerProfile.objects.filter(user=request.user).first()
-    client_profile = ClientProfile.objects.filter(user=request.user).first()
-
-    if freelancer_profile:
+    if request.role == roles.FREELANCER:
         # Freelancer dashboard data
-        total_earnings = freelancer_profile.total_earnings
-        active_orders = Order.objects.filter(freelancer=request.user, status='In Progress').count()
-        completed_orders = Order.objects.filter(freelancer=request.user, status='Completed').count()
-        total_gigs = Gig.objects.filter(freelancer=request.user, is_active=True).count()
-        recent_orders = Order.objects.filter(freelancer=request.user).order_by('-created_at')[:5]
-        pending_bids = Bid.objects.filter(freelancer=request.user, status='Pending').order_by('-created_at')[:5]
+        user_stats = stats.get_user_stats(request.user)
+        recent_orders = Order.objects.filter(freelancer=request.user).select_related('gig', 'job', 'client').order_by('-created_at')[:5]
+        pending_bids = Bid.objects.filter(freelancer=request.user, status='Pending').select_related('job').order_by('-created_at')[:5]
         context = {
-            'freelancer_profile': freelancer_profile,
-            'total_earnings': total_earnings,
-            'active_orders': active_orders,
-            'completed_orders': completed_orders,
-            'total_gigs': total_gigs,
+            'freelancer_profile': roles.get_profile(request),
+            'total_earnings': user_stats.total_earned,
+            'active_orders': user_stats.freelancer_active_orders,
+            'completed_orders': user_stats.freelancer_completed_orders,
+            'total_gigs': user_stats.active_gigs,
+            'pending_bid_count': user_stats.pending_bids,
             'recent_orders': recent_orders,
             'pending_bids': pending_bids,
         }
         return render(request, 'marketplace/dashboard/freelancer.html', context)
 
-    elif client_profile:
+    elif request.role == roles.CLIENT:
         # Client dashboard data
-        total_spent = client_profile.total_spent()
-        active_orders = Order.objects.filter(client=request.user, status='In Progress').count()
-        completed_orders = Order.objects.filter(client=request.user, status='Completed').count()
-        posted_jobs = Job.objects.filter(client=request.user).count()
-        recent_orders = Order.objects.filter(client=request.user).order_by('-created_at')[:5]
+        user_stats = stats.get_user_stats(request.user)
+        recent_orders = Order.objects.filter(client=request.user).select_related('gig', 'job', 'freelancer').order_by('-created_at')[:5]
         recent_jobs = Job.objects.filter(client=request.user).order_by('-created_at')[:5]
         context = {
-            'client_profile': client_profile,
-            'total_spent': total_spent,
-            'active_orders': active_orders,
-            'completed_orders': completed_orders,
-            'posted_jobs': posted_jobs,
+            'client_profile': roles.get_profile(request),
+            'total_spent': user_stats.total_spent,
+            'active_orders': user_stats.client_active_orders,
+            'completed_orders': user_stats.client_completed_orders,
+            'posted_jobs': user_stats.posted_jobs,
             'recent_orders': recent_orders,
             'recent_jobs': recent_jobs,
         }
@@ -567,11 +683,13 @@ def dashboard(request):
         return redirect('profile_edit')
 
 
+@query_budget(2)
 @login_required
 def freelancer_dashboard(request):
     return redirect('dashboard')
 
 
+@query_budget(2)
 @login_required
 def client_dashboard(request):
     return redirect('dashboard')
@@ -581,60 +699,41 @@ def client_dashboard(request):
 
 # ==================== Messaging Views ====================
 
+@query_budget(5)
 @login_required
 def message_list(request):
     """List all conversations"""
-    from django.db.models import Q, Max
-    from django.contrib.auth.models import User
-    
-    # Get all users the current user has messaged with
-    sent_to = Message.objects.filter(sender=request.user).values_list('receiver', flat=True).distinct()
-    received_from = Message.objects.filter(receiver=request.user).values_list('sender', flat=True).distinct()
-    
-    user_ids = set(list(sent_to) + list(received_from))
-    conversations = User.objects.filter(id__in=user_ids)
-    
-    # Get last message for each conversation
-    conversation_data = []
-    for user in conversations:
-        last_message = Message.objects.filter(
-            Q(sender=request.user, receiver=user) | Q(sender=user, receiver=request.user)
-        ).order_by('-timestamp').first()
-        
-        unread_count = Message.objects.filter(
-            sender=user, receiver=request.user, is_read=False
-        ).count()
-        
-        conversation_data.append({
-            'user': user,
-            'last_message': last_message,
-            'unread_count': unread_count,
-        })
-    
-    # Sort by last message timestamp
-    conversation_data.sort(key=lambda x: x['last_message'].timestamp if x['last_message'] else timezone.now(), reverse=True)
+    inbox = ConversationMember.objects.filter(user=request.user).select_related(
+        'partner', 'conversation__last_message'
+    )
+    page_obj = paginate_by_cursor(request, inbox, 20, ordering=('-last_timestamp', '-id'))
     
     context = {
-        'conversations': conversation_data,
+        'conversations': page_obj.object_list,
+        'page_obj': page_obj,
     }
     return render(request, 'marketplace/messages/inbox.html', context)
 
 
+# Messages rendered with the conversation page and returned per JSON fetch
+CONVERSATION_PAGE_SIZE = 30
+
+
+def _thread(user, other_user):
+    """All messages exchanged between two users"""
+    return Message.objects.filter(
+        Q(sender=user, receiver=other_user) | 
+        Q(sender=other_user, receiver=user)
+    )
+
+
+@query_budget(13)
 @login_required
 def conversation(request, user_id):
     """View conversation with a specific user"""
     from django.contrib.auth.models import User
     other_user = get_object_or_404(User, id=user_id)
     
-    # Mark messages as read
-    Message.objects.filter(sender=other_user, receiver=request.user, is_read=False).update(is_read=True)
-    
-    # Get messages
-    messages_list = Message.objects.filter(
-        Q(sender=request.user, receiver=other_user) | 
-        Q(sender=other_user, receiver=request.user)
-    ).order_by('timestamp')
-    
     # Handle message sending
     if request.method == 'POST':
         form = MessageForm(request.POST)
@@ -648,14 +747,104 @@ def conversation(request, user_id):
     else:
         form = MessageForm()
     
+    # Mark messages as read (no-op when nothing is unread)
+    mark_read(request.user, other_user)
+    
+    # Only the latest page is rendered; older pages are fetched by cursor
+    page_obj = paginate_by_cursor(
+        request, _thread(request.user, other_user), CONVERSATION_PAGE_SIZE, ordering=('-timestamp', '-id')
+    )
+    messages_list = list(reversed(page_obj.object_list))
+    
     context = {
         'other_user': other_user,
         'messages_list': messages_list,
+        'page_obj': page_obj,
         'form': form,
     }
     return render(request, 'marketplace/messages/conversation.html', context)
 
 
+@query_budget(5)
+@login_required
+def conversation_older(request, user_id):
+    """JSON page of messages older than the cursor, oldest first"""
+    from django.contrib.auth.models import User
+    other_user = get_object_or_404(User, id=user_id)
+    
+    page_obj = paginate_by_cursor(
+        request, _thread(request.user, other_user), CONVERSATION_PAGE_SIZE, ordering=('-timestamp', '-id')
+    )
+    return JsonResponse({
+        'messages': [message_json(message) for message in reversed(page_obj.object_list)],
+        'older_cursor': page_obj.next_cursor,
+    })
+
+
+@query_budget(10)
+@login_required
+def conversation_since(request, user_id):
+    """JSON list of messages newer than ?after=<message id>, oldest first"""
+    from django.contrib.auth.models import User
+    other_user = get_object_or_404(User, id=user_id)
+    
+    try:
+        after = int(request.GET.get('after', 0))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid message id'}, status=400)
+    
+    rows = list(
+        _thread(request.user, other_user).filter(id__gt=after).order_by('id')[:CONVERSATION_PAGE_SIZE + 1]
+    )
+    new_messages = rows[:CONVERSATION_PAGE_SIZE]
+    
+    # The reader is looking at the thread, so what just arrived has been seen
+    if any(message.sender_id == other_user.id and not message.is_read for message in new_messages):
+        mark_read(request.user, other_user)
+    
+    return JsonResponse({
+        'messages': [message_json(message) for message in new_messages],
+        'has_more': len(rows) > CONVERSATION_PAGE_SIZE,
+    })
+
+
+# Seconds between keep-alive comments on an idle event stream
+STREAM_HEARTBEAT = 15
+
+
+async def message_stream(request):
+    """Server-Sent Events stream of new messages and unread counts (ASGI only)"""
+    user = await request.auser()
+    if not user.is_authenticated:
+        return HttpResponse(status=401)
+    if not isinstance(request, ASGIRequest):
+        # Under WSGI a stream would hold a worker; 204 tells EventSource not to reconnect
+        return HttpResponse(status=204)
+    
+    realtime.get_broker().start()
+    stream = realtime.hub.subscribe(user.id)
+    queue = stream[1]
+    
+    async def events():
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), STREAM_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ': keep-alive\n\n'
+                    continue
+                yield realtime.format_event(event)
+        finally:
+            realtime.hub.unsubscribe(user.id, stream)
+    
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@query_budget(13)
 @login_required
 def send_message(request, user_id):
     """Send a message to a user"""
@@ -673,3 +862,23 @@ def send_message(request, user_id):
             return redirect('conversation', user_id=user_id)
     
     return redirect('conversation', user_id=user_id)
+
+
+# ==================== Monitoring Views ====================
+
+@query_budget(0)
+@never_cache
+def metrics(request):
+    """Prometheus metrics of every worker process (see metrics.py)"""
+    if not getattr(settings, 'METRICS', False):
+        raise Http404
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token:
+        if not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            response = HttpResponse('Invalid metrics token', status=401, content_type='text/plain')
+            response['WWW-Authenticate'] = 'Bearer'
+            return response
+    elif not settings.DEBUG:
+        # Without a token the endpoint would be public
+        raise Http404
+    return HttpResponse(telemetry.render(telemetry.gather()), content_type=telemetry.CONTENT_TYPE)